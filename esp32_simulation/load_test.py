@@ -0,0 +1,282 @@
+"""Generador de carga: simula N puertas ESP32 concurrentes contra el edge.
+
+MQTT: cada puerta publica eventos en esp32/<puerta>/door (QoS 1) a la tasa
+indicada. Con un broker real la latencia es publicación → PUBACK; con
+--inprocess los mensajes van directo a un MQTTListener en este proceso y la
+latencia es publicación → evento persistido y confirmado.
+
+HTTP: cada puerta repite el ciclo notify-access → get-pending-commands
+(long-poll) → confirm-command, y la latencia es la del ciclo completo.
+Con --inprocess el Edge API corre en este proceso sobre una base temporal.
+
+Uso:
+  python load_test.py --devices 50 --rate 2 --duration 20 --inprocess
+  python load_test.py --mode mqtt --mqtt-host localhost --devices 200
+  python load_test.py --mode http --http-url http://localhost:5000 --devices 100
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class Recorder:
+    """Acumula latencias y errores de todos los hilos."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def report(self, elapsed):
+        lat = self.latencies
+        return (f"{self.name:<6} {len(lat) / elapsed:>9.1f} ops/s   "
+                f"p50 {percentile(lat, 50) * 1000:>7.1f} ms   "
+                f"p95 {percentile(lat, 95) * 1000:>7.1f} ms   "
+                f"p99 {percentile(lat, 99) * 1000:>7.1f} ms   "
+                f"errores {self.errors}")
+
+
+def paced(rate, deadline, stop):
+    """Itera a `rate` por segundo hasta el deadline, con fase aleatoria por hilo."""
+    interval = 1.0 / rate
+    next_at = time.perf_counter() + interval * (hash(threading.current_thread().name) % 1000) / 1000
+    while not stop.is_set() and next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield
+        next_at += interval
+
+
+def event_payload(seq):
+    return json.dumps({"user_id": f"user_{seq % 50}", "method": "FACE_RECOGNITION"})
+
+
+# === MQTT ===
+
+class InProcessBroker:
+    """Sustituto del broker: entrega a un MQTTListener local y mide hasta su ack."""
+
+    class Message:
+        def __init__(self, mid, topic, payload, qos):
+            self.mid = mid
+            self.topic = topic
+            self.payload = payload
+            self.qos = qos
+
+    def __init__(self, listener, recorder):
+        self.listener = listener
+        self.recorder = recorder
+        self._sent = {}
+        self._mid = 0
+        self._lock = threading.Lock()
+        listener.client = self
+
+    def publish(self, topic, payload, qos=1):
+        with self._lock:
+            self._mid += 1
+            mid = self._mid
+            self._sent[mid] = time.perf_counter()
+        self.listener.on_message(self, None, self.Message(mid, topic, payload.encode(), qos))
+
+    def ack(self, mid, qos):
+        with self._lock:
+            sent = self._sent.pop(mid, None)
+        if sent is not None:
+            self.recorder.record(time.perf_counter() - sent)
+
+
+def start_inprocess_mqtt(recorder, tmp):
+    sys.path.insert(0, ROOT)
+    from iot_edge.application.register_access import RegisterAccess
+    from iot_edge.domain.services.access_validator import AccessValidator
+    from iot_edge.infrastructure.messaging.mqtt_listener import MQTTListener
+    from iot_edge.infrastructure.persistence.sqlite_repo import BatchingSQLiteAccessRepository
+
+    repo = BatchingSQLiteAccessRepository(os.path.join(tmp, "access_events.db"))
+    listener = MQTTListener(RegisterAccess(AccessValidator([f"user_{i}" for i in range(25)]), repo))
+    listener.start_workers()
+    broker = InProcessBroker(listener, recorder)
+
+    def shutdown():
+        listener.stop_workers()
+        repo.close()
+    return broker, shutdown
+
+
+def mqtt_device(device, args, recorder, deadline, stop, broker=None):
+    topic = f"esp32/{device}/door"
+    if broker is not None:
+        for seq, _ in enumerate(paced(args.rate, deadline, stop)):
+            broker.publish(topic, event_payload(seq), qos=1)
+        return
+
+    import paho.mqtt.client as mqtt
+    sent = {}
+    lock = threading.Lock()
+
+    def on_publish(client, userdata, mid):
+        with lock:
+            started = sent.pop(mid, None)
+        if started is not None:
+            recorder.record(time.perf_counter() - started)
+
+    client = mqtt.Client(client_id=f"sim-{device}")
+    client.on_publish = on_publish
+    try:
+        client.connect(args.mqtt_host, args.mqtt_port, 60)
+    except OSError:
+        recorder.error()
+        return
+    client.loop_start()
+    for seq, _ in enumerate(paced(args.rate, deadline, stop)):
+        with lock:
+            info = client.publish(topic, event_payload(seq), qos=1)
+            sent[info.mid] = time.perf_counter()
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            recorder.error()
+    time.sleep(0.5)  # esperar los últimos PUBACK
+    client.loop_stop()
+    client.disconnect()
+
+
+# === HTTP ===
+
+def start_inprocess_http(tmp):
+    sys.path.insert(0, os.path.join(ROOT, "reconocimiento", "reconocimiento"))
+    import database
+    database.DB_PATH = os.path.join(tmp, "facelock.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database()
+    import edge_api
+    from werkzeug.serving import make_server
+    import logging
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    server = make_server("127.0.0.1", 0, edge_api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def http_device(device, args, recorder, deadline, stop, base_url):
+    session = requests.Session()
+    for seq, _ in enumerate(paced(args.rate, deadline, stop)):
+        inicio = time.perf_counter()
+        try:
+            # Un usuario distinto por ciclo: el Edge API no encola otro OPEN para una
+            # repetición de (usuario, puerta) dentro de su ventana de coalescencia
+            session.post(f"{base_url}/api/notify-access", json={
+                "user_name": f"user_{seq}", "method": "facial_recognition",
+                "success": True, "confidence": 0.97, "device_id": device,
+            }, timeout=5).raise_for_status()
+            response = session.get(f"{base_url}/api/get-pending-commands",
+                                   params={"device_id": device, "wait": args.poll_wait},
+                                   timeout=args.poll_wait + 5)
+            command = response.text
+            if command == "NONE":
+                recorder.error()
+                continue
+            session.post(f"{base_url}/api/confirm-command", json={
+                "command": command, "status": "executed", "device_id": device,
+                "command_id": int(response.headers.get("X-Command-Id", 0)) or None,
+            }, timeout=5).raise_for_status()
+            recorder.record(time.perf_counter() - inicio)
+        except requests.RequestException:
+            recorder.error()
+    session.close()
+
+
+# === MAIN ===
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de carga de puertas ESP32")
+    parser.add_argument("--devices", type=int, default=20, help="Puertas simuladas")
+    parser.add_argument("--rate", type=float, default=1.0, help="Eventos por segundo por puerta")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duración en segundos")
+    parser.add_argument("--mode", choices=("mqtt", "http", "both"), default="both")
+    parser.add_argument("--inprocess", action="store_true",
+                        help="Broker y Edge API simulados en este proceso (sin servicios externos)")
+    parser.add_argument("--mqtt-host", default="localhost")
+    parser.add_argument("--mqtt-port", type=int, default=1883)
+    parser.add_argument("--http-url", default="http://localhost:5000")
+    parser.add_argument("--poll-wait", type=float, default=5.0, help="Espera del long-poll (s)")
+    args = parser.parse_args()
+
+    mqtt_rec = Recorder("mqtt")
+    http_rec = Recorder("http")
+    stop = threading.Event()
+    shutdowns = []
+    threads = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        broker = None
+        base_url = args.http_url
+        if args.inprocess and args.mode in ("mqtt", "both"):
+            broker, shutdown = start_inprocess_mqtt(mqtt_rec, tmp)
+            shutdowns.append(shutdown)
+        if args.inprocess and args.mode in ("http", "both"):
+            base_url, shutdown = start_inprocess_http(tmp)
+            shutdowns.append(shutdown)
+
+        deadline = time.perf_counter() + args.duration
+        for i in range(args.devices):
+            device = f"door-{i}"
+            if args.mode in ("mqtt", "both"):
+                threads.append(threading.Thread(target=mqtt_device, name=f"mqtt-{device}",
+                                                args=(device, args, mqtt_rec, deadline, stop, broker)))
+            if args.mode in ("http", "both"):
+                threads.append(threading.Thread(target=http_device, name=f"http-{device}",
+                                                args=(device, args, http_rec, deadline, stop, base_url)))
+
+        inicio = time.perf_counter()
+        # Los prints del listener y del API se descartan para no medir la consola
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            try:
+                for thread in threads:
+                    thread.join()
+            except KeyboardInterrupt:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+            elapsed = time.perf_counter() - inicio
+            for shutdown in shutdowns:
+                shutdown()
+
+    print(f"{args.devices} puertas × {args.rate} ev/s durante {elapsed:.1f}s "
+          f"({'en proceso' if args.inprocess else 'servicios locales'})")
+    if args.mode in ("mqtt", "both"):
+        print(mqtt_rec.report(elapsed))
+    if args.mode in ("http", "both"):
+        print(http_rec.report(elapsed))
+
+
+if __name__ == "__main__":
+    main()
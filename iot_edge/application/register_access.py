@@ -6,13 +6,15 @@ class RegisterAccess:
         self.validator = validator
         self.repository = repository
 
-    def execute(self, user_id: str, method: str = "FACE_RECOGNITION"):
+    def execute(self, user_id: str, method: str = "FACE_RECOGNITION", door_id: str = "default", on_saved=None):
+        """Valida y registra el acceso. on_saved(ok) se llama cuando el evento quedó persistido (o se perdió)."""
         result = self.validator.validate(user_id)
         event = AccessEvent(
             user_id=user_id,
             timestamp=datetime.now(),
             result=result,
-            method=method
+            method=method,
+            door_id=door_id
         )
-        self.repository.save(event)
+        self.repository.save(event, on_saved)
         return event
\ No newline at end of file
@@ -0,0 +1,16 @@
+import os
+
+# Base de usuarios compartida con reconocimiento/ (tabla users con is_active)
+USERS_DB_PATH = os.environ.get(
+    "FACELOCK_DB",
+    os.path.join(os.path.dirname(__file__), "..", "..", "reconocimiento", "reconocimiento", "facelock.db"),
+)
+# Cada cuántos segundos se revisa si cambió la tabla users
+USERS_CHECK_INTERVAL = float(os.environ.get("USERS_CHECK_INTERVAL", "1"))
+# Recarga completa periódica opcional (segundos); vacío = desactivada
+USERS_TTL = float(os.environ["USERS_TTL"]) if os.environ.get("USERS_TTL") else None
+# Retención de access_events (vacío = sin límite); ver infrastructure/persistence/retention.py
+EVENTS_DB_PATH = os.environ.get("EVENTS_DB", "access_events.db")
+EVENTS_RETENTION_DAYS = float(os.environ["EVENTS_RETENTION_DAYS"]) if os.environ.get("EVENTS_RETENTION_DAYS") else None
+EVENTS_RETENTION_MAX_ROWS = int(os.environ["EVENTS_RETENTION_MAX_ROWS"]) if os.environ.get("EVENTS_RETENTION_MAX_ROWS") else None
+EVENTS_ARCHIVE_DIR = os.environ.get("EVENTS_ARCHIVE_DIR") or None
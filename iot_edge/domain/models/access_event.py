@@ -6,4 +6,5 @@ class AccessEvent:
     user_id: str
     timestamp: datetime
     result: str
-    method: str
\ No newline at end of file
+    method: str
+    door_id: str = "default"
\ No newline at end of file
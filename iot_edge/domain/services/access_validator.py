@@ -1,5 +1,10 @@
+from collections.abc import Container
+
 class AccessValidator:
-    def __init__(self, authorized_users: list[str]):
+    def __init__(self, authorized_users: Container[str]):
+        # Una lista fija se convierte a frozenset para que la validación sea O(1)
+        if isinstance(authorized_users, (list, tuple, set)):
+            authorized_users = frozenset(authorized_users)
         self.authorized_users = authorized_users
     def validate(self, user_id: str) -> str:
         return "GRANTED" if user_id in self.authorized_users else "DENIED"
\ No newline at end of file
@@ -1,24 +1,204 @@
 import json
+import queue
+import threading
+import time
 import paho.mqtt.client as mqtt
 
+# Políticas cuando la cola de trabajo está llena
+OVERFLOW_BLOCK = "block"              # frena el hilo de red (backpressure hacia el broker)
+OVERFLOW_DROP_NEWEST = "drop_newest"  # descarta el mensaje que acaba de llegar
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # descarta el más antiguo en cola
+
+# esp32/<puerta>/door, más el tópico original de una sola puerta
+DEFAULT_TOPICS = ("esp32/+/door", "esp32/door")
+DEFAULT_DOOR = "default"
+# Intentos de procesar un mensaje que lanzó una excepción antes de confirmarlo como fallido
+HANDLE_ATTEMPTS = 3
+# Espera antes del primer reintento (segundos); se duplica en cada uno
+RETRY_BACKOFF = 0.1
+
 class MQTTListener:
-    def __init__(self, use_case):
+    """Recibe eventos de las puertas y los procesa en un pool de workers.
+
+    on_message solo encola: la decodificación, validación y persistencia
+    corren en los workers, así el loop de red de paho nunca se bloquea por
+    disco. Con QoS 1 el ack al broker se envía recién cuando el evento quedó
+    persistido.
+
+    MQTT exige los PUBACK en el orden de llegada: cada mensaje recibe un
+    número de secuencia y se confirma cuando él y todos los anteriores
+    terminaron. Por eso todo mensaje termina: si no se pudo persistir (tras
+    los reintentos del BatchWriter o HANDLE_ATTEMPTS intentos acá) se
+    confirma igual y se cuenta en failed; si no, la ventana de mensajes en
+    vuelo del broker se llena y el listener deja de recibir.
+    """
+
+    def __init__(self, use_case, host="localhost", port=1883, topics=DEFAULT_TOPICS,
+                 qos=1, workers=4, max_pending=1000, overflow=OVERFLOW_BLOCK,
+                 block_timeout=1.0, client_id="iot-edge-listener"):
         self.use_case = use_case
+        self.host = host
+        self.port = port
+        self.topics = topics
+        self.qos = qos
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.client_id = client_id
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+        self._counter_lock = threading.Lock()
+        # Orden de acks: próximo número a asignar, próximo a confirmar y terminados fuera de orden
+        self._ack_lock = threading.Lock()
+        self._next_seq = 0
+        self._ack_seq = 0
+        self._finished = {}
+        self._workers = [
+            threading.Thread(target=self._work, name=f"mqtt-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self.client = None
 
-    def on_connect(self, client, userdata, flags, rc):
+    @staticmethod
+    def door_from_topic(topic):
+        parts = topic.split("/")
+        return parts[1] if len(parts) == 3 else DEFAULT_DOOR
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            print(f"Conexión MQTT rechazada: {reason_code}")
+            return
         print("Connected to MQTT")
-        client.subscribe("esp32/door")
+        client.subscribe([(topic, self.qos) for topic in self.topics])
 
     def on_message(self, client, userdata, msg):
+        # Corre en el hilo de red: el número de secuencia sigue el orden de llegada
+        with self._ack_lock:
+            item = (self._next_seq, msg)
+            self._next_seq += 1
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        if self.overflow == OVERFLOW_BLOCK:
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        elif self.overflow == OVERFLOW_DROP_OLDEST:
+            try:
+                oldest = self.queue.get_nowait()
+                self._count_drop(oldest[1])
+                self._finish(client, *oldest)
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+
+        # Se confirma igual para que el broker no lo reenvíe en bucle
+        self._count_drop(msg)
+        self._finish(client, *item)
+
+    def _count_drop(self, msg):
+        with self._counter_lock:
+            self.dropped += 1
+        print(f"⚠ Cola llena ({self.queue.maxsize}); mensaje descartado de {msg.topic}")
+
+    def _count_failure(self, msg, reason):
+        with self._counter_lock:
+            self.failed += 1
+        print(f"⚠ Mensaje de {msg.topic} confirmado sin persistir: {reason}")
+
+    def _ack(self, client, msg):
+        if msg.qos > 0:
+            client.ack(msg.mid, msg.qos)
+
+    def _finish(self, client, seq, msg):
+        """Marca el mensaje como terminado y confirma, en orden, todos los que ya pueden confirmarse."""
+        with self._ack_lock:
+            self._finished[seq] = msg
+            while self._ack_seq in self._finished:
+                self._ack(client, self._finished.pop(self._ack_seq))
+                self._ack_seq += 1
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            seq, msg = item
+            client = self.client
+            backoff = RETRY_BACKOFF
+            try:
+                for attempt in range(1, HANDLE_ATTEMPTS + 1):
+                    try:
+                        self.handle(msg, on_done=lambda ok, seq=seq, msg=msg: self._done(client, seq, msg, ok))
+                        break
+                    except ValueError as e:
+                        # JSON inválido: reintentarlo no lo va a arreglar
+                        self._count_failure(msg, f"payload inválido ({e})")
+                        self._finish(client, seq, msg)
+                        break
+                    except Exception as e:
+                        print(f"Error procesando mensaje de {msg.topic} (intento {attempt}): {e}")
+                        if attempt == HANDLE_ATTEMPTS:
+                            self._count_failure(msg, e)
+                            self._finish(client, seq, msg)
+                        else:
+                            time.sleep(backoff)
+                            backoff *= 2
+            finally:
+                self.queue.task_done()
+
+    def _done(self, client, seq, msg, ok):
+        # Lo llama el repositorio cuando el lote quedó escrito (ok) o se dio por perdido
+        if not ok:
+            self._count_failure(msg, "el repositorio no pudo escribirlo")
+        self._finish(client, seq, msg)
+
+    def handle(self, msg, on_done=None):
+        """Procesa un mensaje; on_done(ok) se llama al persistirlo (por defecto, ack directo)."""
         data = json.loads(msg.payload.decode())
         user_id = data.get("user_id")
         method = data.get("method", "FACE_RECOGNITION")
-        event = self.use_case.execute(user_id, method)
-        print(f"[{event.timestamp}] {event.user_id} - {event.result}")
+        door_id = self.door_from_topic(msg.topic)
+        if on_done is None:
+            client = self.client
+            on_done = lambda ok: self._ack(client, msg)
+        event = self.use_case.execute(user_id, method, door_id, on_saved=on_done)
+        with self._counter_lock:
+            self.processed += 1
+        print(f"[{event.timestamp}] {event.door_id} {event.user_id} - {event.result}")
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def start_workers(self):
+        for worker in self._workers:
+            worker.start()
+
+    def stop_workers(self):
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join()
 
     def start(self):
-        client = mqtt.Client()
-        client.on_connect = self.on_connect
-        client.on_message = self.on_message
-        client.connect("localhost", 1883, 60)
-        client.loop_forever()
\ No newline at end of file
+        # clean_session=False + ack manual: lo no confirmado se reenvía al reconectar
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id,
+                                  clean_session=False, manual_ack=True)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.start_workers()
+        self.client.connect(self.host, self.port, 60)
+        try:
+            self.client.loop_forever()
+        finally:
+            self.stop_workers()
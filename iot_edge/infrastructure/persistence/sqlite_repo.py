@@ -1,22 +1,87 @@
 import sqlite3
 from iot_edge.domain.models.access_event import AccessEvent
+from .batch_writer import BatchWriter
 
 class SQLiteAccessRepository:
     def __init__(self, db_path="access_events.db"):
         self.conn = sqlite3.connect(db_path)
+        # Solo aplica a bases nuevas: la retención puede devolver al disco el espacio podado
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
         self.conn.execute('''
             CREATE TABLE IF NOT EXISTS access_events (
                 user_id TEXT,
                 timestamp TEXT,
                 result TEXT,
-                method TEXT
-            )        
+                method TEXT,
+                door_id TEXT DEFAULT 'default'
+            )
         ''')
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(access_events)")}
+        if "door_id" not in columns:
+            # Bases creadas antes de soportar varias puertas
+            self.conn.execute("ALTER TABLE access_events ADD COLUMN door_id TEXT DEFAULT 'default'")
         self.conn.commit()
 
-    def save(self, event: AccessEvent):
+    def save(self, event: AccessEvent, on_saved=None):
         self.conn.execute(
-            "INSERT INTO access_events VALUES (?, ?, ?, ?)",
-            (event.user_id, event.timestamp, event.result, event.method)
+            "INSERT INTO access_events (user_id, timestamp, result, method, door_id) VALUES (?, ?, ?, ?, ?)",
+            (event.user_id, event.timestamp, event.result, event.method, event.door_id)
         )
-        self.conn.commit()
\ No newline at end of file
+        self.conn.commit()
+        if on_saved:
+            on_saved(True)
+
+    def save_many(self, events: list[AccessEvent]):
+        """Inserta todos los eventos en una sola transacción."""
+        try:
+            self.conn.executemany(
+                "INSERT INTO access_events (user_id, timestamp, result, method, door_id) VALUES (?, ?, ?, ?, ?)",
+                [(e.user_id, e.timestamp, e.result, e.method, e.door_id) for e in events]
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            # Sin filas a medias: el BatchWriter reintenta el lote entero
+            self.conn.rollback()
+            raise
+
+class BatchingSQLiteAccessRepository:
+    """Repositorio que encola los eventos y los escribe por lotes desde un hilo propio.
+
+    save() retorna de inmediato; ante un crash se pierde como máximo una
+    ventana de flush (max_batch eventos o flush_interval_ms). Los lotes que
+    no se pudieron escribir tras los reintentos quedan en <db>.failed.jsonl.
+    """
+
+    def __init__(self, db_path="access_events.db", max_batch=100, flush_interval_ms=50):
+        self.db_path = db_path
+        self._repo = None
+        # La conexión se abre dentro del hilo escritor (sqlite3 no comparte conexiones entre hilos)
+        self.writer = BatchWriter(self._write, max_batch, flush_interval_ms,
+                                  setup=self._open, name="access-events-writer",
+                                  dead_letter=f"{db_path}.failed.jsonl")
+
+    def _open(self):
+        self._repo = SQLiteAccessRepository(self.db_path)
+
+    def _write(self, events: list[AccessEvent]):
+        self._repo.save_many(events)
+
+    def save(self, event: AccessEvent, on_saved=None) -> bool:
+        """Encola el evento; on_saved(ok) se llama cuando su lote quedó escrito o se dio por perdido.
+
+        Con la cola llena el evento se descarta: devuelve False y on_saved(False) se llama en el acto.
+        """
+        if self.writer.put(event, on_saved):
+            return True
+        if on_saved:
+            on_saved(False)
+        return False
+
+    def queue_depth(self) -> int:
+        return self.writer.queue_depth()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        return self.writer.flush(timeout)
+
+    def close(self):
+        self.writer.close()
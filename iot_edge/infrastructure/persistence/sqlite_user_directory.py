@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+import time
+
+class SQLiteUserDirectory:
+    """Usuarios activos de la tabla users (facelock.db) cacheados en un frozenset.
+
+    `user_id in directory` es O(1) y nunca consulta la base. Un hilo en
+    segundo plano revisa users_version cada check_interval segundos y recarga
+    el set cuando cambió; con ttl se fuerza además una recarga completa
+    periódica. El set nuevo se publica con una sola asignación.
+
+    Solo lee: users y users_version los crea reconocimiento/database.py
+    (MIGRATIONS). Si todavía no existen, el set queda vacío; sin
+    users_version (base sin migrar) se recarga en cada revisión.
+    """
+
+    def __init__(self, db_path: str, check_interval: float = 1.0, ttl: float | None = None):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self._users: frozenset[str] = frozenset()
+        self.version = None
+        self._loaded_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __contains__(self, user_id) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _current_version(self, conn) -> int | None:
+        try:
+            row = conn.execute("SELECT version FROM users_version WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None  # facelock.db todavía sin la migración 4
+        return row[0] if row else None
+
+    def reload(self, conn) -> None:
+        # Versión y usuarios leídos en la misma transacción para que sean consistentes
+        conn.execute("BEGIN")
+        try:
+            version = self._current_version(conn)
+            try:
+                users = frozenset(row[0] for row in conn.execute("SELECT name FROM users WHERE is_active = 1"))
+            except sqlite3.OperationalError:
+                users = frozenset()  # reconocimiento todavía no creó la tabla users
+        finally:
+            conn.rollback()
+        self._users = users
+        self.version = version
+        self._loaded_at = time.monotonic()
+
+    def refresh_if_changed(self, conn) -> bool:
+        """Recarga si cambió la versión o venció el TTL. Devuelve True si recargó."""
+        expired = self.ttl is not None and time.monotonic() - self._loaded_at >= self.ttl
+        version = self._current_version(conn)
+        if expired or version is None or version != self.version:
+            self.reload(conn)
+            return True
+        return False
+
+    def start(self):
+        conn = self._connect()
+        try:
+            self.reload(conn)
+        finally:
+            conn.close()
+        self._thread = threading.Thread(target=self._run, name="user-directory", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while not self._stop.wait(self.check_interval):
+                try:
+                    self.refresh_if_changed(conn)
+                except sqlite3.Error as e:
+                    print(f"Error refrescando usuarios autorizados: {e}")
+        finally:
+            conn.close()
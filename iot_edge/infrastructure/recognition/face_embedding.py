@@ -0,0 +1,75 @@
+# Copia de reconocimiento/reconocimiento/face_embedding.py: iot_edge se instala y despliega sin
+# reconocimiento/, así que no la importa de ahí. Un cambio en una va también en la otra.
+import numpy as np
+import mediapipe as mp
+
+from .face_index import EMBEDDING_DIM
+
+# Landmarks de FaceMesh estables entre expresiones: ojos, nariz, boca, mentón, frente y mejillas
+LANDMARKS_CLAVE = [33, 133, 362, 263, 1, 168, 98, 327, 61, 291, 13, 14, 152, 10, 234, 454]
+OJO_DERECHO, OJO_IZQUIERDO = 0, 3
+# Margen alrededor del bbox para que FaceMesh vea el rostro completo
+MARGEN_RECORTE = 0.25
+
+_PARES = np.triu_indices(len(LANDMARKS_CLAVE), k=1)
+assert len(_PARES[0]) == EMBEDDING_DIM
+
+
+def embedding_from_landmarks(landmarks):
+    """Convierte los landmarks de FaceMesh en distancias relativas a la distancia entre ojos."""
+    puntos = np.array([(landmarks[i].x, landmarks[i].y, landmarks[i].z) for i in LANDMARKS_CLAVE], dtype=np.float32)
+    distancias = np.linalg.norm(puntos[:, None, :] - puntos[None, :, :], axis=2)[_PARES]
+    entre_ojos = distancias_entre(puntos, OJO_DERECHO, OJO_IZQUIERDO)
+    if entre_ojos > 0:
+        distancias /= entre_ojos
+    # Centrado: la similitud coseno pasa a medir la forma del perfil de distancias
+    return distancias - distancias.mean()
+
+
+def distancias_entre(puntos, a, b):
+    return float(np.linalg.norm(puntos[a] - puntos[b]))
+
+
+def recortar(frame, bbox, margen=MARGEN_RECORTE):
+    """Recorta la región del rostro (bbox relativo xmin, ymin, ancho, alto) con margen."""
+    ih, iw = frame.shape[:2]
+    xmin, ymin, width, height = bbox
+    x1 = max(int((xmin - width * margen) * iw), 0)
+    y1 = max(int((ymin - height * margen) * ih), 0)
+    x2 = min(int((xmin + width * (1 + margen)) * iw), iw)
+    y2 = min(int((ymin + height * (1 + margen)) * ih), ih)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return frame[y1:y2, x1:x2]
+
+
+class FaceEmbedder:
+    """Calcula embeddings de rostro con FaceMesh sobre recortes de cada detección."""
+
+    def __init__(self):
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            min_detection_confidence=0.5,
+        )
+
+    def embed(self, rgb_frame, bboxes):
+        """Devuelve una matriz (len(bboxes), EMBEDDING_DIM); filas en cero si no hay malla."""
+        embeddings = np.zeros((len(bboxes), EMBEDDING_DIM), dtype=np.float32)
+        for i, bbox in enumerate(bboxes):
+            recorte = recortar(rgb_frame, bbox)
+            if recorte is None:
+                continue
+            results = self.face_mesh.process(np.ascontiguousarray(recorte))
+            if results.multi_face_landmarks:
+                embeddings[i] = embedding_from_landmarks(results.multi_face_landmarks[0].landmark)
+        return embeddings
+
+    def close(self):
+        self.face_mesh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,327 @@
+# Copia de reconocimiento/reconocimiento/face_store.py: iot_edge se instala y despliega sin
+# reconocimiento/, así que no la importa de ahí. Un cambio en una va también en la otra.
+"""Almacén de rostros enrolados: vectores float32 mapeados en memoria + log de metadatos.
+
+Estructura del directorio:
+  CURRENT              generación vigente (se reemplaza con os.replace)
+  vectors-<gen>.f32    filas de EMBEDDING_DIM float32 ya normalizadas, solo se agregan
+  meta-<gen>.jsonl     una cabecera y una línea por operación:
+                       {"add": nombre, "row": fila, "info": {...}} o {"del": nombre}
+
+Cada alta escribe primero el vector y después la línea de metadatos, con
+fsync en ambos: una fila sin su línea se ignora y una línea cortada al
+final se descarta al reparar. Las bajas son tombstones; compact() reescribe
+una generación nueva solo con las filas vivas y cambia CURRENT de forma
+atómica. Leer es mapear el archivo de vectores (sin copia) y aplicar las
+líneas de metadatos que todavía no se habían leído.
+
+Las escrituras (altas, bajas, compactación) toman un flock exclusivo sobre
+LOCK: la app y enroll.py pueden escribir el mismo almacén sin pisarse. Los
+lectores no toman el lock. El directorio se crea con la primera escritura;
+un FaceStore de solo lectura nunca lo crea y, si no existe, se ve vacío.
+"""
+import json
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos, un escritor a la vez por convención
+    fcntl = None
+
+import numpy as np
+
+from .face_index import EMBEDDING_DIM, normalizar
+
+FORMAT_VERSION = 1
+# Compactar cuando las filas borradas superan esta fracción (y este mínimo absoluto)
+COMPACT_RATIO = 0.25
+COMPACT_MIN_ROWS = 64
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows no permite abrir directorios
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@dataclass(frozen=True)
+class StoreView:
+    """Foto del almacén: matriz de filas vivas (vista del mmap si no hay bajas) y sus nombres."""
+    names: tuple
+    matrix: np.ndarray
+    data: dict
+    rows: int
+    deleted: int
+
+
+class FaceStore:
+    """Almacén append-only con un escritor a la vez (flock); las lecturas son incrementales."""
+
+    def __init__(self, directory, dim=EMBEDDING_DIM, read_only=False):
+        self.directory = os.path.abspath(directory)
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.read_only = read_only
+        self._write_lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._reset(None)
+
+    # === Rutas y estado ===
+
+    def _path(self, kind, generation):
+        ext = "f32" if kind == "vectors" else "jsonl"
+        return os.path.join(self.directory, f"{kind}-{generation}.{ext}")
+
+    def _current_path(self):
+        return os.path.join(self.directory, "CURRENT")
+
+    def _read_generation(self):
+        try:
+            with open(self._current_path()) as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _reset(self, generation):
+        self.generation = generation
+        self._offset = 0
+        self._row_names = []
+        self._deleted_rows = set()
+        self._rows_by_name = {}
+        self._data = {}
+
+    def signature(self):
+        """Cambia con cada alta, baja o compactación (para detectar cambios sin leer)."""
+        generation = self._read_generation()
+        if generation is None:
+            return None
+        try:
+            return generation, os.stat(self._path("meta", generation)).st_size
+        except FileNotFoundError:
+            return generation, None
+
+    # === Lectura ===
+
+    def _apply(self, ops):
+        row_names = self._row_names
+        rows_by_name = self._rows_by_name
+        data = self._data
+        for op in ops:
+            name = op.get("add")
+            if name is not None:
+                row = op["row"]
+                if row != len(row_names):
+                    raise ValueError(f"Fila {row} fuera de orden en el log de metadatos.")
+                row_names.append(name)
+                rows_by_name.setdefault(name, []).append(row)
+                data[name] = op.get("info", {})
+            elif "del" in op:
+                name = op["del"]
+                self._deleted_rows.update(rows_by_name.pop(name, ()))
+                data.pop(name, None)
+            elif op.get("format") != FORMAT_VERSION or op.get("dim") != self.dim:
+                raise ValueError(f"Formato de almacén no soportado: {op}")
+
+    def _read_meta(self):
+        """Aplica las líneas agregadas desde la última lectura; ignora una línea final incompleta."""
+        generation = self._read_generation()
+        if generation != self.generation:
+            self._reset(generation)
+        if generation is None:
+            return
+        with open(self._path("meta", generation), "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return
+        # Un solo json.loads para todo el tramo nuevo: decodificar línea por línea es ~5x más lento
+        self._apply(json.loads(b"[" + chunk[:end - 1].replace(b"\n", b",") + b"]"))
+        self._offset += end
+
+    def load(self):
+        """Devuelve la vista actual; solo lee las operaciones nuevas del log."""
+        self._read_meta()
+        rows = len(self._row_names)
+        if rows == 0:
+            matrix = np.zeros((0, self.dim), dtype=np.float32)
+        else:
+            # Una fila escrita sin su línea de metadatos queda fuera por el shape
+            matrix = np.memmap(self._path("vectors", self.generation), dtype=np.float32,
+                               mode="r", shape=(rows, self.dim))
+        names = self._row_names
+        if self._deleted_rows:
+            alive = np.ones(rows, dtype=bool)
+            alive[list(self._deleted_rows)] = False
+            matrix = np.ascontiguousarray(matrix[alive])
+            names = [n for n, keep in zip(names, alive) if keep]
+        return StoreView(tuple(names), matrix, dict(self._data), rows, len(self._deleted_rows))
+
+    def __len__(self):
+        self._read_meta()
+        return len(self._row_names) - len(self._deleted_rows)
+
+    # === Escritura ===
+
+    @contextmanager
+    def writing(self):
+        """Exclusión entre escritores (flock sobre LOCK); anidable, para agrupar varias escrituras."""
+        if self.read_only:
+            raise PermissionError(f"Almacén de rostros de solo lectura: {self.directory}")
+        with self._write_lock:
+            if self._lock_depth == 0:
+                os.makedirs(self.directory, exist_ok=True)
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(os.path.join(self.directory, "LOCK"), "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _ensure_generation(self):
+        if self._read_generation() is not None:
+            return
+        generation = 1
+        with open(self._path("vectors", generation), "wb") as f:
+            os.fsync(f.fileno())
+        with open(self._path("meta", generation), "wb") as f:
+            f.write(self._header())
+            os.fsync(f.fileno())
+        self._write_current(generation)
+
+    def _header(self):
+        return (json.dumps({"format": FORMAT_VERSION, "dim": self.dim}) + "\n").encode()
+
+    def _write_current(self, generation):
+        tmp_path = f"{self._current_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._current_path())
+        _fsync_dir(self.directory)
+
+    def _repair(self):
+        """Descarta restos de una escritura interrumpida antes de agregar."""
+        self._read_meta()
+        meta_path = self._path("meta", self.generation)
+        size = os.path.getsize(meta_path)
+        if size > self._offset:
+            with open(meta_path, "r+b") as f:
+                f.truncate(self._offset)
+        vectors_path = self._path("vectors", self.generation)
+        expected = len(self._row_names) * self.row_bytes
+        if os.path.getsize(vectors_path) != expected:
+            with open(vectors_path, "r+b") as f:
+                f.truncate(expected)
+
+    def append_many(self, entries):
+        """Agrega [(nombre, embedding, info)] con un fsync por archivo para todo el lote."""
+        entries = list(entries)
+        if not entries:
+            return
+        vectors = normalizar([embedding for _, embedding, _ in entries])
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimensión {vectors.shape[1]} distinta a la del almacén ({self.dim}).")
+
+        with self.writing():
+            self._ensure_generation()
+            # Con el lock tomado: incluye lo que otro escritor agregó desde la última lectura
+            self._repair()
+            first_row = len(self._row_names)
+            with open(self._path("vectors", self.generation), "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            lines = b"".join(
+                (json.dumps({"add": name, "row": first_row + i, "info": info}, default=str) + "\n").encode()
+                for i, (name, _, info) in enumerate(entries)
+            )
+            self._append_meta(lines)
+
+    def append(self, name, embedding, info):
+        self.append_many([(name, embedding, info)])
+
+    def delete(self, names):
+        """Marca como borrados todos los vectores de esos nombres (tombstones)."""
+        with self.writing():
+            self._read_meta()
+            names = [n for n in names if n in self._rows_by_name]
+            if not names:
+                return
+            self._repair()
+            self._append_meta(b"".join((json.dumps({"del": n}) + "\n").encode() for n in names))
+
+    def _append_meta(self, lines):
+        with open(self._path("meta", self.generation), "ab") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._read_meta()
+
+    def needs_compaction(self):
+        self._read_meta()
+        deleted = len(self._deleted_rows)
+        return deleted >= COMPACT_MIN_ROWS and deleted > len(self._row_names) * COMPACT_RATIO
+
+    def compact(self):
+        """Reescribe solo las filas vivas en una generación nueva y la publica con un rename."""
+        with self.writing():
+            view = self.load()
+            old = self.generation
+            if old is None:
+                return
+            new = old + 1
+            with open(self._path("vectors", new), "wb") as f:
+                f.write(np.ascontiguousarray(view.matrix, dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._path("meta", new), "wb") as f:
+                f.write(self._header())
+                f.write(b"".join(
+                    (json.dumps({"add": name, "row": row, "info": view.data.get(name, {})}, default=str) + "\n").encode()
+                    for row, name in enumerate(view.names)
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_current(new)
+            self._read_meta()
+            self._remove_old_generations()
+
+    def _remove_old_generations(self):
+        for entry in os.scandir(self.directory):
+            stem, _, _ = entry.name.partition(".")
+            kind, _, generation = stem.partition("-")
+            if kind in ("vectors", "meta") and generation.isdigit() and int(generation) < self.generation:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass  # en Windows un lector puede tenerlo mapeado; se reintenta en la próxima compactación
+
+    # === Migración ===
+
+    def import_pickle(self, pickle_path):
+        """Importa el antiguo known_faces.pkl (embeddings, nombres, datos). Devuelve cuántos importó."""
+        with open(pickle_path, "rb") as f:
+            embeddings, names, data = pickle.load(f)
+        # Los pickles más antiguos guardaban bboxes (4 valores); esos rostros deben re-registrarse
+        entries = [(name, embedding, data.get(name, {}))
+                   for embedding, name in zip(embeddings, names) if len(embedding) == self.dim]
+        self.append_many(entries)
+        return len(entries)
@@ -0,0 +1,153 @@
+# Copia de reconocimiento/reconocimiento/tracing.py: iot_edge se instala y despliega sin
+# reconocimiento/, así que no la importa de ahí. Un cambio en una va también en la otra.
+"""Trazas por frame del loop de reconocimiento en formato Chrome trace-event.
+
+Activado, cada etapa de cada frame (captura, detección, matcher, dibujo,
+notificación, recarga de rostros, imshow...) queda como un span en un ring
+buffer en memoria. dump() escribe los últimos TRACE_WINDOW segundos a un
+JSON que se abre en chrome://tracing o en https://ui.perfetto.dev. Con
+slow_frame_ms, un frame más lento que ese umbral dispara el volcado solo.
+
+Desactivado, span() devuelve un context manager vacío compartido: el costo
+es una llamada y un if por etapa.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Segundos previos que se incluyen en cada volcado
+TRACE_WINDOW = 5.0
+# Spans guardados como máximo (~60 s a 30 fps con ~10 etapas por frame)
+MAX_EVENTS = 20000
+# Carpeta de los volcados
+TRACE_DIR = "traces"
+# Tras un volcado automático no se vuelve a volcar hasta pasado este tiempo (segundos)
+SLOW_DUMP_COOLDOWN = 10.0
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start", "args")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _FrameSpan(_Span):
+    __slots__ = ()
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer._record(self.name, self.start, end, self.args)
+        self.tracer._end_frame((end - self.start) / 1e6)
+        return False
+
+
+class FrameTracer:
+    """Ring buffer de spans; se vuelca a Chrome trace JSON a pedido o ante un frame lento."""
+
+    def __init__(self, enabled=False, slow_frame_ms=None, output_dir=TRACE_DIR,
+                 window=TRACE_WINDOW, max_events=MAX_EVENTS):
+        self.enabled = enabled
+        self.slow_frame_ms = slow_frame_ms
+        self.output_dir = output_dir
+        self.window = window
+        self.frame_id = 0
+        self.dumps = []
+        self._events = deque(maxlen=max_events)
+        self._last_auto_dump = 0.0
+        self._origin = time.perf_counter_ns()
+
+    def enable(self, slow_frame_ms=None, output_dir=None):
+        self.slow_frame_ms = slow_frame_ms
+        if output_dir:
+            self.output_dir = output_dir
+        self.enabled = True
+        return self
+
+    def span(self, name, **args):
+        """Context manager que registra la etapa (no hace nada si el trazado está apagado)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def frame(self, **args):
+        """Span de un frame completo; al cerrarse evalúa el disparador de frame lento."""
+        if not self.enabled:
+            return _NULL_SPAN
+        args["frame"] = self.frame_id
+        return _FrameSpan(self, "frame", args)
+
+    def _record(self, name, start, end, args):
+        # deque.append es atómico: varios hilos (captura, notificador, watcher) graban sin lock
+        self._events.append((name, start, end, threading.get_ident(), args))
+
+    def _end_frame(self, duration_ms):
+        self.frame_id += 1
+        if self.slow_frame_ms is None or duration_ms < self.slow_frame_ms:
+            return
+        now = time.monotonic()
+        if now - self._last_auto_dump < SLOW_DUMP_COOLDOWN:
+            return
+        self._last_auto_dump = now
+        # Se copia el buffer acá y se serializa en otro hilo para no alargar más el frame lento
+        events = list(self._events)
+        threading.Thread(target=self._write, args=(events, f"slow{int(duration_ms)}ms"),
+                         name="trace-dump", daemon=True).start()
+
+    def dump(self, reason="manual"):
+        """Escribe los últimos `window` segundos; devuelve la ruta del archivo o None si no hay spans."""
+        return self._write(list(self._events), reason)
+
+    def _write(self, events, reason):
+        if not events:
+            return None
+        since = max(end for _, _, end, _, _ in events) - int(self.window * 1e9)
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        pid = os.getpid()
+        spans = [
+            {"name": name, "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - self._origin) / 1000, "dur": (end - start) / 1000, "args": args}
+            for name, start, end, tid, args in events if end >= since
+        ]
+        threads = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+             "args": {"name": thread_names.get(tid, str(tid))}}
+            for tid in {span["tid"] for span in spans}
+        ]
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{reason}.json")
+        with open(path, "w") as f:
+            json.dump({"traceEvents": threads + spans, "displayTimeUnit": "ms"}, f, default=str)
+        self.dumps.append(path)
+        print(f"🧵 Traza guardada en {path} ({len(spans)} spans)")
+        return path
+
+
+# Trazador del proceso (apagado hasta enable())
+TRACER = FrameTracer()
@@ -1,14 +1,30 @@
+from config import (USERS_DB_PATH, USERS_CHECK_INTERVAL, USERS_TTL, EVENTS_DB_PATH,
+                    EVENTS_RETENTION_DAYS, EVENTS_RETENTION_MAX_ROWS, EVENTS_ARCHIVE_DIR)
 from domain.services.access_validator import AccessValidator
-from infrastructure.persistence.sqlite_repo import SQLiteAccessRepository
+from infrastructure.persistence.retention import RetentionJob
+from infrastructure.persistence.sqlite_repo import BatchingSQLiteAccessRepository
+from infrastructure.persistence.sqlite_user_directory import SQLiteUserDirectory
 from application.register_access import RegisterAccess
 from infrastructure.messaging.mqtt_listener import MQTTListener
 
-AUTHORIZED_USERS = ["alejandro", "carmen", "juan"]
-
 if __name__ == "__main__":
-    validator = AccessValidator(AUTHORIZED_USERS)
-    repo = SQLiteAccessRepository()
+    # Usuarios activos de facelock.db, cacheados en memoria y refrescados en segundo plano
+    users = SQLiteUserDirectory(USERS_DB_PATH, USERS_CHECK_INTERVAL, USERS_TTL).start()
+    validator = AccessValidator(users)
+    repo = BatchingSQLiteAccessRepository(EVENTS_DB_PATH)
+    retention = None
+    if EVENTS_RETENTION_DAYS is not None or EVENTS_RETENTION_MAX_ROWS is not None:
+        # access_events guarda hora local (str(datetime.now()))
+        retention = RetentionJob(EVENTS_DB_PATH, "access_events", max_age_days=EVENTS_RETENTION_DAYS,
+                                 max_rows=EVENTS_RETENTION_MAX_ROWS, archive_dir=EVENTS_ARCHIVE_DIR,
+                                 utc=False).start()
     use_case = RegisterAccess(validator, repo)
 
     listener = MQTTListener(use_case)
-    listener.start()
+    try:
+        listener.start()
+    finally:
+        repo.close()  # escribe los eventos que queden en cola
+        users.stop()
+        if retention:
+            retention.stop()
@@ -0,0 +1,127 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from iot_edge.infrastructure.messaging import mqtt_listener
+from iot_edge.infrastructure.messaging.mqtt_listener import OVERFLOW_DROP_NEWEST, MQTTListener
+
+
+class FakeMessage:
+    def __init__(self, mid, payload=None, topic="esp32/puerta/door"):
+        self.mid = mid
+        self.topic = topic
+        self.payload = payload if payload is not None else json.dumps({"user_id": f"user_{mid}"}).encode()
+        self.qos = 1
+
+
+class FakeClient:
+    """Sustituto del cliente paho: guarda los mid confirmados en orden."""
+
+    def __init__(self):
+        self.acked = []
+        self._cond = threading.Condition()
+
+    def ack(self, mid, qos):
+        with self._cond:
+            self.acked.append(mid)
+            self._cond.notify_all()
+
+    def wait_acks(self, n, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.acked) >= n, timeout), self.acked
+            return list(self.acked)
+
+
+class DeferredUseCase:
+    """Guarda el on_saved de cada evento: el test decide cuándo y cómo termina cada uno."""
+
+    def __init__(self):
+        self.pending = {}
+        self._cond = threading.Condition()
+
+    def execute(self, user_id, method, door_id, on_saved=None):
+        with self._cond:
+            self.pending[user_id] = on_saved
+            self._cond.notify_all()
+        return SimpleNamespace(timestamp="-", door_id=door_id, user_id=user_id, result="GRANTED")
+
+    def wait_pending(self, n, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.pending) >= n, timeout)
+
+
+@pytest.fixture
+def listener():
+    listener = MQTTListener(DeferredUseCase(), workers=4)
+    listener.client = FakeClient()
+    yield listener
+    listener.stop_workers()
+
+
+def test_acks_follow_arrival_order_when_events_finish_out_of_order(listener):
+    client, use_case = listener.client, listener.use_case
+    listener.start_workers()
+    for mid in range(5):
+        listener.on_message(client, None, FakeMessage(mid))
+    use_case.wait_pending(5)
+
+    for mid in (4, 3, 2, 1):
+        use_case.pending[f"user_{mid}"](True)
+    assert client.acked == []
+
+    use_case.pending["user_0"](True)
+    assert client.wait_acks(5) == [0, 1, 2, 3, 4]
+
+
+def test_failed_write_is_acked_and_counted(listener):
+    client, use_case = listener.client, listener.use_case
+    listener.start_workers()
+    listener.on_message(client, None, FakeMessage(0))
+    listener.on_message(client, None, FakeMessage(1))
+    use_case.wait_pending(2)
+
+    use_case.pending["user_1"](True)
+    use_case.pending["user_0"](False)
+    assert client.wait_acks(2) == [0, 1]
+    assert listener.failed == 1
+
+
+def test_invalid_payload_and_repeated_errors_do_not_block_later_acks(monkeypatch):
+    monkeypatch.setattr(mqtt_listener, "RETRY_BACKOFF", 0)
+    calls = []
+
+    class FailingUseCase:
+        def execute(self, user_id, method, door_id, on_saved=None):
+            calls.append(user_id)
+            raise RuntimeError("base no disponible")
+
+    listener = MQTTListener(FailingUseCase(), workers=1)
+    client = listener.client = FakeClient()
+    listener.start_workers()
+    try:
+        listener.on_message(client, None, FakeMessage(0, payload=b"{no es json"))
+        listener.on_message(client, None, FakeMessage(1))
+        assert client.wait_acks(2) == [0, 1]
+    finally:
+        listener.stop_workers()
+    assert listener.failed == 2
+    assert calls == ["user_1"] * mqtt_listener.HANDLE_ATTEMPTS
+
+
+def test_dropped_message_waits_for_earlier_ones_before_its_ack():
+    listener = MQTTListener(DeferredUseCase(), workers=1, max_pending=1, overflow=OVERFLOW_DROP_NEWEST)
+    client = listener.client = FakeClient()
+    listener.on_message(client, None, FakeMessage(0))
+    listener.on_message(client, None, FakeMessage(1))  # cola llena: se descarta
+    assert listener.dropped == 1
+    assert client.acked == []
+
+    listener.start_workers()
+    try:
+        listener.use_case.wait_pending(1)
+        listener.use_case.pending["user_0"](True)
+        assert client.wait_acks(2) == [0, 1]
+    finally:
+        listener.stop_workers()
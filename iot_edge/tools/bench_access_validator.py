@@ -0,0 +1,90 @@
+"""Benchmark de AccessValidator con 100k usuarios: lista fija (antes) vs. directorio cacheado (ahora).
+
+Uso (desde la raíz del repo): python -m iot_edge.tools.bench_access_validator [--users 100000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from iot_edge.domain.services.access_validator import AccessValidator
+from iot_edge.infrastructure.persistence.sqlite_user_directory import SQLiteUserDirectory
+
+# Lo que SQLiteUserDirectory lee de facelock.db: users y users_version con sus triggers,
+# igual que los crean las migraciones de reconocimiento/database.py
+USERS_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        age INTEGER,
+        pin TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1
+    );
+    CREATE TABLE users_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL);
+    INSERT INTO users_version (id, version) VALUES (1, 0);
+    CREATE TRIGGER users_version_insert AFTER INSERT ON users
+        BEGIN UPDATE users_version SET version = version + 1 WHERE id = 1; END;
+    CREATE TRIGGER users_version_update AFTER UPDATE ON users
+        BEGIN UPDATE users_version SET version = version + 1 WHERE id = 1; END;
+    CREATE TRIGGER users_version_delete AFTER DELETE ON users
+        BEGIN UPDATE users_version SET version = version + 1 WHERE id = 1; END;
+"""
+
+
+def create_users_db(path, n):
+    conn = sqlite3.connect(path)
+    conn.executescript(USERS_SCHEMA)
+    conn.executemany("INSERT INTO users (name, is_active) VALUES (?, ?)",
+                     ((f"user_{i}", int(i % 10 != 0)) for i in range(n)))
+    conn.commit()
+    conn.close()
+
+
+def lookups_per_second(validator, ids, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    inicio = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for user_id in ids:
+            validator.validate(user_id)
+        count += len(ids)
+    return count / (time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    # Mitad de consultas a usuarios existentes, mitad a desconocidos (peor caso de la lista)
+    ids = [f"user_{i * 7919 % args.users}" for i in range(500)] + [f"intruso_{i}" for i in range(500)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "facelock.db")
+        create_users_db(db_path, args.users)
+
+        directory = SQLiteUserDirectory(db_path).start()
+        active = [f"user_{i}" for i in range(args.users) if i % 10 != 0]
+
+        # La lista se usa tal cual (antes no se convertía a set)
+        legacy = AccessValidator([])
+        legacy.authorized_users = active
+        before = lookups_per_second(legacy, ids, args.seconds)
+        after = lookups_per_second(AccessValidator(directory), ids, args.seconds)
+
+        inicio = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE users SET is_active = 0 WHERE name = 'user_1'")
+        conn.commit()
+        while "user_1" in directory:
+            time.sleep(0.01)
+        propagation = time.perf_counter() - inicio
+        directory.stop()
+
+    print(f"usuarios activos: {len(active)}")
+    print(f"antes (lista):           {before:>14,.0f} lookups/s")
+    print(f"ahora (set en memoria):  {after:>14,.0f} lookups/s")
+    print(f"baja visible en el validador tras {propagation * 1000:.0f} ms")
@@ -0,0 +1,98 @@
+"""Benchmark de throughput del MQTTListener con un cliente MQTT simulado en proceso.
+
+Compara el procesamiento dentro del hilo de red (antes) con el pool de
+workers + escritura por lotes (ahora). Mide cuánto bloquea on_message al
+hilo de red y cuántos mensajes por segundo quedan persistidos y confirmados.
+
+Uso (desde la raíz del repo): python -m iot_edge.tools.bench_mqtt_listener [--messages 5000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from iot_edge.application.register_access import RegisterAccess
+from iot_edge.domain.services.access_validator import AccessValidator
+from iot_edge.infrastructure.messaging.mqtt_listener import MQTTListener
+from iot_edge.infrastructure.persistence.sqlite_repo import (
+    BatchingSQLiteAccessRepository, SQLiteAccessRepository)
+
+
+class FakeMessage:
+    def __init__(self, mid, topic, payload):
+        self.mid = mid
+        self.topic = topic
+        self.payload = payload
+        self.qos = 1
+
+
+class FakeClient:
+    """Sustituto del cliente paho: solo cuenta los acks."""
+
+    def __init__(self, expected):
+        self.acked = 0
+        self.expected = expected
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def ack(self, mid, qos):
+        with self._lock:
+            self.acked += 1
+            if self.acked >= self.expected:
+                self.done.set()
+
+
+def messages(n, doors):
+    for i in range(n):
+        payload = json.dumps({"user_id": f"user_{i % 50}", "method": "FACE_RECOGNITION"}).encode()
+        yield FakeMessage(i, f"esp32/door-{i % doors}/door", payload)
+
+
+def run_inline(n, doors, db_path):
+    """Comportamiento anterior: todo en on_message, un commit por evento."""
+    repo = SQLiteAccessRepository(db_path)
+    use_case = RegisterAccess(AccessValidator(["user_1", "user_2"]), repo)
+    listener = MQTTListener(use_case)
+    listener.client = FakeClient(n)
+    inicio = time.perf_counter()
+    for msg in messages(n, doors):
+        listener.handle(msg)
+    elapsed = time.perf_counter() - inicio
+    return elapsed / n, n / elapsed
+
+
+def run_pool(n, doors, db_path, workers):
+    repo = BatchingSQLiteAccessRepository(db_path)
+    use_case = RegisterAccess(AccessValidator(["user_1", "user_2"]), repo)
+    listener = MQTTListener(use_case, workers=workers)
+    client = listener.client = FakeClient(n)
+    listener.start_workers()
+    inicio = time.perf_counter()
+    for msg in messages(n, doors):
+        listener.on_message(client, None, msg)
+    network = time.perf_counter() - inicio
+    client.done.wait()
+    elapsed = time.perf_counter() - inicio
+    listener.stop_workers()
+    repo.close()
+    return network / n, n / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--doors", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        inline = run_inline(args.messages, args.doors, os.path.join(tmp, "inline.db"))
+        pool = run_pool(args.messages, args.doors, os.path.join(tmp, "pool.db"), args.workers)
+
+    print(f"{'modo':<28} {'bloqueo red (µs/msg)':>22} {'persistidos+ack/s':>18}")
+    print(f"{'antes (inline)':<28} {inline[0] * 1e6:>22.1f} {inline[1]:>18.0f}")
+    print(f"{'ahora (pool + lotes)':<28} {pool[0] * 1e6:>22.1f} {pool[1]:>18.0f}")
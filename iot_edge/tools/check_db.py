@@ -1,7 +1,44 @@
+"""Vuelca una tabla de eventos en streaming (fetchmany), a stdout o a un archivo.
+
+La memoria usada no depende del tamaño de la tabla: se leen y escriben
+lotes de export.CHUNK_ROWS filas.
+
+Uso (desde la raíz del repo):
+  python -m iot_edge.tools.check_db                    # filas de access_events, como antes
+  python -m iot_edge.tools.check_db --format ndjson --output eventos.ndjson
+  python -m iot_edge.tools.check_db --db facelock.db --table access_logs --format csv > logs.csv
+"""
+import argparse
 import sqlite3
+import sys
+
+from iot_edge.infrastructure.persistence.export import CHUNK_ROWS, chunks, fetch_batches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="access_events.db")
+    parser.add_argument("--table", default="access_events")
+    parser.add_argument("--format", choices=("rows", "ndjson", "csv"), default="rows")
+    parser.add_argument("--output", default=None, help="Archivo de salida (por defecto stdout)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    cursor = conn.execute(f"SELECT * FROM {args.table}")
+    columns = [d[0] for d in cursor.description]
+    batches = fetch_batches(cursor, args.chunk_rows)
+    if args.format == "rows":
+        output_chunks = ("".join(f"{row}\n" for row in rows) for rows in batches)
+    else:
+        output_chunks = chunks(args.format, batches, lambda row: dict(zip(columns, row)), columns)
 
-conn = sqlite3.connect("access_events.db")
-cursor = conn.cursor()
-cursor.execute("SELECT * FROM access_events")
-for row in cursor.fetchall():
-    print(row)
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in output_chunks:
+            out.write(chunk)
+    except BrokenPipeError:
+        pass  # check_db.py | head
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        conn.close()
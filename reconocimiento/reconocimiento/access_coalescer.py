@@ -0,0 +1,158 @@
+"""Ventana de coalescencia de notificaciones de acceso en el Edge API.
+
+Varias cámaras o procesos de reconocimiento reiniciados notifican a la
+misma persona frente a la misma puerta una y otra vez. La primera
+notificación de cada clave (usuario, puerta, resultado) abre una ventana de
+`window` segundos (fija, no se extiende con las repeticiones); mientras
+dure, las repeticiones se cuentan sobre el log original y no encolan otro
+OPEN.
+
+AccessCoalescer guarda las ventanas en memoria, en un OrderedDict por orden
+de llegada, que con una ventana fija es también el orden de vencimiento:
+purgar es sacar del principio, y con más de max_entries claves se descartan
+las más viejas. No toca SQLite. Con varios workers (serve.py) cada proceso
+vería solo sus notificaciones: SharedAccessCoalescer guarda las ventanas en
+la tabla access_windows, a costa de una escritura por notificación.
+
+claim() devuelve la ventana; el escritor de access_logs la usa para enlazar
+el log que la abrió (link) y copiar 1 + repeticiones a su occurrences
+(linked_log). Si el acceso que abrió la ventana falla, release() la deshace
+para que el reintento no se tome como repetido.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import database
+
+# Igual al cooldown del cliente (face_recognition_app.COOLDOWN_SECONDS)
+COALESCE_SECONDS = 30
+# Claves vivas como máximo en memoria; al superarlo se descartan las más viejas
+MAX_ENTRIES = 4096
+# Las ventanas compartidas vencidas hace más de PRUNE_INTERVAL segundos se borran, a lo sumo una vez por intervalo
+PRUNE_INTERVAL = 60
+
+# Ventana vigente: suma una repetición. Vencida o inexistente: abre una nueva sin log enlazado.
+CLAIM_SQL = '''
+    INSERT INTO access_windows (user_name, device_id, granted, expires_at, repeats)
+    VALUES (:user_name, :device_id, :granted, :expires_at, 0)
+    ON CONFLICT (user_name, device_id, granted) DO UPDATE SET
+        repeats = CASE WHEN expires_at > :now THEN repeats + 1 ELSE 0 END,
+        log_id = CASE WHEN expires_at > :now THEN log_id ELSE NULL END,
+        expires_at = CASE WHEN expires_at > :now THEN expires_at ELSE excluded.expires_at END
+'''
+WINDOW_KEY = 'user_name = ? AND device_id = ? AND granted = ?'
+
+
+def _key(user_name, device_id, granted):
+    return user_name or '', device_id or '', int(granted)
+
+
+class Window:
+    """Ventana en memoria: las repeticiones se cuentan acá y el id del log se completa al escribirlo."""
+
+    def __init__(self, key, expires_at):
+        self.key = key + (expires_at,)
+        self.expires_at = expires_at
+        self.repeats = 0
+        self.log_id = None
+
+    def link(self, conn, log_id):
+        self.log_id = log_id
+
+    def linked_log(self, conn):
+        """(id del log, occurrences) o None si el log todavía no se escribió."""
+        return None if self.log_id is None else (self.log_id, self.repeats + 1)
+
+
+class AccessCoalescer:
+    """Primera ocurrencia de cada clave dentro de la ventana, en memoria del proceso."""
+
+    def __init__(self, window=COALESCE_SECONDS, max_entries=MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # clave -> Window
+        self._lock = threading.Lock()
+
+    def claim(self, user_name, device_id, granted):
+        """Devuelve (ventana, repetida)."""
+        now = time.monotonic()
+        key = _key(user_name, device_id, granted)
+        with self._lock:
+            self._purge(now)
+            window = self._entries.get(key)
+            if window is not None:
+                window.repeats += 1
+                return window, True
+            window = self._entries[key] = Window(key, now + self.window)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return window, False
+
+    def release(self, window):
+        """Deshace una ventana abierta por un acceso que falló (si no la reemplazó otra)."""
+        with self._lock:
+            if self._entries.get(window.key[:3]) is window:
+                del self._entries[window.key[:3]]
+
+    def _purge(self, now):
+        entries = self._entries
+        while entries:
+            key, window = next(iter(entries.items()))
+            if window.expires_at > now:
+                break
+            del entries[key]
+
+    def __len__(self):
+        with self._lock:
+            self._purge(time.monotonic())
+            return len(self._entries)
+
+
+class SharedWindow:
+    """Ventana de access_windows: las repeticiones y el log enlazado viven en SQLite."""
+
+    def __init__(self, key, expires_at):
+        self.key = key + (expires_at,)
+
+    def link(self, conn, log_id):
+        # Si la ventana ya se reemplazó por otra (expires_at distinto) no se enlaza
+        conn.execute(f'UPDATE access_windows SET log_id = ? WHERE {WINDOW_KEY} AND expires_at = ?',
+                     (log_id,) + self.key)
+
+    def linked_log(self, conn):
+        """(id del log, occurrences) o None si el log no se escribió o la ventana ya no existe."""
+        return conn.execute(f'''
+            SELECT log_id, repeats + 1 FROM access_windows
+            WHERE {WINDOW_KEY} AND expires_at = ? AND log_id IS NOT NULL
+        ''', self.key).fetchone()
+
+
+class SharedAccessCoalescer:
+    """Como AccessCoalescer, pero con las ventanas en SQLite: todos los workers de serve.py ven las mismas."""
+
+    def __init__(self, window=COALESCE_SECONDS):
+        self.window = window
+        self._pruned_at = 0.0
+
+    def claim(self, user_name, device_id, granted):
+        """Devuelve (ventana, repetida). Un solo upsert decide, aunque dos workers reciban la misma clave."""
+        now = time.time()
+        key = _key(user_name, device_id, granted)
+        with database.connection() as conn:
+            if now - self._pruned_at > PRUNE_INTERVAL:
+                conn.execute('DELETE FROM access_windows WHERE expires_at < ?', (now - PRUNE_INTERVAL,))
+                self._pruned_at = now
+            conn.execute(CLAIM_SQL, {
+                'user_name': key[0], 'device_id': key[1], 'granted': key[2],
+                'expires_at': now + self.window, 'now': now,
+            })
+            # Misma transacción que el upsert (sin RETURNING, que pide SQLite 3.35)
+            expires_at, repeats = conn.execute(
+                f'SELECT expires_at, repeats FROM access_windows WHERE {WINDOW_KEY}', key).fetchone()
+        return SharedWindow(key, expires_at), repeats > 0
+
+    def release(self, window):
+        """Deshace una ventana abierta por un acceso que falló (si no la reemplazó otra)."""
+        with database.connection() as conn:
+            conn.execute(f'DELETE FROM access_windows WHERE {WINDOW_KEY} AND expires_at = ?', window.key)
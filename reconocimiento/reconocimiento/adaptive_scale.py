@@ -0,0 +1,58 @@
+import cv2
+
+# Límites del factor de escala de la imagen que recibe el detector
+MIN_SCALE = 0.25
+MAX_SCALE = 1.0
+# Multiplicadores al achicar (frame tarde) y al agrandar (frame con holgura)
+SHRINK = 0.85
+GROW = 1.05
+# Fracción del presupuesto por debajo de la cual se considera que hay holgura
+HEADROOM = 0.7
+# Suavizado del tiempo por frame (media móvil exponencial)
+SMOOTHING = 0.2
+
+
+def downscale(rgb_frame, scale):
+    """Copia reducida para el detector (sin copia si la escala es 1)."""
+    if scale >= 1.0:
+        return rgb_frame
+    return cv2.resize(rgb_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+class FixedScale:
+    """Escala constante, con la misma interfaz que AdaptiveScale."""
+
+    def __init__(self, scale=MAX_SCALE):
+        self.scale = scale
+
+    def update(self, seconds):
+        return self.scale
+
+
+class AdaptiveScale:
+    """Ajusta la escala de detección para sostener un presupuesto de tiempo por frame.
+
+    Achica la imagen del detector mientras los frames llegan tarde y la
+    agranda de a poco cuando sobra tiempo. Las cajas del detector son
+    relativas, así que se remapean a la resolución completa sin más.
+    """
+
+    def __init__(self, budget_ms, scale=MAX_SCALE, min_scale=MIN_SCALE, max_scale=MAX_SCALE):
+        self.budget = budget_ms / 1000
+        self.scale = scale
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.frame_time = None
+
+    def update(self, seconds):
+        """Registra la duración de un frame y devuelve la escala para el siguiente."""
+        if self.frame_time is None:
+            self.frame_time = seconds
+        else:
+            self.frame_time += SMOOTHING * (seconds - self.frame_time)
+
+        if self.frame_time > self.budget:
+            self.scale = max(self.min_scale, self.scale * SHRINK)
+        elif self.frame_time < self.budget * HEADROOM:
+            self.scale = min(self.max_scale, self.scale * GROW)
+        return self.scale
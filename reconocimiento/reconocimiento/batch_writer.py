@@ -0,0 +1,145 @@
+import json
+import queue
+import threading
+import time
+from typing import Callable
+
+# Elementos encolados como máximo; con la cola llena put() descarta el nuevo y lo cuenta en dropped
+MAX_QUEUE = 10000
+# Reintentos de un lote que falló antes de darlo por perdido (o mandarlo al dead-letter)
+FLUSH_RETRIES = 3
+# Espera antes del primer reintento (segundos); se duplica en cada uno
+RETRY_BACKOFF = 0.1
+
+
+class BatchWriter:
+    """Agrupa escrituras y las vacía desde un hilo propio (group commit).
+
+    Los elementos se encolan con put() y el hilo llama a flush(lote) cada
+    max_batch elementos o cada flush_interval_ms, lo que ocurra primero.
+    El callback opcional de put() se invoca con True cuando el lote quedó
+    escrito, o con False si se dio por perdido tras los reintentos (así quien
+    espera la escritura, p. ej. un ack MQTT, nunca queda colgado). Ante un
+    crash se pierde como máximo una ventana de flush.
+
+    flush debe ser transaccional: un lote que falla se reintenta entero
+    hasta `retries` veces. Si sigue fallando, sus elementos se agregan como
+    JSON Lines a `dead_letter` (si se indicó) y se cuentan en failed. La
+    cola admite hasta max_queue elementos; lo que llega con la cola llena o
+    después de close() se descarta y se cuenta en dropped.
+    """
+
+    def __init__(self, flush: Callable[[list], None], max_batch: int = 100,
+                 flush_interval_ms: int = 50, setup: Callable[[], None] | None = None,
+                 name: str = "batch-writer", max_queue: int = MAX_QUEUE,
+                 retries: int = FLUSH_RETRIES, dead_letter: str | None = None):
+        self._flush = flush
+        self._setup = setup
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self.retries = retries
+        self.dead_letter = dead_letter
+        self.dropped = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._stop = object()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, item, callback: Callable[[bool], None] | None = None) -> bool:
+        """Encola sin bloquear; False si la cola estaba llena o el writer ya se cerró y el elemento se descartó."""
+        # Con el lock tomado: close() no puede dejar el aviso de cierre delante de este elemento
+        with self._flushed:
+            if self._closed:
+                self.dropped += 1
+                return False
+            try:
+                self._queue.put_nowait((item, callback))
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        return True
+
+    def queue_depth(self) -> int:
+        """Elementos encolados que todavía no se escribieron."""
+        return self._pending
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera a que todo lo encolado hasta ahora quede escrito."""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        """Vacía la cola y detiene el hilo. Se puede llamar más de una vez."""
+        with self._flushed:
+            if self._closed:
+                return
+            self._closed = True
+        # Fuera del lock y bloqueante: el aviso de cierre no se descarta aunque la cola esté llena
+        self._queue.put(self._stop)
+        self._thread.join()
+
+    def _run(self) -> None:
+        if self._setup:
+            self._setup()
+        stopping = False
+        while not stopping:
+            batch = []
+            callbacks = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._stop:
+                    stopping = True
+                    break
+                batch.append(item[0])
+                if item[1] is not None:
+                    callbacks.append(item[1])
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                written = self._write(batch)
+                for callback in callbacks:
+                    try:
+                        callback(written)
+                    except Exception as e:
+                        print(f"Error en callback de escritura: {e}")
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _write(self, batch: list) -> bool:
+        """Escribe el lote con reintentos; si no se pudo, lo manda al dead-letter y devuelve False."""
+        backoff = RETRY_BACKOFF
+        for attempt in range(self.retries + 1):
+            try:
+                self._flush(batch)
+                return True
+            except Exception as e:
+                print(f"Error escribiendo lote de {len(batch)} eventos (intento {attempt + 1}): {e}")
+            if attempt < self.retries:
+                time.sleep(backoff)
+                backoff *= 2
+        self.failed += len(batch)
+        if self.dead_letter:
+            try:
+                with open(self.dead_letter, "a", encoding="utf-8") as f:
+                    for item in batch:
+                        f.write(json.dumps(item, default=lambda o: getattr(o, "__dict__", str(o))) + "\n")
+                print(f"Lote de {len(batch)} eventos guardado en {self.dead_letter}")
+                return False
+            except OSError as e:
+                print(f"Error guardando lote en {self.dead_letter}: {e}")
+        print(f"Lote de {len(batch)} eventos descartado")
+        return False
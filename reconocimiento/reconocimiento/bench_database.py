@@ -0,0 +1,85 @@
+"""Micro-benchmark de la capa SQLite bajo requests concurrentes a Flask.
+
+Compara conexión nueva por llamada (antes) vs. pool con WAL (ahora), con hilos
+que mezclan POST /api/notify-access (insert) y GET /api/status (lecturas).
+
+Uso: python bench_database.py [--threads 8] [--seconds 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import database
+
+
+@contextlib.contextmanager
+def legacy_connection():
+    """Lo que hacía cada función antes: connect, una sentencia, commit y close."""
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run(threads, seconds):
+    # Recién acá: importar edge_api inicializa y migra la base de DB_PATH, que ya apunta al temporal
+    with contextlib.redirect_stdout(io.StringIO()):
+        import edge_api
+    client = edge_api.app.test_client()
+    counts = {"inserts": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(i):
+        inserts = reads = errors = 0
+        while time.perf_counter() < deadline:
+            if i % 2 == 0:
+                r = client.post("/api/notify-access", json={
+                    "user_name": f"user_{i}", "method": "facial_recognition",
+                    "success": False, "confidence": 0.5})
+                inserts += 1
+            else:
+                r = client.get("/api/status")
+                reads += 1
+            errors += r.status_code != 200
+        with lock:
+            counts["inserts"] += inserts
+            counts["reads"] += reads
+            counts["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    return {k: v / seconds if k != "errors" else v for k, v in counts.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    pooled_connection = database.connection
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = (("antes (connect por llamada)", legacy_connection),
+                 ("ahora (pool + WAL)", pooled_connection))
+        for i, (label, factory) in enumerate(modes):
+            database.DB_PATH = os.path.join(tmp, f"bench_{i}.db")
+            database.connection = factory
+            with contextlib.redirect_stdout(io.StringIO()):
+                database.init_database()
+            result = run(args.threads, args.seconds)
+            database.flush_access_logs()
+            print(f"{label:<30} inserts/s {result['inserts']:>8.0f}   reads/s {result['reads']:>8.0f}"
+                  f"   errores {result['errors']}")
+            database.close_all()
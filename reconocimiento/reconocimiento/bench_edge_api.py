@@ -0,0 +1,186 @@
+"""Prueba de carga del Edge API: servidor de desarrollo frente a serve.py.
+
+Levanta cada servidor en un directorio temporal (base de datos nueva) y
+simula ESP32 haciendo long-poll junto con clientes de reconocimiento que
+notifican accesos y consultan /api/status. Reporta requests/s y latencias
+p50/p95/p99 de los clientes, y la latencia notificación→entrega del comando
+al ESP32 (incluye la espera entre workers).
+
+Con más pollers que hilos para esperar (serve.py reserva RESERVED_THREADS
+por worker) los polls que sobran se responden en el acto con Retry-After y
+el ESP32 simulado espera eso antes de volver a consultar; se reporta cuántos.
+
+Uso: python bench_edge_api.py [--targets dev,werkzeug,waitress,gunicorn] [--clients 16]
+                              [--pollers 20] [--duration 15] [--workers 4] [--threads N]
+     python bench_edge_api.py --targets waitress,gunicorn --pollers 100 --workers 2 --threads 16
+"""
+import argparse
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from pipeline import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PORT = 5000
+BASE_URL = f"http://127.0.0.1:{PORT}/api"
+# Espera del long-poll de los ESP32 simulados (segundos)
+POLL_WAIT = 5
+
+
+def server_command(target, workers, threads, pollers):
+    if target == "dev":
+        # Lo que corría edge_api.py antes de serve.py: debugger y reloader encendidos
+        return [sys.executable, os.path.join(HERE, "edge_api.py")], {"FACELOCK_DEBUG": "1"}
+    command = [sys.executable, os.path.join(HERE, "serve.py"), "--server", target, "--bind", f"127.0.0.1:{PORT}",
+               "--workers", str(workers), "--pollers", str(pollers)]
+    if threads:
+        command += ["--threads", str(threads)]
+    return command, {}
+
+
+def start_server(target, workers, threads, pollers, cwd):
+    # edge_api.py no crea las tablas: se crean antes, como en una instalación normal
+    subprocess.run([sys.executable, os.path.join(HERE, "database.py")], cwd=cwd,
+                   stdout=subprocess.DEVNULL, check=True)
+    command, env = server_command(target, workers, threads, pollers)
+    process = subprocess.Popen(command, cwd=cwd, env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=os.name == "posix")
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{BASE_URL}/status", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{target} no respondió en 30 s")
+
+
+def stop_server(process):
+    # El reloader del modo debug deja un proceso hijo: se termina el grupo completo
+    if os.name == "posix":
+        os.killpg(process.pid, signal.SIGTERM)
+    else:
+        process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    # Esperar a que el puerto quede libre para el próximo servidor
+    while True:
+        try:
+            requests.get(f"{BASE_URL}/status", timeout=0.5)
+            time.sleep(0.2)
+        except requests.RequestException:
+            return
+
+
+def run_load(clients, pollers, duration):
+    latencies = []
+    deliveries = []
+    errors = [0]
+    shed = [0]
+    sent_at = {}
+    sequence = itertools.count()
+    stop = threading.Event()
+
+    def client(i):
+        session = requests.Session()
+        while not stop.is_set():
+            n = next(sequence)
+            inicio = time.perf_counter()
+            try:
+                if n % 2 == 0:
+                    user = f"u{n}"
+                    sent_at[user] = inicio
+                    response = session.post(f"{BASE_URL}/notify-access", timeout=10, json={
+                        "user_name": user, "method": "facial_recognition", "success": True,
+                        "confidence": 0.9, "device_id": f"esp{n // 2 % pollers}"})
+                else:
+                    response = session.get(f"{BASE_URL}/status", timeout=10)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - inicio)
+            except requests.RequestException:
+                errors[0] += 1
+
+    def poller(i):
+        session = requests.Session()
+        device_id = f"esp{i}"
+        while not stop.is_set():
+            try:
+                response = session.get(f"{BASE_URL}/get-pending-commands", timeout=POLL_WAIT + 10,
+                                       params={"device_id": device_id, "wait": POLL_WAIT})
+                command_id = response.headers.get("X-Command-Id")
+                if command_id is None:
+                    retry_after = response.headers.get("Retry-After")
+                    if retry_after is not None:
+                        shed[0] += 1
+                        time.sleep(float(retry_after))
+                    continue
+                user = response.text.partition(":")[2]
+                if user in sent_at:
+                    deliveries.append(time.perf_counter() - sent_at.pop(user))
+                session.post(f"{BASE_URL}/confirm-command", timeout=10, json={
+                    "device_id": device_id, "command": response.text, "status": "ok",
+                    "command_id": int(command_id)})
+            except requests.RequestException:
+                errors[0] += 1
+                time.sleep(0.5)
+
+    threads = [threading.Thread(target=poller, args=(i,), daemon=True) for i in range(pollers)]
+    threads += [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join(POLL_WAIT + 10)
+
+    def ms(values, pct):
+        value = percentile(values, pct)
+        return value * 1000 if value is not None else float("nan")
+
+    return {
+        "rps": len(latencies) / duration,
+        "p50": ms(latencies, 50), "p95": ms(latencies, 95), "p99": ms(latencies, 99),
+        "delivery_p50": ms(deliveries, 50), "delivery_p99": ms(deliveries, 99),
+        "errors": errors[0], "shed": shed[0],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", default="dev,werkzeug,waitress,gunicorn")
+    parser.add_argument("--clients", type=int, default=16, help="Clientes de reconocimiento concurrentes")
+    parser.add_argument("--pollers", type=int, default=20, help="ESP32 simulados en long-poll")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Hilos por worker (por defecto, los que calcula serve.py desde --pollers)")
+    args = parser.parse_args()
+
+    print(f"{args.clients} clientes, {args.pollers} ESP32 en long-poll, {args.duration:.0f} s por servidor")
+    print(f"{'servidor':>10} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'entrega p50':>12} {'entrega p99':>12} {'errores':>8} {'sin esperar':>12}   (ms)")
+    for target in args.targets.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                process = start_server(target, args.workers, args.threads, args.pollers, tmp)
+            except (RuntimeError, OSError) as e:
+                print(f"{target:>10} no disponible: {e}")
+                continue
+            try:
+                r = run_load(args.clients, args.pollers, args.duration)
+            finally:
+                stop_server(process)
+        print(f"{target:>10} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} "
+              f"{r['delivery_p50']:>12.1f} {r['delivery_p99']:>12.1f} {r['errors']:>8} {r['shed']:>12}")
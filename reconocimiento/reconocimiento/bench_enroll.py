@@ -0,0 +1,79 @@
+"""Enrolamiento de N imágenes: registro uno a uno frente a enroll.py.
+
+"antes" repite por imagen lo que hacía register_face(): modelos nuevos,
+un append al almacén y un save_user. Después corre enroll.enroll() con 1 y
+con --workers procesos, y una segunda vez sobre las mismas imágenes (todas
+se saltean por hash). Las imágenes son sintéticas (sirven para medir el
+costo por imagen, no la calidad del reconocimiento).
+
+Uso: python bench_enroll.py [--images 200] [--workers 4]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import database
+import enroll
+from face_store import FaceStore
+
+
+def make_images(directory, count):
+    os.makedirs(directory)
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        image = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        cv2.imwrite(os.path.join(directory, f"persona_{i:05d}.jpg"), image)
+
+
+def legacy(entries, store_dir):
+    store = FaceStore(store_dir)
+    for name, path, age, pin in entries:
+        enroller = enroll.Enroller()  # register_face creaba los modelos en cada registro
+        embedding, error = enroller.embed(cv2.imread(path))
+        enroller.close()
+        if error is None:
+            store.append(name, embedding, {"age": age, "pin": pin})
+            database.save_user(name, age, pin)
+
+
+def run(label, fn, images, tmp):
+    # Cada caso con su propia base; los prints de database/enroll no se muestran
+    database.DB_PATH = os.path.join(tmp, f"{label.split()[0]}.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database()
+        inicio = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - inicio
+    database.close_all()
+    print(f"{label:<22} {seconds:>8.2f} {images / seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "fotos")
+        make_images(source, args.images)
+        entries = enroll.read_entries(source)
+        rostros = os.path.join(tmp, "rostros")
+        cases = [
+            ("antes (uno a uno)", lambda: legacy(entries, os.path.join(tmp, "store-antes"))),
+            ("enroll 1 worker", lambda: enroll.enroll(entries, os.path.join(tmp, "store-1"), rostros, 1)),
+            (f"enroll {args.workers} workers",
+             lambda: enroll.enroll(entries, os.path.join(tmp, "store-n"), rostros, args.workers)),
+            ("enroll sin cambios",
+             lambda: enroll.enroll(entries, os.path.join(tmp, "store-n"), rostros, args.workers)),
+        ]
+        print(f"{args.images} imágenes, {os.cpu_count()} CPU")
+        print(f"{'caso':<22} {'s':>8} {'imágenes/s':>10}")
+        for label, fn in cases:
+            run(label, fn, args.images, tmp)
@@ -0,0 +1,110 @@
+"""Exportación de access_logs: fetchall en memoria frente a streaming.
+
+Arma una base sintética de --rows logs y exporta la tabla completa de cada
+forma en un proceso aparte, para medir el pico de RSS de cada una:
+  antes       fetchall + lista de dicts + json.dumps (lo que hacían los endpoints)
+  api-ndjson  GET /api/access_logs/export (cliente de prueba de Flask, sin buffer)
+  api-csv     GET /api/access_logs/export?format=csv
+  cli-ndjson  iot_edge/tools/check_db.py --format ndjson (fetchmany)
+"base" solo importa edge_api: es el piso de RSS. La salida se descarta; se reportan filas/s y el pico de RSS.
+
+Uso: python bench_export.py [--rows 10000000] [--db export-bench.db]
+           [--cases base,antes,api-ndjson,api-csv,cli-ndjson]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CHECK_DB = os.path.join(HERE, "..", "..", "iot_edge", "tools", "check_db.py")
+CASES = ("base", "antes", "api-ndjson", "api-csv", "cli-ndjson")
+
+
+def build_database(path, rows):
+    """Crea la base si no existe (se reutiliza entre corridas); devuelve la cantidad de logs."""
+    import contextlib
+    import io
+    import database
+
+    database.DB_PATH = path
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database()
+    with database.connection() as conn:
+        existing = conn.execute('SELECT COUNT(*) FROM access_logs').fetchone()[0]
+    if existing >= rows:
+        return existing
+    start = time.time() - 365 * 86400
+    step = 365 * 86400 / rows
+    with database.connection() as conn:
+        conn.executemany(
+            'INSERT INTO access_logs (user_name, access_method, success, confidence, timestamp) VALUES (?, ?, ?, ?, ?)',
+            ((f"user_{i % 50}", ("facial_recognition", "pin")[i % 2], i % 7 != 0, 0.9,
+              time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(start + i * step))) for i in range(rows)))
+    database.close_all()
+    return rows
+
+
+def run_case(case, path):
+    """Corre dentro del proceso hijo; devuelve (filas, bytes)."""
+    if case == "cli-ndjson":
+        subprocess.run([sys.executable, CHECK_DB, "--db", path, "--table", "access_logs",
+                        "--format", "ndjson", "--output", os.devnull], check=True)
+        return None, 0
+
+    import database
+    database.DB_PATH = path
+    import edge_api
+
+    if case == "base":
+        return 0, 0
+    if case == "antes":
+        with database.connection() as conn:
+            rows = conn.execute('SELECT id, user_name, access_method, success, confidence, timestamp, occurrences '
+                                'FROM access_logs').fetchall()
+        body = json.dumps([edge_api._log_dict(row) for row in rows])
+        return len(rows), len(body)
+
+    fmt = case.split("-")[1]
+    response = edge_api.app.test_client().get(f'/api/access_logs/export?format={fmt}', buffered=False)
+    size = lines = 0
+    for chunk in response.response:
+        size += len(chunk)
+        lines += chunk.count(b"\n") if isinstance(chunk, bytes) else chunk.count("\n")
+    response.close()
+    return lines - (fmt == "csv"), size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--db", default="export-bench.db")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    path = os.path.abspath(args.db)
+
+    if args.case:
+        inicio = time.perf_counter()
+        rows, size = run_case(args.case, path)
+        seconds = time.perf_counter() - inicio
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN if args.case == "cli-ndjson" else resource.RUSAGE_SELF)
+        print(json.dumps({"rows": rows, "bytes": size, "seconds": seconds, "rss_mb": usage.ru_maxrss / 1024}))
+        sys.exit()
+
+    inicio = time.perf_counter()
+    total = build_database(path, args.rows)
+    print(f"{total} logs en {path} ({os.path.getsize(path) / 1e6:.0f} MB, "
+          f"armada en {time.perf_counter() - inicio:.0f}s)")
+    print(f"{'caso':<12} {'filas':>10} {'s':>8} {'filas/s':>10} {'RSS pico MB':>12}")
+    for case in args.cases.split(","):
+        output = subprocess.run([sys.executable, __file__, "--db", path, "--case", case],
+                                check=True, capture_output=True, text=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        if r["rows"] is None:
+            r["rows"] = total  # check_db.py exporta la tabla completa
+        rate = r["rows"] / r["seconds"] if r["rows"] else 0
+        print(f"{case:<12} {r['rows']:>10} {r['seconds']:>8.1f} {rate:>10.0f} {r['rss_mb']:>12.0f}")
@@ -0,0 +1,40 @@
+"""Benchmark del matcher por embeddings: tiempo por match a 100, 1k y 10k identidades.
+
+Uso: python bench_face_index.py [--faces 3] [--repeats 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from face_index import FaceIndex, EMBEDDING_DIM
+
+
+def bench(identities, faces, repeats, rng):
+    names = [f"user_{i}" for i in range(identities)]
+    index = FaceIndex(names, rng.standard_normal((identities, EMBEDDING_DIM), dtype=np.float32))
+    queries = rng.standard_normal((faces, EMBEDDING_DIM), dtype=np.float32)
+
+    index.match(queries)  # calentamiento
+    tiempos = []
+    for _ in range(repeats):
+        inicio = time.perf_counter()
+        index.match(queries)
+        tiempos.append(time.perf_counter() - inicio)
+
+    tiempos = np.array(tiempos) * 1000
+    return np.median(tiempos), np.percentile(tiempos, 95)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--faces", type=int, default=3, help="Rostros por frame")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"Dimensión del embedding: {EMBEDDING_DIM}, rostros por frame: {args.faces}")
+    print(f"{'identidades':>12} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for identities in (100, 1_000, 10_000):
+        p50, p95 = bench(identities, args.faces, args.repeats, rng)
+        print(f"{identities:>12} {p50:>10.3f} {p95:>10.3f}")
@@ -0,0 +1,80 @@
+"""Benchmark del almacén de rostros frente al pickle: arranque, alta y recarga.
+
+Uso: python bench_face_store.py [--sizes 1000,10000,50000] [--enrollments 20]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+from face_index import EMBEDDING_DIM
+from face_store import FaceStore
+from known_faces import KnownFaces
+
+
+def bench(identities, enrollments, rng):
+    names = [f"user_{i}" for i in range(identities)]
+    embeddings = list(rng.standard_normal((identities, EMBEDDING_DIM), dtype=np.float32))
+    data = {n: {"age": 30, "pin": "1234"} for n in names}
+    nuevo = rng.standard_normal(EMBEDDING_DIM, dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "known_faces.pkl")
+        with open(pickle_path, "wb") as f:
+            pickle.dump((embeddings, names, data), f)
+        store = FaceStore(os.path.join(tmp, "known_faces"))
+        store.append_many(zip(names, embeddings, (data[n] for n in names)))
+
+        # Arranque: pickle completo + índice vs. mapear el almacén
+        inicio = time.perf_counter()
+        with open(pickle_path, "rb") as f:
+            e, n, d = pickle.load(f)
+        KnownFaces.build(e, n, d)
+        pickle_load = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        KnownFaces.from_view(FaceStore(store.directory, read_only=True).load())
+        store_load = time.perf_counter() - inicio
+
+        # Alta: reescribir el pickle completo vs. agregar una fila (ambos con fsync)
+        inicio = time.perf_counter()
+        for i in range(enrollments):
+            e.append(nuevo)
+            n.append(f"nuevo_{i}")
+            with open(pickle_path, "wb") as f:
+                pickle.dump((e, n, d), f)
+                f.flush()
+                os.fsync(f.fileno())
+        pickle_add = (time.perf_counter() - inicio) / enrollments
+
+        inicio = time.perf_counter()
+        for i in range(enrollments):
+            store.append(f"nuevo_{i}", nuevo, {"age": 30})
+        store_add = (time.perf_counter() - inicio) / enrollments
+
+        # Recarga de otro lector después de un alta: solo lee las líneas nuevas
+        lector = FaceStore(store.directory, read_only=True)
+        lector.load()
+        store.append("otro", nuevo, {})
+        inicio = time.perf_counter()
+        KnownFaces.from_view(lector.load())
+        store_reload = time.perf_counter() - inicio
+
+    return pickle_load, store_load, pickle_add, store_add, store_reload
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--enrollments", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'identidades':>11} {'arranque pkl':>13} {'arranque store':>15} "
+          f"{'alta pkl':>10} {'alta store':>11} {'recarga store':>14}   (ms)")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = [v * 1000 for v in bench(size, args.enrollments, rng)]
+        print(f"{size:>11} {r[0]:>13.2f} {r[1]:>15.2f} {r[2]:>10.2f} {r[3]:>11.2f} {r[4]:>14.3f}")
@@ -0,0 +1,67 @@
+"""Benchmark del refresco de rostros por frame: stat + recarga (antes) vs. lectura del snapshot (ahora).
+
+Uso: python bench_known_faces.py [--frames 300]
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+from face_index import EMBEDDING_DIM
+from known_faces import KnownFacesWatcher
+
+
+def legacy_refresh(pickle_path, rostros_dir, names, state):
+    """Réplica del antiguo load_known_faces(): stat del pickle y un exists por nombre."""
+    if os.path.exists(pickle_path):
+        mod_time = os.path.getmtime(pickle_path)
+        if mod_time != state.get("mod_time"):
+            with open(pickle_path, "rb") as f:
+                pickle.load(f)
+            state["mod_time"] = mod_time
+    for name in names:
+        os.path.exists(os.path.join(rostros_dir, f"{name}.jpg"))
+
+
+def bench(enrolled, frames):
+    with tempfile.TemporaryDirectory() as tmp:
+        rostros_dir = os.path.join(tmp, "rostros")
+        os.makedirs(rostros_dir)
+        pickle_path = os.path.join(tmp, "known_faces.pkl")
+        store_dir = os.path.join(tmp, "known_faces")
+        names = [f"user_{i}" for i in range(enrolled)]
+        for name in names:
+            open(os.path.join(rostros_dir, f"{name}.jpg"), "wb").close()
+        embeddings = list(np.random.default_rng(0).standard_normal((enrolled, EMBEDDING_DIM), dtype=np.float32))
+        data = {n: {"age": 30} for n in names}
+        with open(pickle_path, "wb") as f:
+            pickle.dump((embeddings, names, data), f)
+
+        state = {}
+        inicio = time.perf_counter()
+        for _ in range(frames):
+            legacy_refresh(pickle_path, rostros_dir, names, state)
+        antes = (time.perf_counter() - inicio) / frames
+
+        watcher = KnownFacesWatcher(store_dir, rostros_dir, legacy_pickle=pickle_path).start()
+        inicio = time.perf_counter()
+        for _ in range(frames):
+            known = watcher.snapshot
+            len(known.index)
+        ahora = (time.perf_counter() - inicio) / frames
+        watcher.stop()
+    return antes, ahora
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'enrolados':>10} {'antes (µs/frame)':>18} {'ahora (µs/frame)':>18}")
+    for enrolled in (10, 100, 1000):
+        antes, ahora = bench(enrolled, args.frames)
+        print(f"{enrolled:>10} {antes * 1e6:>18.1f} {ahora * 1e6:>18.3f}")
@@ -0,0 +1,187 @@
+"""Suite de benchmark del loop de reconocimiento sobre clips grabados.
+
+Cada video o directorio de imágenes dentro de --clips es un clip; sin
+--clips se usan fuentes sintéticas (deterministas) a 480p y 720p. Cada
+clip se procesa --repeats veces y se reporta la mediana de FPS y de cada
+etapa. Con --baseline se compara contra un resultado guardado y el script
+sale con código 1 si alguna métrica empeoró más que --tolerance.
+
+Con --scales y/o --budget-ms cada clip se repite con el detector sobre
+imágenes reducidas y se reporta FPS contra recall de detección, tomando
+como referencia la pasada a resolución completa.
+
+Con --track y --redetect-scores cada clip se repite con esos umbrales de
+re-detección del tracker y se reportan las llamadas al detector por frame:
+los rostros con score entre el del detector (MIN_DETECTION_CONFIDENCE) y el
+umbral se detectan en cada frame.
+
+Uso:
+  python bench_replay.py --clips clips/ --output base.json
+  python bench_replay.py --clips clips/ --baseline base.json --tolerance 0.15
+  python bench_replay.py --clips clips/ --scales 0.75,0.5,0.35 --budget-ms 40
+  python bench_replay.py --clips clips/ --track 5 --redetect-scores 0.5,0.55,0.6,0.7
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+import face_recognition_app as app
+from frame_sources import IMAGE_EXTENSIONS
+from adaptive_scale import AdaptiveScale, FixedScale
+from replay import STAGES, format_report, load_known, recall, replay
+from tracker import REDETECT_SCORE
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# Fuentes por defecto cuando no hay clips grabados
+SYNTHETIC_CLIPS = ("synthetic:640x480:150", "synthetic:1280x720:150")
+
+
+def find_clips(directory):
+    clips = []
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.is_dir():
+            if any(f.lower().endswith(IMAGE_EXTENSIONS) for f in os.listdir(entry.path)):
+                clips.append(entry.path)
+        elif entry.name.lower().endswith(VIDEO_EXTENSIONS):
+            clips.append(entry.path)
+    return clips
+
+
+def bench_clip(spec, known, repeats, max_frames, warmup, detect_every=None, make_scaler=None,
+               redetect_score=REDETECT_SCORE):
+    """Mediana de varias pasadas sobre el mismo clip (las cajas son las de la última)."""
+    runs = [replay(spec, known, max_frames, warmup, detect_every=detect_every,
+                   scaler=make_scaler() if make_scaler else None, collect_boxes=True,
+                   redetect_score=redetect_score)
+            for _ in range(repeats)]
+    stages = {
+        stage: {
+            key: statistics.median(run["stages"][stage][key] for run in runs)
+            for key in ("mean_ms", "p50_ms", "p95_ms")
+        }
+        for stage in STAGES if all(stage in run["stages"] for run in runs)
+    }
+    result = dict(runs[-1])
+    result["fps"] = statistics.median(run["fps"] for run in runs)
+    result["stages"] = stages
+    result["source"] = spec
+    return result
+
+
+def sweep(spec, known, reference, args):
+    """FPS y recall de cada escala fija y de la escala adaptativa frente a la referencia."""
+    modes = [(f"escala {scale:.2f}", lambda scale=scale: FixedScale(scale)) for scale in args.scales]
+    if args.budget_ms:
+        modes.append((f"adaptativa {args.budget_ms:.0f} ms", lambda: AdaptiveScale(args.budget_ms)))
+    rows = []
+    for label, make_scaler in modes:
+        result = bench_clip(spec, known, args.repeats, args.frames, args.warmup, args.track, make_scaler)
+        rows.append({
+            "mode": label,
+            "fps": result["fps"],
+            "mean_scale": result["mean_scale"],
+            "recall": recall(reference["boxes"], result["boxes"]),
+        })
+    return rows
+
+
+def redetect_sweep(spec, known, reference, args):
+    """Llamadas al detector por frame, fps y recall del tracker con cada umbral de re-detección."""
+    rows = []
+    for score in args.redetect_scores:
+        result = bench_clip(spec, known, args.repeats, args.frames, args.warmup, args.track,
+                            redetect_score=score)
+        rows.append({
+            "redetect_score": score,
+            "fps": result["fps"],
+            "detector_per_frame": result["detector_calls"] / result["frames"] if result["frames"] else 0.0,
+            "recall": recall(reference["boxes"], result["boxes"]),
+        })
+    return rows
+
+
+def compare(results, baseline, tolerance):
+    """Lista de regresiones: FPS más bajos o p95 de etapa más altos que la base."""
+    regressions = []
+    for clip, current in results.items():
+        base = baseline.get(clip)
+        if base is None:
+            continue
+        if current["fps"] < base["fps"] * (1 - tolerance):
+            regressions.append(f"{clip}: fps {base['fps']:.1f} → {current['fps']:.1f}")
+        for stage, values in current["stages"].items():
+            base_p95 = base["stages"].get(stage, {}).get("p95_ms")
+            # Por debajo de 1 ms el ruido de medición domina
+            if base_p95 and base_p95 > 1.0 and values["p95_ms"] > base_p95 * (1 + tolerance):
+                regressions.append(f"{clip}: {stage} p95 {base_p95:.2f} → {values['p95_ms']:.2f} ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del reconocimiento sobre clips grabados")
+    parser.add_argument("--clips", help="Directorio con videos o subdirectorios de imágenes")
+    parser.add_argument("--known", default=app.store_dir,
+                        help="Almacén de rostros enrolados (o un known_faces.pkl antiguo)")
+    parser.add_argument("--frames", type=int, default=None, help="Máximo de frames medidos por clip")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--track", type=int, metavar="N", default=None,
+                        help="Medir el modo seguimiento con detector cada N frames")
+    parser.add_argument("--scales", type=lambda v: [float(x) for x in v.split(",")], default=[],
+                        help="Escalas fijas del detector a comparar, p. ej. 0.75,0.5")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Comparar también la escala adaptativa con este presupuesto por frame")
+    parser.add_argument("--redetect-scores", type=lambda v: [float(x) for x in v.split(",")], default=[],
+                        help="Con --track, umbrales de re-detección a comparar, p. ej. 0.5,0.6,0.7")
+    parser.add_argument("--output", help="Guardar los resultados (JSON) para usarlos como base")
+    parser.add_argument("--baseline", help="Resultados previos contra los que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Empeoramiento tolerado (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    clips = find_clips(args.clips) if args.clips else list(SYNTHETIC_CLIPS)
+    if not clips:
+        print(f"No hay clips en {args.clips}")
+        sys.exit(2)
+    if args.redetect_scores and not args.track:
+        print("--redetect-scores requiere --track")
+        sys.exit(2)
+
+    known = load_known(args.known)
+    print(f"{len(clips)} clips, {args.repeats} pasadas cada uno, {len(known.index.names)} rostros enrolados\n")
+    results = {}
+    for clip in clips:
+        results[clip] = bench_clip(clip, known, args.repeats, args.frames, args.warmup, args.track)
+        print(format_report(results[clip]))
+        if args.scales or args.budget_ms:
+            results[clip]["sweep"] = sweep(clip, known, results[clip], args)
+            print(f"  {'modo':<18} {'fps':>7} {'escala':>7} {'recall':>7}")
+            print(f"  {'referencia':<18} {results[clip]['fps']:>7.1f} {1.0:>7.2f} {1.0:>7.1%}")
+            for row in results[clip]["sweep"]:
+                print(f"  {row['mode']:<18} {row['fps']:>7.1f} {row['mean_scale']:>7.2f} {row['recall']:>7.1%}")
+        if args.redetect_scores:
+            results[clip]["redetect"] = redetect_sweep(clip, known, results[clip], args)
+            print(f"  {'re-detección':<18} {'fps':>7} {'det/frame':>10} {'recall':>7}")
+            for row in results[clip]["redetect"]:
+                print(f"  {row['redetect_score']:<18.2f} {row['fps']:>7.1f} "
+                      f"{row['detector_per_frame']:>10.2f} {row['recall']:>7.1%}")
+        results[clip].pop("boxes")
+        print()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regresiones (tolerancia {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"✅ Sin regresiones respecto de {args.baseline}")
@@ -0,0 +1,103 @@
+"""Latencia de los escritores de access_logs durante una poda.
+
+Un hilo inserta un log cada pocos ms (como el escritor por lotes) y mide
+cuánto tarda cada commit: en reposo, mientras RetentionJob poda en lotes y
+mientras corre el DELETE único de antes sobre la misma cantidad de filas.
+
+Uso: python bench_retention.py [--rows 300000] [--interval-ms 5]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import database
+from pipeline import percentile
+from retention import RetentionJob, _cutoff
+
+# Los logs viejos tienen esta antigüedad; la poda borra los de más de MAX_AGE_DAYS
+OLD_DAYS = 200
+MAX_AGE_DAYS = 30
+
+
+def seed(path, rows):
+    conn = sqlite3.connect(path)
+    for pragma in database.PRAGMAS:
+        conn.execute(pragma)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS access_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_name TEXT, access_method TEXT,
+            success BOOLEAN, confidence REAL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)
+    ''')
+    old = _cutoff(OLD_DAYS, utc=True)
+    conn.executemany(
+        'INSERT INTO access_logs (user_name, access_method, success, confidence, timestamp) VALUES (?, ?, ?, ?, ?)',
+        ((f"user_{i % 50}", "facial_recognition", 1, 0.9, old) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def measure(path, interval, action):
+    """Corre action() mientras un escritor inserta; devuelve (latencias, duración de action)."""
+    latencies = []
+    stop = threading.Event()
+
+    def writer():
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA busy_timeout=30000")
+        while not stop.is_set():
+            inicio = time.perf_counter()
+            conn.execute('INSERT INTO access_logs (user_name, access_method, success, confidence) '
+                         'VALUES (?, ?, ?, ?)', ("bench", "facial_recognition", 1, 0.9))
+            conn.commit()
+            latencies.append(time.perf_counter() - inicio)
+            time.sleep(interval)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.5)
+    inicio = time.perf_counter()
+    action()
+    duration = time.perf_counter() - inicio
+    time.sleep(0.5)
+    stop.set()
+    thread.join()
+    return latencies, duration
+
+
+def single_delete(path):
+    conn = sqlite3.connect(path, timeout=30)
+    with conn:
+        conn.execute('DELETE FROM access_logs WHERE timestamp < ?', (_cutoff(MAX_AGE_DAYS, utc=True),))
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--interval-ms", type=float, default=5)
+    args = parser.parse_args()
+    interval = args.interval_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "archive")
+        cases = (
+            ("reposo", lambda path: time.sleep(2)),
+            ("poda por lotes", lambda path: RetentionJob(path, "access_logs", max_age_days=MAX_AGE_DAYS,
+                                                          archive_dir=archive_dir).run_once()),
+            ("DELETE único", single_delete),
+        )
+        print(f"{args.rows} filas viejas, un insert cada {args.interval_ms:g} ms")
+        print(f"{'caso':<16} {'duración':>9} {'p50':>8} {'p99':>8} {'máx':>8}   (ms)")
+        for label, action in cases:
+            # Base nueva por caso: las filas viejas quedan primero, como en una tabla real
+            path = os.path.join(tmp, f"{label.split()[0]}.db")
+            seed(path, args.rows)
+            latencies, duration = measure(path, interval, lambda: action(path))
+            print(f"{label:<16} {duration * 1000:>9.0f} {percentile(latencies, 50) * 1000:>8.2f} "
+                  f"{percentile(latencies, 99) * 1000:>8.2f} {max(latencies) * 1000:>8.2f}")
+        size = sum(os.path.getsize(os.path.join(archive_dir, f)) for f in os.listdir(archive_dir))
+        print(f"archivo de la poda: {size / 1e6:.1f} MB comprimido")
@@ -0,0 +1,83 @@
+"""Benchmark de /api/status según el tamaño de access_logs.
+
+Compara las consultas que hacía el endpoint en cada request (COUNT de
+usuarios + ORDER BY timestamp sin índice) con la versión en memoria:
+respuesta reutilizada, 304 con If-None-Match y rearmado tras un acceso nuevo.
+
+Uso: python bench_status.py [--sizes 1000,100000,1000000] [--repeats 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import database
+from command_queue import SCHEMA as COMMANDS_SCHEMA
+
+
+def legacy_status():
+    """Lo que consultaba /api/status antes en cada request."""
+    with database.connection() as conn:
+        conn.execute('SELECT COUNT(*) FROM users WHERE is_active = 1').fetchone()
+        conn.execute('''
+            SELECT user_name, access_method, success, confidence, timestamp
+            FROM access_logs ORDER BY timestamp DESC LIMIT 10
+        ''').fetchall()
+
+
+def median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        inicio = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - inicio)
+    return statistics.median(samples) * 1000
+
+
+def bench(size, repeats, tmp):
+    database.DB_PATH = os.path.join(tmp, f"status-{size}.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_database()
+        # Recién acá: importar edge_api inicializa y migra la base de DB_PATH, que ya apunta al temporal
+        import edge_api
+    with database.connection() as conn:
+        for statement in COMMANDS_SCHEMA:
+            conn.execute(statement)
+        conn.executemany('INSERT INTO users (name, age, pin) VALUES (?, ?, ?)',
+                         ((f"user_{i}", 30, f"{i:04d}") for i in range(50)))
+        conn.executemany(
+            'INSERT INTO access_logs (user_name, access_method, success, confidence) VALUES (?, ?, ?, ?)',
+            ((f"user_{i % 50}", "facial_recognition", 1, 0.9) for i in range(size)))
+
+    client = edge_api.app.test_client()
+    legacy = median_ms(legacy_status, repeats)
+    inicio = time.perf_counter()
+    etag = client.get('/api/status').headers['ETag']
+    first = (time.perf_counter() - inicio) * 1000
+    cached = median_ms(lambda: client.get('/api/status'), repeats)
+    not_modified = median_ms(lambda: client.get('/api/status', headers={'If-None-Match': etag}), repeats)
+
+    def after_log():
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.log_access("user_1", "facial_recognition", True, 0.9)
+        client.get('/api/status')
+    rebuilt = median_ms(after_log, repeats)
+    database.flush_access_logs()
+    return legacy, first, cached, not_modified, rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'logs':>9} {'antes':>9} {'primera':>9} {'en caché':>9} {'304':>9} {'tras log':>9}   (ms, mediana)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            r = bench(size, args.repeats, tmp)
+            print(f"{size:>9} " + " ".join(f"{v:>9.3f}" for v in r))
+        database.close_all()
@@ -0,0 +1,295 @@
+import sqlite3
+import threading
+import time
+
+import database
+from metrics import REGISTRY
+
+DEFAULT_DEVICE = "default"
+# Tiempo máximo que un long-poll puede quedar bloqueado (segundos)
+MAX_LONG_POLL = 30
+# Un comando entregado sin confirmación se vuelve a entregar pasado este tiempo
+REDELIVERY_TIMEOUT = 10
+# Un OPEN viejo nunca debe ejecutarse: pasado el TTL el comando expira
+COMMAND_TTL = 30
+# Cantidad de confirmaciones recientes usadas para los percentiles de latencia
+LATENCY_WINDOW = 1000
+# Con varios procesos (serve.py) un push de otro worker no llega a la Condition local:
+# un hilo por proceso revisa los ids nuevos con esta frecuencia (segundos)
+CROSS_PROCESS_POLL = 0.1
+# Cada cuánto el hilo de mantenimiento marca los comandos vencidos como expired (segundos);
+# mientras tanto _claim ya los ignora por expires_at
+EXPIRE_INTERVAL = 5
+# Comandos acked/expired que se conservan para stats() antes de borrarlos (segundos)
+HISTORY_SECONDS = 86400
+# Cada cuánto se borra el historial viejo y se olvidan los dispositivos inactivos (segundos)
+PRUNE_INTERVAL = 3600
+# Un dispositivo sin polls ni push por más de esto pierde su Condition en memoria
+DEVICE_IDLE_SECONDS = 10 * MAX_LONG_POLL
+
+QUEUED, DELIVERED, ACKED, EXPIRED = "queued", "delivered", "acked", "expired"
+
+COMMANDS = REGISTRY.counter("facelock_commands_total", "Comandos por evento de su ciclo de vida", ("event",))
+ACK_SECONDS = REGISTRY.histogram("facelock_command_ack_seconds", "Tiempo entre la entrega de un comando y su ack")
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS commands (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        device_id TEXT NOT NULL,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'queued',
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        delivered_at REAL,
+        acked_at REAL,
+        attempts INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    # Dequeue y ack: búsqueda por dispositivo y estado en orden de llegada
+    'CREATE INDEX IF NOT EXISTS idx_commands_device_state ON commands (device_id, state, id)',
+    # Profundidad de cola por estado sin recorrer el historial
+    'CREATE INDEX IF NOT EXISTS idx_commands_state ON commands (state, device_id)',
+)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class CommandQueue:
+    """Cola de comandos por dispositivo persistida en SQLite, con confirmación.
+
+    Estados: queued → delivered → acked; los que superan COMMAND_TTL pasan a
+    expired. Un comando entregado y no confirmado en REDELIVERY_TIMEOUT se
+    vuelve a entregar. Los pollers esperan en una Condition por dispositivo
+    (long-poll) y push() despierta solo a los de ese dispositivo; con varios
+    procesos, watch_other_processes() despierta también por los push de los
+    otros workers. start() lanza el mantenimiento: marca los vencidos, borra
+    el historial viejo y olvida los dispositivos inactivos.
+    """
+
+    def __init__(self, ttl=COMMAND_TTL, redelivery_timeout=REDELIVERY_TIMEOUT):
+        self.ttl = ttl
+        self.redelivery_timeout = redelivery_timeout
+        self._lock = threading.Lock()
+        self._conditions = {}
+        # Contador de push por dispositivo: evita perder un aviso entre la consulta y el wait
+        self._versions = {}
+        # Último poll o push por dispositivo (monotonic), para olvidar los inactivos
+        self._touched = {}
+        with database.connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def _condition(self, device_id):
+        cond = self._conditions.get(device_id)
+        if cond is None:
+            cond = self._conditions[device_id] = threading.Condition(self._lock)
+        return cond
+
+    def _wake(self, device_ids):
+        now = time.monotonic()
+        with self._lock:
+            for device_id in device_ids:
+                self._versions[device_id] = self._versions.get(device_id, 0) + 1
+                self._touched[device_id] = now
+                self._condition(device_id).notify()
+
+    def start(self, expire_interval=EXPIRE_INTERVAL, prune_interval=PRUNE_INTERVAL):
+        """Lanza el hilo de mantenimiento. Con varios workers cada uno corre el suyo (es idempotente)."""
+        def run():
+            pruned_at = time.monotonic()
+            while True:
+                time.sleep(expire_interval)
+                try:
+                    self.expire()
+                    if time.monotonic() - pruned_at >= prune_interval:
+                        pruned_at = time.monotonic()
+                        self.prune()
+                except sqlite3.Error as e:
+                    print(f"Error en el mantenimiento de la cola de comandos: {e}")
+
+        threading.Thread(target=run, name="command-queue-maintenance", daemon=True).start()
+        return self
+
+    def expire(self):
+        """Marca como expired los comandos vencidos sin confirmar. Devuelve cuántos."""
+        with database.connection() as conn:
+            expired = conn.execute(
+                'UPDATE commands SET state = ? WHERE state IN (?, ?) AND expires_at <= ?',
+                (EXPIRED, QUEUED, DELIVERED, time.time())
+            ).rowcount
+        COMMANDS.labels("expired").inc(expired)
+        return expired
+
+    def prune(self, history_seconds=HISTORY_SECONDS, idle_seconds=DEVICE_IDLE_SECONDS):
+        """Borra los comandos acked/expired viejos y olvida los dispositivos inactivos. Devuelve las filas borradas."""
+        with database.connection() as conn:
+            deleted = conn.execute(
+                'DELETE FROM commands WHERE state IN (?, ?) AND created_at < ?',
+                (ACKED, EXPIRED, time.time() - history_seconds)
+            ).rowcount
+        # Un pop en curso relee su versión en cada vuelta (y la toca): un dispositivo
+        # inactivo hace más de idle_seconds no tiene a nadie comparando la versión vieja
+        limit = time.monotonic() - idle_seconds
+        with self._lock:
+            for device_id in [d for d, touched in self._touched.items() if touched < limit]:
+                del self._touched[device_id]
+                self._versions.pop(device_id, None)
+                self._conditions.pop(device_id, None)
+        return deleted
+
+    def push(self, device_id, command):
+        """Persiste el comando y despierta a los pollers del dispositivo. Devuelve su id."""
+        now = time.time()
+        with database.connection() as conn:
+            command_id = conn.execute(
+                'INSERT INTO commands (device_id, command, state, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (device_id, command, QUEUED, now, now + self.ttl)
+            ).lastrowid
+        COMMANDS.labels("pushed").inc()
+        self._wake((device_id,))
+        return command_id
+
+    def watch_other_processes(self, interval=CROSS_PROCESS_POLL):
+        """Despierta a los pollers locales cuando otro proceso encola comandos para sus dispositivos."""
+        with database.connection() as conn:
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM commands').fetchone()[0]
+
+        def run():
+            nonlocal last_id
+            while True:
+                time.sleep(interval)
+                # Rango sobre la PK: no cuesta nada cuando no hay comandos nuevos
+                try:
+                    with database.connection() as conn:
+                        rows = conn.execute('SELECT id, device_id FROM commands WHERE id > ?', (last_id,)).fetchall()
+                except sqlite3.Error as e:
+                    print(f"Error revisando comandos de otros procesos: {e}")
+                    continue
+                if rows:
+                    last_id = max(row[0] for row in rows)
+                    self._wake({row[1] for row in rows})
+
+        threading.Thread(target=run, name="command-queue-watcher", daemon=True).start()
+
+    def _claim(self, device_id):
+        """Marca como entregado el siguiente comando vigente del dispositivo.
+
+        Solo escribe si hay algo que entregar: los vencidos se saltean por
+        expires_at y los marca expire(), no cada poll. El UPDATE exige el
+        estado leído, así dos pollers (o workers) nunca entregan el mismo.
+        """
+        while True:
+            now = time.time()
+            with database.connection() as conn:
+                row = conn.execute(
+                    '''SELECT id, command, delivered_at FROM commands
+                       WHERE device_id = ? AND state = ? AND expires_at > ?
+                       ORDER BY id LIMIT 1''',
+                    (device_id, QUEUED, now)
+                ).fetchone()
+                if row is None:
+                    # Entregados sin ack dentro del plazo de reentrega
+                    row = conn.execute(
+                        '''SELECT id, command, delivered_at FROM commands
+                           WHERE device_id = ? AND state = ? AND delivered_at <= ? AND expires_at > ?
+                           ORDER BY id LIMIT 1''',
+                        (device_id, DELIVERED, now - self.redelivery_timeout, now)
+                    ).fetchone()
+                if row is None:
+                    return None
+                command_id, command, delivered_at = row
+                claimed = conn.execute(
+                    '''UPDATE commands SET state = ?, delivered_at = ?, attempts = attempts + 1
+                       WHERE id = ? AND state IN (?, ?) AND delivered_at IS ?''',
+                    (DELIVERED, now, command_id, QUEUED, DELIVERED, delivered_at)
+                ).rowcount
+            if claimed:
+                COMMANDS.labels("delivered").inc()
+                return command_id, command
+
+    def pop(self, device_id, timeout=0):
+        """Entrega (id, comando) al dispositivo; espera hasta timeout segundos si no hay ninguno."""
+        deadline = time.monotonic() + min(timeout, MAX_LONG_POLL)
+        while True:
+            with self._lock:
+                version = self._versions.get(device_id, 0)
+                self._touched[device_id] = time.monotonic()
+            # La consulta a SQLite se hace fuera del lock para no serializar a los demás pollers
+            row = self._claim(device_id)
+            if row is not None:
+                return row
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._lock:
+                if self._versions.get(device_id, 0) == version:
+                    self._condition(device_id).wait(remaining)
+
+    def ack(self, device_id, command_id=None, command=None):
+        """Confirma un comando entregado, por id o por texto (el más antiguo sin ack)."""
+        now = time.time()
+        with database.connection() as conn:
+            if command_id is None:
+                row = conn.execute(
+                    'SELECT id FROM commands WHERE device_id = ? AND state = ? AND command = ? ORDER BY id LIMIT 1',
+                    (device_id, DELIVERED, command)
+                ).fetchone()
+                if row is None:
+                    return None
+                command_id = row[0]
+            updated = conn.execute(
+                'UPDATE commands SET state = ?, acked_at = ? WHERE id = ? AND device_id = ? AND state = ?',
+                (ACKED, now, command_id, device_id, DELIVERED)
+            ).rowcount
+            if updated:
+                delivered_at = conn.execute('SELECT delivered_at FROM commands WHERE id = ?',
+                                            (command_id,)).fetchone()[0]
+        if not updated:
+            return None
+        COMMANDS.labels("acked").inc()
+        ACK_SECONDS.observe(now - delivered_at)
+        return command_id
+
+    def pending_count(self, device_id=None):
+        """Comandos vigentes aún no confirmados."""
+        now = time.time()
+        with database.connection() as conn:
+            if device_id is not None:
+                return conn.execute(
+                    'SELECT COUNT(*) FROM commands WHERE device_id = ? AND state IN (?, ?) AND expires_at > ?',
+                    (device_id, QUEUED, DELIVERED, now)
+                ).fetchone()[0]
+            return conn.execute(
+                'SELECT COUNT(*) FROM commands WHERE state IN (?, ?) AND expires_at > ?',
+                (QUEUED, DELIVERED, now)
+            ).fetchone()[0]
+
+    def stats(self):
+        """Profundidad por estado y percentiles de latencia entrega→ack por dispositivo."""
+        with database.connection() as conn:
+            devices = {}
+            for device_id, state, count in conn.execute(
+                '''SELECT device_id, state, COUNT(*) FROM commands
+                   WHERE state IN (?, ?) AND expires_at > ? GROUP BY device_id, state''',
+                (QUEUED, DELIVERED, time.time())
+            ):
+                devices.setdefault(device_id, {QUEUED: 0, DELIVERED: 0})[state] = count
+
+            for (device_id,) in conn.execute('SELECT DISTINCT device_id FROM commands WHERE state = ?', (ACKED,)).fetchall():
+                latencies = [row[0] for row in conn.execute(
+                    '''SELECT acked_at - delivered_at FROM commands
+                       WHERE device_id = ? AND state = ? ORDER BY id DESC LIMIT ?''',
+                    (device_id, ACKED, LATENCY_WINDOW)
+                )]
+                entry = devices.setdefault(device_id, {QUEUED: 0, DELIVERED: 0})
+                entry['ack_latency_ms'] = {
+                    f'p{pct}': round(percentile(latencies, pct) * 1000, 1) for pct in (50, 95, 99)
+                }
+                entry['ack_samples'] = len(latencies)
+        return devices
@@ -1,121 +1,692 @@
 import sqlite3
 import os
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from batch_writer import BatchWriter
+from export import CHUNK_ROWS as EXPORT_CHUNK_ROWS
+from metrics import REGISTRY
 
 DB_PATH = os.path.join(os.getcwd(), "facelock.db")
 
+# Conexiones abiertas como máximo; si todas están en uso, se espera a que se libere una
+POOL_SIZE = 8
+# Statements preparados que sqlite3 mantiene en caché por conexión
+CACHED_STATEMENTS = 64
+PRAGMAS = (
+    "PRAGMA auto_vacuum=INCREMENTAL",  # solo aplica a bases nuevas; permite devolver espacio tras podar
+    "PRAGMA journal_mode=WAL",      # lectores no bloquean al escritor
+    "PRAGMA synchronous=NORMAL",    # fsync en checkpoint, no en cada commit (seguro con WAL)
+    "PRAGMA busy_timeout=5000",     # esperar al lock en vez de fallar con 'database is locked'
+    "PRAGMA temp_store=MEMORY",
+)
+
+_pool = queue.LifoQueue()
+_pool_lock = threading.Lock()
+_pool_opened = 0
+_local = threading.local()
+
+# Group commit de access_logs: un flush cada LOG_BATCH_SIZE eventos o LOG_FLUSH_MS
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_MS = 50
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+# event_id ya procesados se recuerdan EVENT_IDS_TTL segundos (mucho más que lo que un
+# evento espera en el outbox del notifier); la poda corre a lo sumo cada EVENT_IDS_PRUNE_INTERVAL
+EVENT_IDS_TTL = 3600
+EVENT_IDS_PRUNE_INTERVAL = 60
+_events_pruned_at = 0.0
+
+# Últimos accesos que se mantienen en memoria para /api/status
+RECENT_LOGS = 10
+# Cada cuánto LiveStatus revisa en segundo plano si otro proceso modificó users (segundos)
+USERS_CHECK_INTERVAL = 1.0
+# Filas por página de GET /api/access_logs
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+DB_WRITE_SECONDS = REGISTRY.histogram(
+    "facelock_db_write_seconds", "Duración de las escrituras a SQLite", ("operation",))
+ACCESS_LOGS_WRITTEN = REGISTRY.counter(
+    "facelock_access_logs_written_total", "Logs de acceso escritos en SQLite")
+
+def _open_connection():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _acquire():
+    global _pool_opened
+    try:
+        conn, path = _pool.get_nowait()
+    except queue.Empty:
+        with _pool_lock:
+            can_open = _pool_opened < POOL_SIZE
+            if can_open:
+                _pool_opened += 1
+        if not can_open:
+            conn, path = _pool.get()
+        else:
+            return _open_connection(), DB_PATH
+    if path != DB_PATH:
+        # DB_PATH cambió (p. ej. en benchmarks): se descarta la conexión vieja
+        conn.close()
+        return _open_connection(), DB_PATH
+    return conn, path
+
+@contextmanager
+def connection():
+    """Presta una conexión del pool; las llamadas anidadas del mismo hilo reutilizan la misma.
+
+    Al salir del bloque más externo se hace commit (o rollback si hubo excepción).
+    """
+    held = getattr(_local, "held", None)
+    if held is not None:
+        _local.depth += 1
+        try:
+            yield held[0]
+        finally:
+            _local.depth -= 1
+        return
+
+    conn, path = _acquire()
+    _local.held = (conn, path)
+    _local.depth = 0
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _local.held = None
+        _pool.put((conn, path))
+
+def close_all():
+    """Cierra las conexiones libres del pool (al apagar el proceso)."""
+    global _pool_opened
+    while True:
+        try:
+            conn, _ = _pool.get_nowait()
+        except queue.Empty:
+            break
+        conn.close()
+        with _pool_lock:
+            _pool_opened -= 1
+
 def init_database():
     """Inicializa la base de datos y las tablas principales si no existen."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            age INTEGER,
-            pin TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS access_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_name TEXT,
-            access_method TEXT,
-            success BOOLEAN,
-            confidence REAL,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    with connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                age INTEGER,
+                pin TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_active BOOLEAN DEFAULT 1
+            )
+        ''')
+
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS access_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_name TEXT,
+                access_method TEXT,
+                success BOOLEAN,
+                confidence REAL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        migrate(conn)
 
-    conn.commit()
-    conn.close()
     print("Base de datos y tablas inicializadas correctamente.")
 
+# === Migraciones ===
+
+# (versión, descripción, sentencias). PRAGMA user_version guarda la última aplicada.
+# Las nuevas van siempre al final; una migración ya publicada no se edita.
+MIGRATIONS = (
+    (1, "índices de access_logs", (
+        'CREATE INDEX IF NOT EXISTS idx_access_logs_timestamp ON access_logs (timestamp)',
+        # (columna, id): el filtro más la paginación por id usan el mismo índice, sin ordenar
+        'CREATE INDEX IF NOT EXISTS idx_access_logs_user ON access_logs (user_name, id)',
+        'CREATE INDEX IF NOT EXISTS idx_access_logs_method ON access_logs (access_method, id)',
+        'CREATE INDEX IF NOT EXISTS idx_access_logs_success ON access_logs (success, id)',
+        # Estadísticas para que el planner prefiera user_name (selectivo) antes que success
+        'ANALYZE',
+    )),
+    (2, "rollups por hora y por día de access_logs", (
+        '''
+        CREATE TABLE IF NOT EXISTS access_stats (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            access_method TEXT NOT NULL,
+            success INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            confidence_sum REAL NOT NULL,
+            PRIMARY KEY (granularity, bucket, access_method, success)
+        ) WITHOUT ROWID
+        ''',
+        # Los logs que ya existían se agregan una sola vez; desde acá se mantiene al escribir
+        '''
+        INSERT INTO access_stats
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00', timestamp), COALESCE(access_method, ''),
+               COALESCE(success, 0), COUNT(*), COALESCE(SUM(confidence), 0)
+        FROM access_logs GROUP BY 2, 3, 4
+        ''',
+        '''
+        INSERT INTO access_stats
+        SELECT 'day', date(timestamp), COALESCE(access_method, ''),
+               COALESCE(success, 0), COUNT(*), COALESCE(SUM(confidence), 0)
+        FROM access_logs GROUP BY 2, 3, 4
+        ''',
+    )),
+    (3, "contador de repeticiones en access_logs", (
+        # Notificaciones repetidas dentro de la ventana de edge_api suman acá en vez de crear filas
+        'ALTER TABLE access_logs ADD COLUMN occurrences INTEGER NOT NULL DEFAULT 1',
+    )),
+    (4, "versión de la tabla users", (
+        # La incrementan los triggers en cualquier escritura a users, venga del proceso que venga:
+        # quien cachea users (SQLiteUserDirectory de iot_edge, LiveStatus) la lee para saber si recargar
+        'CREATE TABLE IF NOT EXISTS users_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)',
+        'INSERT OR IGNORE INTO users_version (id, version) VALUES (1, 0)',
+        '''CREATE TRIGGER IF NOT EXISTS users_version_insert AFTER INSERT ON users
+           BEGIN UPDATE users_version SET version = version + 1 WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS users_version_update AFTER UPDATE ON users
+           BEGIN UPDATE users_version SET version = version + 1 WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS users_version_delete AFTER DELETE ON users
+           BEGIN UPDATE users_version SET version = version + 1 WHERE id = 1; END''',
+    )),
+    (5, "eventos de acceso ya procesados", (
+        # event_id que manda el notifier: un lote reenviado tras un timeout no vuelve a loguear ni abrir
+        'CREATE TABLE IF NOT EXISTS processed_events (event_id TEXT PRIMARY KEY, received_at REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS idx_processed_events_received ON processed_events (received_at)',
+    )),
+    (6, "ventanas de coalescencia compartidas entre workers", (
+        # Una fila por (usuario, puerta, resultado); ver access_coalescer.py
+        '''
+        CREATE TABLE IF NOT EXISTS access_windows (
+            user_name TEXT NOT NULL,
+            device_id TEXT NOT NULL,
+            granted INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            repeats INTEGER NOT NULL,
+            log_id INTEGER,
+            PRIMARY KEY (user_name, device_id, granted)
+        ) WITHOUT ROWID
+        ''',
+    )),
+    (7, "repeticiones coalescidas en access_stats", (
+        # Hasta acá los rollups contaban filas: se suman las repeticiones que ya tenían los logs
+        '''
+        INSERT INTO access_stats
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00', timestamp), COALESCE(access_method, ''),
+               COALESCE(success, 0), SUM(occurrences - 1), COALESCE(SUM((occurrences - 1) * confidence), 0)
+        FROM access_logs WHERE occurrences > 1 GROUP BY 2, 3, 4
+        ON CONFLICT (granularity, bucket, access_method, success) DO UPDATE SET
+            count = count + excluded.count,
+            confidence_sum = confidence_sum + excluded.confidence_sum
+        ''',
+        '''
+        INSERT INTO access_stats
+        SELECT 'day', date(timestamp), COALESCE(access_method, ''),
+               COALESCE(success, 0), SUM(occurrences - 1), COALESCE(SUM((occurrences - 1) * confidence), 0)
+        FROM access_logs WHERE occurrences > 1 GROUP BY 2, 3, 4
+        ON CONFLICT (granularity, bucket, access_method, success) DO UPDATE SET
+            count = count + excluded.count,
+            confidence_sum = confidence_sum + excluded.confidence_sum
+        ''',
+    )),
+)
+
+def migrate(conn):
+    """Aplica las migraciones pendientes, cada una en su propia transacción."""
+    conn.commit()
+    for number, description, statements in MIGRATIONS:
+        # IMMEDIATE: si dos procesos arrancan juntos, el segundo espera y ve la versión nueva
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= number:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        print(f"Migración {number} aplicada: {description}")
+
+# === Estado en memoria para /api/status ===
+
+class LiveStatus:
+    """Usuarios activos y últimos accesos, mantenidos en memoria.
+
+    Se leen de SQLite una sola vez y después los actualizan el escritor de
+    access_logs (después de cada commit, con el id de cada log), save_user,
+    activate/deactivate_user, delete_user y delete_all_access_logs.
+    `version` cambia con cada modificación; snapshot() no toca SQLite salvo
+    en la primera carga.
+
+    Otros procesos también escriben users (la app al registrar, enroll.py):
+    un hilo lee users_version (una fila) cada USERS_CHECK_INTERVAL y, si
+    cambió, vuelve a contar los usuarios activos. Con varios workers
+    (serve.py) los logs también los escriben otros procesos: con
+    reload_every() el mismo hilo relee los últimos logs cada tantos segundos.
+    Ambas consultas usan la PK y no dependen del tamaño de access_logs.
+    """
+
+    def __init__(self, size=RECENT_LOGS):
+        self.size = size
+        self.version = 0
+        self._lock = threading.Lock()
+        self._active_users = None
+        self._recent = deque(maxlen=size)  # (id, fila)
+        self._cleared = 0
+        self._reload_interval = None
+        self._loaded_at = 0.0
+        self._path = None
+        self._users_version = None
+        self._refresher = None
+
+    def reload_every(self, seconds):
+        self._reload_interval = seconds
+
+    def _read(self):
+        """(users_version, usuarios activos, últimos logs con su id) desde SQLite."""
+        with connection() as conn:
+            users_version = _users_version(conn)
+            active = conn.execute('SELECT COUNT(*) FROM users WHERE is_active = 1').fetchone()[0]
+            # El id crece con el timestamp: ORDER BY id usa la PK en vez de ordenar toda la tabla
+            recent = conn.execute('''
+                SELECT id, user_name, access_method, success, confidence, timestamp
+                FROM access_logs ORDER BY id DESC LIMIT ?
+            ''', (self.size,)).fetchall()
+        return users_version, active, [(row[0], row[1:]) for row in reversed(recent)]
+
+    def _reload(self):
+        """Relee todo de SQLite sin tomar el lock durante la consulta."""
+        with self._lock:
+            cleared = self._cleared
+            known_id = self._recent[-1][0] if self._recent and self._path == DB_PATH else None
+        users_version, active, recent = self._read()
+        with self._lock:
+            if cleared == self._cleared:
+                if known_id is not None:
+                    # Quedan los logs que el escritor agregó mientras se leía: AUTOINCREMENT no
+                    # reusa ids, así que son los de id mayor a lo leído y a lo que ya estaba
+                    newer = max(known_id, recent[-1][0] if recent else 0)
+                    recent += [entry for entry in self._recent if entry[0] > newer]
+                recent = deque(recent, maxlen=self.size)
+                if recent != self._recent:
+                    self._recent = recent
+                    self.version += 1
+            if active != self._active_users:
+                self._active_users = active
+                self.version += 1
+            self._users_version = users_version
+            self._loaded_at = time.monotonic()
+            self._path = DB_PATH
+
+    def _check_users(self):
+        """Recuenta los usuarios activos si otro proceso modificó users (users_version cambió)."""
+        with connection() as conn:
+            users_version = _users_version(conn)
+            if users_version == self._users_version and users_version is not None:
+                return
+            active = conn.execute('SELECT COUNT(*) FROM users WHERE is_active = 1').fetchone()[0]
+        with self._lock:
+            self._users_version = users_version
+            if active != self._active_users:
+                self._active_users = active
+                self.version += 1
+
+    def _refresh(self):
+        while True:
+            time.sleep(USERS_CHECK_INTERVAL)
+            try:
+                expired = (self._reload_interval is not None
+                           and time.monotonic() - self._loaded_at > self._reload_interval)
+                # DB_PATH cambia en los benchmarks: el estado de otra base no sirve
+                if expired or self._path != DB_PATH:
+                    self._reload()
+                else:
+                    self._check_users()
+            except Exception as e:
+                print(f"Error actualizando el estado en memoria: {e}")
+
+    def snapshot(self):
+        """(version, usuarios activos, últimos accesos del más nuevo al más viejo)."""
+        if self._active_users is None or self._path != DB_PATH:
+            self._reload()
+        if self._refresher is None:
+            with self._lock:
+                if self._refresher is None:
+                    # Se arranca en el primer uso: con gunicorn, ya dentro del worker
+                    self._refresher = threading.Thread(target=self._refresh, name="live-status", daemon=True)
+                    self._refresher.start()
+        with self._lock:
+            return self.version, self._active_users, tuple(row for _, row in reversed(self._recent))
+
+    def add_logs(self, first_id, rows):
+        """Logs recién escritos, con ids consecutivos desde first_id (los llama el escritor tras el commit)."""
+        with self._lock:
+            last_id = self._recent[-1][0] if self._recent else 0
+            added = [(first_id + i, row) for i, row in enumerate(rows) if first_id + i > last_id]
+            if added:
+                self._recent.extend(added)
+                self.version += 1
+
+    def clear_logs(self):
+        with self._lock:
+            self._recent.clear()
+            self._cleared += 1
+            self.version += 1
+
+    def add_users(self, delta):
+        if not delta:
+            return
+        with self._lock:
+            if self._active_users is not None:
+                self._active_users += delta
+            self.version += 1
+
+def _users_version(conn):
+    row = conn.execute('SELECT version FROM users_version WHERE id = 1').fetchone()
+    return row[0] if row else None
+
+live_status = LiveStatus()
+
 def save_user(name, age, pin):
     """Guarda un usuario nuevo o actualiza el PIN si el usuario ya existe."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO users (name, age, pin, is_active)
-        VALUES (?, ?, ?, 1)
-    ''', (name, age, pin))
-    conn.commit()
-    conn.close()
+    with DB_WRITE_SECONDS.labels("save_user").time(), connection() as conn:
+        previous = conn.execute('SELECT is_active FROM users WHERE name = ?', (name,)).fetchone()
+        conn.execute('''
+            INSERT OR REPLACE INTO users (name, age, pin, is_active)
+            VALUES (?, ?, ?, 1)
+        ''', (name, age, pin))
+    live_status.add_users(0 if previous and previous[0] else 1)
     print(f"Usuario '{name}' guardado en base de datos.")
 
+def save_users(users):
+    """Guarda varios usuarios [(nombre, edad, pin)] en una sola transacción (enroll.py)."""
+    users = list(users)
+    with DB_WRITE_SECONDS.labels("save_users").time(), connection() as conn:
+        active = {row[0] for row in conn.execute('SELECT name FROM users WHERE is_active = 1')}
+        conn.executemany('''
+            INSERT OR REPLACE INTO users (name, age, pin, is_active)
+            VALUES (?, ?, ?, 1)
+        ''', users)
+    live_status.add_users(len({name for name, _, _ in users} - active))
+    print(f"{len(users)} usuarios guardados en base de datos.")
+
 def get_user_by_name(name):
     """Obtiene los datos de un usuario por nombre."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, age, pin, is_active FROM users WHERE name = ?', (name,))
-    user = cursor.fetchone()
-    conn.close()
-    return user
+    with connection() as conn:
+        return conn.execute('SELECT id, name, age, pin, is_active FROM users WHERE name = ?', (name,)).fetchone()
 
 def get_user_by_pin(pin):
     """Obtiene el nombre del usuario asociado a un PIN activo."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT name FROM users WHERE pin = ? AND is_active = 1', (pin,))
-    user = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        user = conn.execute('SELECT name FROM users WHERE pin = ? AND is_active = 1', (pin,)).fetchone()
     return user[0] if user else None
 
-def log_access(user_name, method, success, confidence=0.0):
-    """Registra un intento de acceso en la tabla de logs."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO access_logs (user_name, access_method, success, confidence)
-        VALUES (?, ?, ?, ?)
-    ''', (user_name, method, int(success), confidence))
-    conn.commit()
-    conn.close()
+def _rollup(entries):
+    """Suma por hora y por día: una fila de access_stats por bucket, método y resultado.
+
+    entries: (método, resultado, confianza, timestamp, accesos). Las repeticiones
+    coalescidas cuentan como accesos, con la confianza de su log.
+    """
+    totals = {}
+    for method, success, confidence, timestamp, count in entries:
+        for granularity, bucket in (('hour', timestamp[:13] + ':00:00'), ('day', timestamp[:10])):
+            entry = totals.setdefault((granularity, bucket, method or '', success), [0, 0.0])
+            entry[0] += count
+            entry[1] += (confidence or 0.0) * count
+    return [key + tuple(value) for key, value in totals.items()]
+
+def _write_access_logs(items):
+    # items: (fila, ventana) de log_access o (None, ventana) de count_repeat, en orden de llegada.
+    # ventana: la de access_coalescer (en memoria o en access_windows), o None
+    rows = [row for row, _ in items if row is not None]
+    windows = [window for row, window in items if row is not None]
+    touched = {window.key: window for _, window in items if window is not None}
+    entries = [row[1:] + (1,) for row in rows]
+    with DB_WRITE_SECONDS.labels("access_logs_batch").time(), connection() as conn:
+        if rows:
+            conn.executemany('''
+                INSERT INTO access_logs (user_name, access_method, success, confidence, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            # Un solo escritor dentro de la transacción: los ids del lote son consecutivos
+            first_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0] - len(rows) + 1
+            for i, window in enumerate(windows):
+                if window is not None:
+                    window.link(conn, first_id + i)
+        # Repeticiones de cada ventana, incluidas las contadas (quizá en otro worker) antes de que
+        # su log existiera. Asignación y no incremento: el mismo log puede actualizarse en cualquier orden.
+        for window in touched.values():
+            linked = window.linked_log(conn)
+            if linked is None:
+                continue
+            log_id, occurrences = linked
+            log = conn.execute('''
+                SELECT access_method, success, confidence, timestamp, occurrences FROM access_logs WHERE id = ?
+            ''', (log_id,)).fetchone()
+            # Log ya podado, o ya al día
+            if log is None or log[4] >= occurrences:
+                continue
+            conn.execute('UPDATE access_logs SET occurrences = ? WHERE id = ?', (occurrences, log_id))
+            entries.append(log[:4] + (occurrences - log[4],))
+        # Misma transacción: los rollups nunca quedan desfasados de los logs ni de sus repeticiones
+        conn.executemany('''
+            INSERT INTO access_stats (granularity, bucket, access_method, success, count, confidence_sum)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (granularity, bucket, access_method, success) DO UPDATE SET
+                count = count + excluded.count,
+                confidence_sum = confidence_sum + excluded.confidence_sum
+        ''', _rollup(entries))
+    ACCESS_LOGS_WRITTEN.inc(len(rows))
+    if rows:
+        # Después del commit: en memoria solo hay logs que ya están en SQLite
+        live_status.add_logs(first_id, rows)
+
+def _get_log_writer():
+    global _log_writer
+    if _log_writer is None:
+        with _log_writer_lock:
+            if _log_writer is None:
+                # Lotes que fallan tras los reintentos quedan junto a la base para recuperarlos a mano
+                _log_writer = BatchWriter(_write_access_logs, LOG_BATCH_SIZE, LOG_FLUSH_MS,
+                                          name="access-logs-writer", dead_letter=f"{DB_PATH}.failed.jsonl")
+                atexit.register(_log_writer.close)
+    return _log_writer
+
+def log_access(user_name, method, success, confidence=0.0, window=None):
+    """Encola un intento de acceso; el escritor en segundo plano lo guarda por lotes.
+
+    window: ventana de access_coalescer que abrió este acceso; el log queda enlazado a ella.
+    """
+    # Hora del evento (no la del flush), en el formato de CURRENT_TIMESTAMP de SQLite (UTC)
+    row = (user_name, method, int(success), confidence, time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()))
+    _get_log_writer().put((row, window))
     print(f"Log: {'' if success else ''} {user_name} - {method} - {confidence:.2f}")
 
+def count_repeat(window):
+    """Lleva las repeticiones de la ventana al occurrences de su log en vez de escribir uno nuevo."""
+    _get_log_writer().put((None, window))
+
+def claim_event(event_id):
+    """True si el evento es nuevo; False si ya se procesó (un reintento del notifier)."""
+    global _events_pruned_at
+    now = time.time()
+    with DB_WRITE_SECONDS.labels("claim_event").time(), connection() as conn:
+        if now - _events_pruned_at > EVENT_IDS_PRUNE_INTERVAL:
+            conn.execute('DELETE FROM processed_events WHERE received_at < ?', (now - EVENT_IDS_TTL,))
+            _events_pruned_at = now
+        return conn.execute('INSERT OR IGNORE INTO processed_events (event_id, received_at) VALUES (?, ?)',
+                            (event_id, now)).rowcount == 1
+
+def release_event(event_id):
+    """Olvida un evento que falló al procesarse, para que su reintento no se tome como repetido."""
+    with connection() as conn:
+        conn.execute('DELETE FROM processed_events WHERE event_id = ?', (event_id,))
+
+def flush_access_logs(timeout=None):
+    """Espera a que los logs encolados queden escritos."""
+    return _log_writer.flush(timeout) if _log_writer else True
+
+def access_log_queue_depth():
+    """Logs encolados pendientes de escritura."""
+    return _log_writer.queue_depth() if _log_writer else 0
+
+REGISTRY.gauge("facelock_access_log_queue_depth",
+               "Logs de acceso encolados pendientes de escritura").set_function(access_log_queue_depth)
+_LOGS_LOST = REGISTRY.gauge("facelock_access_logs_lost",
+                            "Logs de acceso no escritos en SQLite desde el arranque", ("reason",))
+# dropped: cola llena; failed: el lote falló tras los reintentos (quedó en el dead-letter)
+_LOGS_LOST.set_function(lambda: _log_writer.dropped if _log_writer else 0, "dropped")
+_LOGS_LOST.set_function(lambda: _log_writer.failed if _log_writer else 0, "failed")
+
 def get_recent_logs(limit=10):
     """Obtiene los últimos accesos registrados."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT user_name, access_method, success, confidence, timestamp 
-        FROM access_logs 
-        ORDER BY timestamp DESC 
-        LIMIT ?
-    ''', (limit,))
-    logs = cursor.fetchall()
-    conn.close()
-    return logs
+    with connection() as conn:
+        return conn.execute('''
+            SELECT user_name, access_method, success, confidence, timestamp
+            FROM access_logs
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+
+def _log_filters(user, method, success, since, until, cursor):
+    """WHERE y parámetros comunes a la paginación y a la exportación."""
+    clauses = []
+    params = []
+    for condition, value in (('user_name = ?', user), ('access_method = ?', method), ('success = ?', success),
+                             ('timestamp >= ?', since), ('timestamp < ?', until), cursor):
+        if value is not None:
+            clauses.append(condition)
+            params.append(value)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+def query_access_logs(user=None, method=None, success=None, since=None, until=None,
+                      before_id=None, limit=DEFAULT_PAGE_SIZE):
+    """Una página de logs, del más nuevo al más viejo.
+
+    Paginación por keyset: before_id es el id del último log de la página
+    anterior, así cada página cuesta lo mismo sin importar cuán atrás esté.
+    since/until son timestamps UTC 'YYYY-MM-DD[ HH:MM:SS]' (until excluido).
+    """
+    where, params = _log_filters(user, method, success, since, until, ('id < ?', before_id))
+    with connection() as conn:
+        return conn.execute(f'''
+            SELECT id, user_name, access_method, success, confidence, timestamp, occurrences
+            FROM access_logs {where}
+            ORDER BY id DESC
+            LIMIT ?
+        ''', params + [min(limit, MAX_PAGE_SIZE)]).fetchall()
+
+def iter_access_logs(user=None, method=None, success=None, since=None, until=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Lotes de logs del más viejo al más nuevo, para exportar.
+
+    Cada lote es una consulta corta por keyset (id > último): no se mantiene
+    una transacción de lectura abierta ni una conexión del pool mientras el
+    cliente consume la respuesta.
+    """
+    last_id = 0
+    while True:
+        where, params = _log_filters(user, method, success, since, until, ('id > ?', last_id))
+        with connection() as conn:
+            rows = conn.execute(f'''
+                SELECT id, user_name, access_method, success, confidence, timestamp, occurrences
+                FROM access_logs {where}
+                ORDER BY id
+                LIMIT ?
+            ''', params + [chunk_rows]).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+def get_access_stats(granularity='hour', since=None, until=None, method=None, success=None):
+    """Totales por bucket desde access_stats (no lee access_logs)."""
+    clauses = ['granularity = ?']
+    params = [granularity]
+    for condition, value in (('bucket >= ?', since), ('bucket < ?', until),
+                             ('access_method = ?', method), ('success = ?', success)):
+        if value is not None:
+            clauses.append(condition)
+            params.append(value)
+    with connection() as conn:
+        return conn.execute(f'''
+            SELECT bucket, access_method, success, count, confidence_sum
+            FROM access_stats WHERE {' AND '.join(clauses)}
+            ORDER BY bucket, access_method, success
+        ''', params).fetchall()
+
+def count_active_users():
+    """Cantidad de usuarios activos."""
+    with connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM users WHERE is_active = 1').fetchone()[0]
 
 def get_all_users():
     """Devuelve todos los usuarios registrados."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, age, pin, created_at, is_active FROM users')
-    users = cursor.fetchall()
-    conn.close()
-    return users
+    with connection() as conn:
+        return conn.execute('SELECT id, name, age, pin, created_at, is_active FROM users').fetchall()
+
+def iter_users(chunk_rows=EXPORT_CHUNK_ROWS):
+    """Lotes de usuarios por id, con la misma estrategia que iter_access_logs."""
+    last_id = 0
+    while True:
+        with connection() as conn:
+            rows = conn.execute(
+                'SELECT id, name, age, pin, created_at, is_active FROM users WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, chunk_rows)).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
 
 def deactivate_user(name):
     """Desactiva (baja lógica) un usuario."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE users SET is_active = 0 WHERE name = ?', (name,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        changed = conn.execute('UPDATE users SET is_active = 0 WHERE name = ? AND is_active = 1', (name,)).rowcount
+    live_status.add_users(-changed)
     print(f"Usuario '{name}' desactivado.")
 
 def activate_user(name):
     """Activa un usuario previamente desactivado."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE users SET is_active = 1 WHERE name = ?', (name,))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        changed = conn.execute('UPDATE users SET is_active = 1 WHERE name = ? AND is_active = 0', (name,)).rowcount
+    live_status.add_users(changed)
     print(f"Usuario '{name}' activado.")
 
+def delete_user(name):
+    """Elimina un usuario por nombre. Devuelve la cantidad de filas borradas."""
+    with connection() as conn:
+        was_active = conn.execute('SELECT is_active FROM users WHERE name = ?', (name,)).fetchone()
+        deleted = conn.execute('DELETE FROM users WHERE name = ?', (name,)).rowcount
+    live_status.add_users(-1 if deleted and was_active[0] else 0)
+    return deleted
+
+def delete_all_access_logs():
+    """Elimina todos los logs de acceso. Devuelve la cantidad de filas borradas."""
+    flush_access_logs()
+    with connection() as conn:
+        deleted = conn.execute('DELETE FROM access_logs').rowcount
+        conn.execute('DELETE FROM access_stats')
+        conn.execute('DELETE FROM access_windows')
+    live_status.clear_logs()
+    return deleted
+
 if __name__ == "__main__":
     init_database()
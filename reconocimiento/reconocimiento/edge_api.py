@@ -1,65 +1,254 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
-import sqlite3
+import hashlib
+import itertools
+import math
+import os
 import threading
+import time
+
+from flask import Flask, Response, g, jsonify, request
+from flask_cors import CORS
 from datetime import datetime
-import os
-from database import log_access  
+import database
+from database import log_access
+from access_coalescer import AccessCoalescer, COALESCE_SECONDS, SharedAccessCoalescer
+from command_queue import CommandQueue, DEFAULT_DEVICE
+from export import MIMETYPES, chunks as export_chunks, json_array_chunks
+from metrics import REGISTRY
+from retention import RetentionJob
 app = Flask(__name__)
 CORS(app)
 
-DB_PATH = os.path.join(os.getcwd(), "facelock.db")
+# Tablas y migraciones pendientes (idempotente; con varios workers solo uno aplica cada migración)
+database.init_database()
+
+# Cola persistente de comandos por dispositivo (ESP32), con su hilo de mantenimiento
+command_queue = CommandQueue().start()
+
+# Long-polls que pueden esperar a la vez en este proceso (serve.py lo calcula desde los hilos;
+# vacío = sin límite, como el servidor de desarrollo). Los que exceden el límite se responden en
+# el acto, con Retry-After, para que los polls inactivos no ocupen todos los hilos.
+LONG_POLL_SLOTS = int(os.environ['FACELOCK_LONG_POLL_SLOTS']) if os.environ.get('FACELOCK_LONG_POLL_SLOTS') else None
+_long_poll_slots = threading.BoundedSemaphore(LONG_POLL_SLOTS) if LONG_POLL_SLOTS else None
+# Segundos que un ESP32 sin lugar para esperar debería dejar pasar antes de volver a consultar
+LONG_POLL_RETRY_AFTER = 1
+
+# Con varios workers (serve.py) nada se comparte en memoria: los comandos viven en
+# SQLite y las métricas se juntan desde un directorio común
+WORKERS = int(os.environ.get('FACELOCK_WORKERS', '1'))
+if WORKERS > 1:
+    command_queue.watch_other_processes()
+    REGISTRY.share(os.environ.get('FACELOCK_METRICS_DIR', 'metrics'))
+
+# Retención de access_logs (vacío = sin límite). Los totales de access_stats no se podan.
+# Con varios workers cada uno arranca el job, pero un lock de archivo deja podar a uno solo.
+RETENTION_DAYS = float(os.environ['FACELOCK_RETENTION_DAYS']) if os.environ.get('FACELOCK_RETENTION_DAYS') else None
+RETENTION_MAX_ROWS = int(os.environ['FACELOCK_RETENTION_MAX_ROWS']) if os.environ.get('FACELOCK_RETENTION_MAX_ROWS') else None
+ARCHIVE_DIR = os.environ.get('FACELOCK_ARCHIVE_DIR') or None
+retention_job = None
+if RETENTION_DAYS is not None or RETENTION_MAX_ROWS is not None:
+    retention_job = RetentionJob(database.DB_PATH, 'access_logs', max_age_days=RETENTION_DAYS,
+                                 max_rows=RETENTION_MAX_ROWS, archive_dir=ARCHIVE_DIR).start()
+
+# Notificaciones repetidas de la misma persona en la misma puerta dentro de esta ventana
+# suman al log existente y no encolan otro OPEN (0 = desactivado). Con un proceso la
+# ventana vive en memoria; con varios workers, en SQLite para que todos vean la misma.
+COALESCE_WINDOW = float(os.environ.get('FACELOCK_COALESCE_SECONDS', COALESCE_SECONDS))
+access_coalescer = (SharedAccessCoalescer if WORKERS > 1 else AccessCoalescer)(COALESCE_WINDOW)
 
-pending_commands = []
-command_lock = threading.Lock()
+# Un acceso concedido que llega más de GRANT_MAX_AGE segundos después de ocurrir (p. ej. tras
+# esperar en el outbox del notifier con el Edge API caído) se registra pero no abre la puerta
+GRANT_MAX_AGE = float(os.environ.get('FACELOCK_GRANT_MAX_AGE', '10'))
+
+# /api/status se arma desde memoria (database.live_status) y la respuesta se reutiliza
+# hasta que cambie el estado o pasen STATUS_MAX_AGE segundos
+STATUS_MAX_AGE = 1
+_status_cache = None
+# pending_commands de /api/status: el COUNT a SQLite se reutiliza hasta PENDING_MAX_AGE segundos
+PENDING_MAX_AGE = 5
+_pending_cache = (float('-inf'), 0)
+if WORKERS > 1:
+    # Los cambios hechos por otros workers se ven a lo sumo con este retraso
+    database.live_status.reload_every(STATUS_MAX_AGE)
+
+# === Métricas ===
+
+HTTP_SECONDS = REGISTRY.histogram(
+    "facelock_http_request_seconds", "Duración de las requests del Edge API", ("route", "method"))
+ACCESS_EVENTS = REGISTRY.counter(
+    "facelock_access_events_total", "Eventos de acceso recibidos por resultado", ("result",))
+ACCESS_COALESCED = REGISTRY.counter(
+    "facelock_access_coalesced_total", "Notificaciones repetidas sumadas a un log existente")
+LONG_POLLS_SHED = REGISTRY.counter(
+    "facelock_long_polls_shed_total", "Long-polls respondidos sin esperar por falta de hilos libres")
+REGISTRY.gauge("facelock_pending_commands",
+               "Comandos encolados sin entregar").set_function(command_queue.pending_count)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # La regla (/api/users/<username>) y no la URL, para no crear una serie por usuario
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_SECONDS.labels(route, request.method).observe(time.perf_counter() - start)
+    return response
 
 # === API PRINCIPALES ===
 
 @app.route('/api/get-pending-commands', methods=['GET'])
 def get_pending_commands():
-    """ESP32 consulta comandos pendientes."""
-    global pending_commands
-    with command_lock:
-        if pending_commands:
-            command = pending_commands.pop(0)  
-            print(f"Enviando comando a ESP32: {command}")
-            return command
-        else:
-            return "NONE"
+    """ESP32 consulta comandos pendientes.
 
-@app.route('/api/notify-access', methods=['POST'])
-def notify_access():
-    """Python notifica reconocimiento facial o PIN exitoso."""
-    global pending_commands
+    Con ?wait=<segundos> la respuesta se retiene (long-poll) hasta que llegue
+    un comando para ese dispositivo (?device_id=...) o se cumpla el tiempo.
+    Si ya hay LONG_POLL_SLOTS polls esperando se responde sin esperar.
+    """
+    device_id = request.args.get('device_id', DEFAULT_DEVICE)
+    wait = request.args.get('wait', 0, type=float)
+    holds_slot = shed = False
+    if wait > 0 and _long_poll_slots is not None:
+        holds_slot = _long_poll_slots.acquire(blocking=False)
+        shed = not holds_slot
+    if shed:
+        # Todos los lugares para esperar ocupados: se responde ya y el ESP32 reintenta tras Retry-After
+        LONG_POLLS_SHED.inc()
+        wait = 0
     try:
-        data = request.get_json()
-        user_name = data.get('user_name')
-        method = data.get('method', 'unknown')
-        success = data.get('success', False)
-        confidence = data.get('confidence', 0.0)
+        delivered = command_queue.pop(device_id, timeout=wait)
+    finally:
+        if holds_slot:
+            _long_poll_slots.release()
+    if delivered:
+        command_id, command = delivered
+        print(f"Enviando comando a ESP32 {device_id}: {command}")
+        # El cuerpo sigue siendo el comando en texto plano; el id va en un header para el ack
+        return command, 200, {'X-Command-Id': str(command_id)}
+    elif shed:
+        return "NONE", 200, {'Retry-After': str(LONG_POLL_RETRY_AFTER)}
+    else:
+        return "NONE"
+
+def process_access(data):
+    """Registra un evento de acceso y encola la apertura si fue exitoso."""
+    user_name = data.get('user_name')
+    method = data.get('method', 'unknown')
+    success = data.get('success', False)
+    confidence = data.get('confidence', 0.0)
+    device_id = data.get('device_id', DEFAULT_DEVICE)
+    # Segundos desde que el cliente registró el evento (lo completa el notifier al enviar)
+    age = data.get('age')
+    if age is not None:
+        try:
+            age = float(age)
+        except (TypeError, ValueError):
+            age = math.nan
+        if not math.isfinite(age) or age < 0:
+            # Un reintento traería el mismo valor: se rechaza en vez de devolver 'error'
+            ACCESS_EVENTS.labels("rejected").inc()
+            return {'status': 'rejected', 'error': f"'age' inválido: {data.get('age')!r}"}
 
+    granted = bool(success and user_name and user_name != "Desconocido")
+    if granted and age is not None and age > GRANT_MAX_AGE:
+        # Fuera de la ventana de coalescencia: un acceso nuevo de la misma persona abre normalmente
+        ACCESS_EVENTS.labels("expired").inc()
         log_access(user_name, method, success, confidence)
+        return {
+            'status': 'expired',
+            'message': f'Access for {user_name} arrived {age:.0f}s late; door not opened',
+            'command_queued': None
+        }
+    ACCESS_EVENTS.labels("granted" if granted else "denied").inc()
+    window = None
+    if COALESCE_WINDOW > 0:
+        # El resultado es parte de la clave: un PIN correcto tras uno fallido abre igual
+        window, repeated = access_coalescer.claim(user_name, device_id, granted)
+        if repeated:
+            database.count_repeat(window)
+            ACCESS_COALESCED.inc()
+            return {
+                'status': 'success' if granted else 'denied',
+                'message': f'Repeated access for {user_name}; already handled',
+                'coalesced': True,
+                'command_queued': None
+            }
 
-        if success and user_name and user_name != "Desconocido":
-            with command_lock:
-                command = f"OPEN:{user_name}"
-                pending_commands.append(command)
-                print(f" Comando agregado para ESP32: {command}")
-
-            return jsonify({
-                'status': 'success',
-                'message': f'Access granted for {user_name}',
-                'command_queued': command
-            })
-        else:
-            return jsonify({
-                'status': 'denied',
-                'message': f'Access denied for {user_name}'
-            })
+    if granted:
+        command = f"OPEN:{user_name}"
+        try:
+            command_queue.push(device_id, command)
+        except Exception:
+            # Sin OPEN encolado la ventana no puede quedar abierta: el reintento del
+            # notifier caería en ella como repetido y la puerta no se abriría nunca
+            if window is not None:
+                access_coalescer.release(window)
+            raise
+        print(f" Comando agregado para ESP32 {device_id}: {command}")
+        # El log va después del push: si el push falla, el reintento no deja un log de más
+        log_access(user_name, method, success, confidence, window=window)
+
+        return {
+            'status': 'success',
+            'message': f'Access granted for {user_name}',
+            'command_queued': command
+        }
+    else:
+        log_access(user_name, method, success, confidence, window=window)
+        return {
+            'status': 'denied',
+            'message': f'Access denied for {user_name}'
+        }
 
+def handle_event(data):
+    """process_access que descarta reintentos (event_id) y devuelve los errores como resultado del evento."""
+    event_id = None
+    claimed = False
+    try:
+        event_id = data.get('event_id')
+        if event_id:
+            if not database.claim_event(event_id):
+                return {'status': 'duplicate', 'event_id': event_id, 'message': 'Event already processed'}
+            claimed = True
+        result = process_access(data)
     except Exception as e:
-        print(f"Error in notify_access: {e}")
-        return jsonify({'error': str(e)}), 500
+        print(f"Error procesando evento {event_id}: {e}")
+        if claimed:
+            database.release_event(event_id)
+        return {'status': 'error', 'event_id': event_id, 'error': str(e)}
+    if event_id:
+        result['event_id'] = event_id
+    return result
+
+@app.route('/api/notify-access', methods=['POST'])
+def notify_access():
+    """Python notifica reconocimiento facial o PIN exitoso."""
+    result = handle_event(request.get_json(silent=True) or {})
+    if result['status'] == 'error':
+        return jsonify(result), 500
+    if result['status'] == 'rejected':
+        return jsonify(result), 400
+    return jsonify(result)
+
+@app.route('/api/notify-access/batch', methods=['POST'])
+def notify_access_batch():
+    """Python notifica varios accesos en un solo request.
+
+    Siempre responde 200 con un resultado por evento: los que fallaron
+    vienen con status 'error' y el notifier reintenta solo esos; los
+    inválidos, con 'rejected'.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list):
+        return jsonify({'error': "'events' debe ser una lista"}), 400
+
+    return jsonify({
+        'status': 'processed',
+        'results': [handle_event(event) if isinstance(event, dict)
+                    else {'status': 'rejected', 'error': 'evento inválido'} for event in events]
+    })
 
 @app.route('/api/confirm-command', methods=['POST'])
 def confirm_command():
@@ -68,11 +257,15 @@ def confirm_command():
         data = request.get_json() or {}
         command = data.get('command', 'unknown')
         status = data.get('status', 'unknown')
+        device_id = data.get('device_id', DEFAULT_DEVICE)
+        command_id = data.get('command_id')
 
-        print(f"ESP32 confirmó: {command} - {status}")
+        acked_id = command_queue.ack(device_id, command_id=command_id, command=command)
+        print(f"ESP32 {device_id} confirmó: {command} - {status}")
 
         return jsonify({
-            'status': 'confirmed',
+            'status': 'confirmed' if acked_id else 'unknown_command',
+            'command_id': acked_id,
             'timestamp': datetime.now().isoformat()
         })
 
@@ -82,65 +275,90 @@ def confirm_command():
 
 # === API AUXILIARES (debug/monitoreo) ===
 
-@app.route('/api/status', methods=['GET'])
-def get_status():
-    """Estado del sistema y últimos accesos."""
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas en formato de texto Prometheus (Edge API + procesos que envían las suyas)."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/push', methods=['POST'])
+def push_metrics():
+    """El reconocimiento envía aquí su registro de métricas (ver metrics.MetricsPusher)."""
+    data = request.get_json(silent=True) or {}
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM users WHERE is_active = 1')
-        total_users = cursor.fetchone()[0]
-
-        cursor.execute('''
-            SELECT user_name, access_method, success, confidence, timestamp 
-            FROM access_logs 
-            ORDER BY timestamp DESC 
-            LIMIT 10
-        ''')
-        recent_logs = cursor.fetchall()
-        conn.close()
-
-        with command_lock:
-            pending_count = len(pending_commands)
+        REGISTRY.accept_push(data.get('job'), data.get('metrics'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'status': 'ok'})
 
+@app.route('/api/commands/status', methods=['GET'])
+def get_commands_status():
+    """Profundidad de la cola y latencia entrega→ack por dispositivo."""
+    try:
         return jsonify({
-            'system_status': 'online',
-            'total_users': total_users,
-            'pending_commands': pending_count,
-            'recent_access': [
-                {
-                    'user': log[0],
-                    'method': log[1],
-                    'success': bool(log[2]),
-                    'confidence': log[3],
-                    'timestamp': log[4]
-                } for log in recent_logs
-            ],
+            'devices': command_queue.stats(),
             'timestamp': datetime.now().isoformat()
         })
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _pending_commands():
+    global _pending_cache
+    checked_at, count = _pending_cache
+    now = time.monotonic()
+    if now - checked_at >= PENDING_MAX_AGE:
+        count = command_queue.pending_count()
+        _pending_cache = (now, count)
+    return count
+
+def _status_response():
+    """Cuerpo y ETag de /api/status; se rearma solo si cambió el estado o venció STATUS_MAX_AGE."""
+    global _status_cache
+    version, total_users, recent_logs = database.live_status.snapshot()
+    now = time.monotonic()
+    cached = _status_cache
+    if cached and cached['version'] == version and now - cached['built_at'] < STATUS_MAX_AGE:
+        return cached
+
+    status = {
+        'system_status': 'online',
+        'total_users': total_users,
+        'pending_commands': _pending_commands(),
+        'recent_access': [
+            {
+                'user': log[0],
+                'method': log[1],
+                'success': bool(log[2]),
+                'confidence': log[3],
+                'timestamp': log[4]
+            } for log in recent_logs
+        ],
+    }
+    # El ETag no incluye 'timestamp': mismo estado, mismo ETag (también entre workers)
+    etag = hashlib.sha1(app.json.dumps(status).encode()).hexdigest()[:16]
+    status['timestamp'] = datetime.now().isoformat()
+    cached = _status_cache = {'version': version, 'built_at': now, 'etag': etag, 'body': app.json.dumps(status)}
+    return cached
+
+@app.route('/api/status', methods=['GET'])
+def get_status():
+    """Estado del sistema y últimos accesos. Con If-None-Match responde 304 si no cambió."""
+    try:
+        cached = _status_response()
+        response = Response(cached['body'], mimetype='application/json')
+        response.set_etag(cached['etag'])
+        response.cache_control.max_age = STATUS_MAX_AGE
+        return response.make_conditional(request)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/users', methods=['GET'])
 def get_users():
     """Lista de usuarios registrados (para debug)."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, age, created_at, is_active FROM users')
-        users = cursor.fetchall()
-        conn.close()
-
-        return jsonify([
-            {
-                'id': user[0],
-                'name': user[1],
-                'age': user[2],
-                'created_at': user[3],
-                'is_active': bool(user[4])
-            } for user in users
-        ])
+        return _stream(database.iter_users(), lambda batches: json_array_chunks(batches, _user_dict),
+                       'application/json')
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -149,12 +367,7 @@ def get_users():
 def delete_user(username):
     """Elimina un usuario por nombre."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM users WHERE name = ?', (username,))
-        conn.commit()
-        changes = cursor.rowcount
-        conn.close()
+        changes = database.delete_user(username)
         if changes:
             return jsonify({'status': 'success', 'message': f'Usuario "{username}" eliminado.'}), 200
         else:
@@ -163,16 +376,141 @@ def delete_user(username):
         return jsonify({'error': str(e)}), 500
         
 
+def _bool_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return 1
+    if value.lower() in ('0', 'false', 'no'):
+        return 0
+    raise ValueError(f"'{name}' debe ser true o false")
+
+def _time_arg(name):
+    # Se aceptan fechas ISO con 'T'; access_logs guarda 'YYYY-MM-DD HH:MM:SS' en UTC
+    value = request.args.get(name)
+    return value.replace('T', ' ').rstrip('Z') if value else None
+
+def _user_dict(user):
+    return {
+        'id': user[0],
+        'name': user[1],
+        'age': user[2],
+        'created_at': user[4],
+        'is_active': bool(user[5])
+    }
+
+LOG_COLUMNS = ('id', 'user', 'method', 'success', 'confidence', 'timestamp', 'occurrences')
+
+def _log_dict(row):
+    return dict(zip(LOG_COLUMNS, (row[0], row[1], row[2], bool(row[3]), row[4], row[5], row[6])))
+
+def _stream(batches, serialize, mimetype, headers=None):
+    """Respuesta chunked de serialize(lotes).
+
+    El primer lote se consulta acá, antes de armar la respuesta: si la base
+    falla, el error sigue siendo un 500. Un error en un lote posterior ya no
+    puede cambiar el status (el 200 salió) y corta la respuesta a la mitad.
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is not None:
+        batches = itertools.chain((first,), batches)
+    return Response(serialize(batches), mimetype=mimetype, headers=headers)
+
+@app.route('/api/access_logs', methods=['GET'])
+def list_access_logs():
+    """Logs de acceso paginados por cursor (?cursor=<next_cursor>), con filtros opcionales.
+
+    Filtros: user, method, success (true/false), since y until (UTC, until excluido).
+    """
+    try:
+        limit = request.args.get('limit', database.DEFAULT_PAGE_SIZE, type=int)
+        if not 1 <= limit <= database.MAX_PAGE_SIZE:
+            return jsonify({'error': f"'limit' debe estar entre 1 y {database.MAX_PAGE_SIZE}"}), 400
+        rows = database.query_access_logs(
+            user=request.args.get('user'),
+            method=request.args.get('method'),
+            success=_bool_arg('success'),
+            since=_time_arg('since'),
+            until=_time_arg('until'),
+            before_id=request.args.get('cursor', type=int),
+            limit=limit,
+        )
+        return jsonify({
+            'items': [_log_dict(row) for row in rows],
+            # Página llena: puede haber más; el cliente la pide con ?cursor=
+            'next_cursor': rows[-1][0] if len(rows) == limit else None
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/access_logs/export', methods=['GET'])
+def export_access_logs():
+    """Todos los logs que cumplan los filtros, del más viejo al más nuevo, en streaming.
+
+    ?format=ndjson (por defecto) o csv; mismos filtros que /api/access_logs.
+    La respuesta se arma de a un lote: la memoria no crece con la tabla.
+    """
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in MIMETYPES:
+            return jsonify({'error': "'format' debe ser ndjson o csv"}), 400
+        batches = database.iter_access_logs(
+            user=request.args.get('user'),
+            method=request.args.get('method'),
+            success=_bool_arg('success'),
+            since=_time_arg('since'),
+            until=_time_arg('until'),
+        )
+        return _stream(batches, lambda batches: export_chunks(fmt, batches, _log_dict, LOG_COLUMNS),
+                       MIMETYPES[fmt], {'Content-Disposition': f'attachment; filename=access_logs.{fmt}'})
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/access_stats', methods=['GET'])
+def get_access_stats():
+    """Accesos por hora o por día (?granularity=hour|day) desde la tabla de rollups."""
+    try:
+        granularity = request.args.get('granularity', 'hour')
+        if granularity not in ('hour', 'day'):
+            return jsonify({'error': "'granularity' debe ser hour o day"}), 400
+        rows = database.get_access_stats(
+            granularity,
+            since=_time_arg('since'),
+            until=_time_arg('until'),
+            method=request.args.get('method'),
+            success=_bool_arg('success'),
+        )
+        return jsonify({
+            'granularity': granularity,
+            'buckets': [
+                {
+                    'bucket': row[0],
+                    'method': row[1],
+                    'success': bool(row[2]),
+                    'count': row[3],
+                    'avg_confidence': row[4] / row[3] if row[3] else 0.0
+                } for row in rows
+            ]
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/access_logs', methods=['DELETE'])
 def delete_all_access_logs():
     """Elimina todos los logs de acceso."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM access_logs')
-        conn.commit()
-        changes = cursor.rowcount
-        conn.close()
+        changes = database.delete_all_access_logs()
         return jsonify({'status': 'success', 'message': f'Se eliminaron {changes} registros de access_logs.'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -183,11 +521,21 @@ if __name__ == '__main__':
     print("FaceLock Edge API Server")
     print("=" * 50)
     print(" APIs disponibles:")
-    print("   GET  /api/get-pending-commands     ← ESP32 consulta automática v.")
+    print("   GET  /api/get-pending-commands     ← ESP32 consulta (?device_id=...&wait=25 long-poll)")
     print("   POST /api/notify-access            ← Python notifica reconocimiento")
+    print("   POST /api/notify-access/batch      ← Python notifica varios accesos")
     print("   POST /api/confirm-command          ← ESP32 confirma procesamiento")
     print("   GET  /api/status                   ← Estado del sistema")
+    print("   GET  /api/commands/status          ← Cola de comandos por dispositivo")
     print("   GET  /api/users                    ← Lista usuarios (debug)")
+    print("   GET  /api/access_logs              ← Logs paginados (?user=&method=&success=&since=&until=&cursor=)")
+    print("   GET  /api/access_logs/export       ← Exportación en streaming (?format=ndjson|csv + filtros)")
+    print("   GET  /api/access_stats             ← Accesos por hora/día (?granularity=&since=&success=)")
+    print("   GET  /api/metrics                  ← Métricas Prometheus")
+    print("   POST /api/metrics/push             ← Python envía sus métricas")
     print("=" * 50)
+    print(" Servidor de desarrollo; para producción: python serve.py")
     print(" Listo para recibir conexiones en http://0.0.0.0:5000 ...")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # threaded: cada long-poll bloquea solo su propio hilo.
+    # El debugger de Werkzeug permite ejecutar código: solo con FACELOCK_DEBUG=1
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FACELOCK_DEBUG') == '1', threaded=True)
@@ -0,0 +1,190 @@
+"""Enrolamiento masivo de rostros desde un directorio o un manifiesto CSV.
+
+Directorio: cada imagen (.jpg, .jpeg, .png, .bmp) es una persona y el
+nombre del archivo es su nombre. CSV: columnas name,image[,age,pin], con
+las rutas relativas al CSV.
+
+La detección y el embedding corren en un pool de procesos, cada uno con
+sus modelos de MediaPipe cargados una sola vez. Al final se copian las
+imágenes a rostros/, se agregan todos los embeddings al almacén con un
+solo append y se guardan todos los usuarios en una sola transacción. Cada
+rostro guarda el sha256 de su imagen: al volver a correr, las imágenes sin
+cambios se saltean y las modificadas reemplazan al rostro anterior.
+
+Las escrituras al almacén toman su lock exclusivo (FaceStore.writing), así
+que se puede correr con face_recognition_app.py andando: la app espera a que
+termine el lote para escribir y toma los rostros nuevos en su próxima lectura.
+
+Uso:
+  python enroll.py fotos/
+  python enroll.py empleados.csv --workers 4
+"""
+import argparse
+import csv
+import hashlib
+import multiprocessing
+import os
+import shutil
+import time
+
+import cv2
+import mediapipe as mp
+
+import database
+from face_embedding import FaceEmbedder
+from face_store import FaceStore
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+# Imágenes por tarea enviada a cada worker
+POOL_CHUNKSIZE = 4
+
+
+class Enroller:
+    """Modelos de detección y malla facial cargados una vez y reutilizados en cada imagen."""
+
+    def __init__(self):
+        self.face_detection = mp.solutions.face_detection.FaceDetection(min_detection_confidence=0.5)
+        self.embedder = FaceEmbedder()
+
+    def embed(self, image):
+        """Embedding del rostro más probable de una imagen BGR, o (None, motivo)."""
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        results = self.face_detection.process(rgb_image)
+        if not results.detections:
+            return None, "No se detectó rostro en la imagen."
+        bbox = results.detections[0].location_data.relative_bounding_box
+        embedding = self.embedder.embed(rgb_image, [(bbox.xmin, bbox.ymin, bbox.width, bbox.height)])[0]
+        if not embedding.any():
+            return None, "No se pudo obtener la malla facial del rostro."
+        return embedding, None
+
+    def close(self):
+        self.face_detection.close()
+        self.embedder.close()
+
+
+# === Entradas ===
+
+def read_entries(source):
+    """[(nombre, ruta, edad, pin)] desde un directorio de imágenes o un CSV."""
+    if os.path.isdir(source):
+        return [(os.path.splitext(f)[0], os.path.join(source, f), None, None)
+                for f in sorted(os.listdir(source)) if f.lower().endswith(IMAGE_EXTENSIONS)]
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="", encoding="utf-8") as f:
+        return [(row["name"].strip(), os.path.join(base, row["image"]),
+                 row.get("age") or None, row.get("pin") or None)
+                for row in csv.DictReader(f)]
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# === Pool de workers ===
+
+_enroller = None
+
+
+def _init_worker():
+    global _enroller
+    # Un hilo por proceso: el paralelismo viene de los procesos, no de OpenCV
+    cv2.setNumThreads(1)
+    _enroller = Enroller()
+
+
+def _embed_file(path):
+    image = cv2.imread(path)
+    if image is None:
+        return path, None, "No se pudo leer la imagen."
+    embedding, error = _enroller.embed(image)
+    return path, embedding, error
+
+
+def embed_files(paths, workers):
+    """{ruta: (embedding, error)} calculado en `workers` procesos."""
+    if not paths:
+        return {}
+    if workers <= 1:
+        _init_worker()
+        return {path: result for path, *result in map(_embed_file, paths)}
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        return {path: result for path, *result in
+                pool.imap_unordered(_embed_file, paths, chunksize=POOL_CHUNKSIZE)}
+
+
+# === Enrolamiento ===
+
+def enroll(entries, store_dir, rostros_dir, workers):
+    """Enrola las entradas nuevas o modificadas. Devuelve un resumen con los contadores."""
+    inicio = time.perf_counter()
+    store = FaceStore(store_dir)
+    enrolled = store.load().data
+
+    pending = []
+    skipped = 0
+    for name, path, age, pin in entries:
+        digest = file_hash(path)
+        if enrolled.get(name, {}).get("sha256") == digest:
+            skipped += 1
+            continue
+        pending.append((name, path, age, pin, digest))
+
+    results = embed_files([path for _, path, _, _, _ in pending], workers)
+    faces = []
+    users = []
+    failed = []
+    for name, path, age, pin, digest in pending:
+        embedding, error = results[path]
+        if error:
+            failed.append((name, error))
+            continue
+        faces.append((name, embedding, {"age": age, "pin": pin, "sha256": digest}))
+        users.append((name, age, pin))
+
+    if faces:
+        # Primero las imágenes: el watcher da de baja los rostros que no tienen su .jpg
+        os.makedirs(rostros_dir, exist_ok=True)
+        paths = {name: path for name, path, _, _, _ in pending}
+        for name, _, _ in faces:
+            _copy_image(paths[name], os.path.join(rostros_dir, f"{name}.jpg"))
+        # Las imágenes modificadas reemplazan al rostro anterior; todo con el lock tomado una vez
+        replaced = [name for name, _, _ in faces if name in enrolled]
+        with store.writing():
+            store.delete(replaced)
+            store.append_many(faces)
+            if store.needs_compaction():
+                store.compact()
+        database.save_users(users)
+
+    seconds = time.perf_counter() - inicio
+    return {"total": len(entries), "enrolled": len(faces), "skipped": skipped, "failed": failed,
+            "seconds": seconds, "images_per_second": len(pending) / seconds if seconds else 0}
+
+
+def _copy_image(source, destination):
+    if os.path.abspath(source) == os.path.abspath(destination):
+        return
+    if source.lower().endswith((".jpg", ".jpeg")):
+        shutil.copyfile(source, destination)
+    else:
+        cv2.imwrite(destination, cv2.imread(source))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrolamiento masivo de rostros")
+    parser.add_argument("source", help="Directorio de imágenes o manifiesto CSV (name,image,age,pin)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--store-dir", default="known_faces")
+    parser.add_argument("--rostros-dir", default=os.path.join(os.getcwd(), "rostros"))
+    args = parser.parse_args()
+
+    database.init_database()
+    result = enroll(read_entries(args.source), args.store_dir, args.rostros_dir, args.workers)
+    for name, error in result["failed"]:
+        print(f"  {name}: {error}")
+    print(f"{result['total']} imágenes: {result['enrolled']} enroladas, {result['skipped']} sin cambios, "
+          f"{len(result['failed'])} con error en {result['seconds']:.1f}s "
+          f"({result['images_per_second']:.1f} imágenes/s)")
+    database.close_all()
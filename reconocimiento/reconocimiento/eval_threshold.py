@@ -0,0 +1,84 @@
+"""Falsos aceptados (FAR) y falsos rechazos (FRR) del matcher según el umbral.
+
+Recibe un directorio con una carpeta por persona y al menos dos fotos en
+cada una, idealmente tomadas con la cámara de la puerta. Calcula los
+embeddings con los mismos modelos que enroll.py y compara todos los pares:
+los de la misma persona (genuinos) y los de personas distintas (impostores).
+Para cada umbral imprime FAR (impostores con similitud >= umbral) y FRR
+(genuinos por debajo), y al final el umbral de igual error (EER) y las tasas
+del umbral configurado (FACELOCK_MATCH_THRESHOLD).
+
+Uso: python eval_threshold.py fotos/ [--workers 4] [--thresholds 0.80,0.85,0.90,0.92,0.95,0.97]
+"""
+import argparse
+import os
+
+import numpy as np
+
+from enroll import IMAGE_EXTENSIONS, embed_files
+from face_index import UMBRAL_SIMILITUD, normalizar
+
+# Umbrales probados al buscar el de igual error
+EER_GRID = np.linspace(0.0, 1.0, 1001)
+
+
+def read_labeled(source):
+    """([rutas], [persona]) desde source/<persona>/<foto>."""
+    paths, labels = [], []
+    for person in sorted(os.listdir(source)):
+        folder = os.path.join(source, person)
+        if not os.path.isdir(folder):
+            continue
+        for f in sorted(os.listdir(folder)):
+            if f.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(folder, f))
+                labels.append(person)
+    return paths, labels
+
+
+def pair_scores(embeddings, labels):
+    """Similitud coseno de todos los pares: (genuinos, impostores)."""
+    matrix = normalizar(embeddings)
+    sims = matrix @ matrix.T
+    labels = np.asarray(labels)
+    i, j = np.triu_indices(len(labels), k=1)
+    same = labels[i] == labels[j]
+    return sims[i, j][same], sims[i, j][~same]
+
+
+def rates(genuine, impostor, threshold):
+    far = float(np.mean(impostor >= threshold)) if len(impostor) else 0.0
+    frr = float(np.mean(genuine < threshold)) if len(genuine) else 0.0
+    return far, frr
+
+
+def equal_error(genuine, impostor):
+    """(umbral, tasa) donde FAR y FRR se cruzan."""
+    pairs = [(t, *rates(genuine, impostor, t)) for t in EER_GRID]
+    threshold, far, frr = min(pairs, key=lambda p: abs(p[1] - p[2]))
+    return threshold, (far + frr) / 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", help="Directorio con una carpeta de fotos por persona")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--thresholds", default="0.80,0.85,0.90,0.92,0.95,0.97")
+    args = parser.parse_args()
+
+    paths, labels = read_labeled(args.source)
+    results = embed_files(paths, args.workers)
+    embedded = [(results[p][0], label) for p, label in zip(paths, labels) if results[p][1] is None]
+    print(f"{len(embedded)} de {len(paths)} fotos con rostro, {len(set(labels))} personas")
+    if len(embedded) < 2:
+        raise SystemExit("Hacen falta al menos dos fotos con rostro.")
+
+    genuine, impostor = pair_scores(np.array([e for e, _ in embedded]), [label for _, label in embedded])
+    print(f"pares genuinos {len(genuine)}, impostores {len(impostor)}")
+    print(f"{'umbral':>8} {'FAR %':>8} {'FRR %':>8}")
+    for threshold in sorted({float(t) for t in args.thresholds.split(",")} | {UMBRAL_SIMILITUD}):
+        far, frr = rates(genuine, impostor, threshold)
+        marca = "  <- configurado" if threshold == UMBRAL_SIMILITUD else ""
+        print(f"{threshold:>8.3f} {far * 100:>8.2f} {frr * 100:>8.2f}{marca}")
+    threshold, eer = equal_error(genuine, impostor)
+    print(f"EER {eer * 100:.2f}% con umbral {threshold:.3f}")
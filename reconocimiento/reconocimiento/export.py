@@ -0,0 +1,63 @@
+"""Serialización por lotes para exportar tablas grandes sin armarlas en memoria.
+
+Cada función recibe un iterable de lotes de filas y devuelve un generador
+de strings, uno por lote: sirve tal cual como cuerpo de una respuesta HTTP
+chunked (Flask) o para escribir en un archivo. La memoria usada depende del
+tamaño del lote, no del de la tabla.
+"""
+import csv
+import io
+import json
+
+# Filas por lote: una consulta (o fetchmany) y un chunk de salida por lote
+CHUNK_ROWS = 1000
+# Un solo encoder: json.dumps(..., default=str) crea uno nuevo en cada llamada
+_encode = json.JSONEncoder(default=str).encode
+
+
+def fetch_batches(cursor, chunk_rows=CHUNK_ROWS):
+    """Lotes de un cursor ya ejecutado, con fetchmany."""
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def ndjson_chunks(batches, to_dict):
+    """Un objeto JSON por línea."""
+    for rows in batches:
+        yield "".join(_encode(to_dict(row)) + "\n" for row in rows)
+
+
+def csv_chunks(batches, to_dict, columns):
+    """CSV con encabezado; to_dict(row) debe tener las claves de columns."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(map(to_dict, rows))
+        yield buffer.getvalue()
+
+
+def json_array_chunks(batches, to_dict):
+    """Un arreglo JSON ('[{...},{...}]') escrito de a un lote."""
+    yield "["
+    separator = ""
+    for rows in batches:
+        yield separator + ",".join(_encode(to_dict(row)) for row in rows)
+        separator = ","
+    yield "]"
+
+
+def chunks(fmt, batches, to_dict, columns):
+    """Generador del formato pedido ('ndjson' o 'csv')."""
+    if fmt == "csv":
+        return csv_chunks(batches, to_dict, columns)
+    return ndjson_chunks(batches, to_dict)
+
+
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
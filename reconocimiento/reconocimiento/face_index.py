@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+
+# Embedding geométrico: distancias entre 16 landmarks clave de FaceMesh (16 * 15 / 2 pares)
+EMBEDDING_DIM = 120
+# Similitud coseno mínima para aceptar una identidad. Calibrarla con eval_threshold.py sobre
+# fotos de las personas enroladas y la cámara real: subirla baja los falsos aceptados (FAR)
+# a costa de más rechazos de personas enroladas (FRR)
+UMBRAL_SIMILITUD = float(os.environ.get("FACELOCK_MATCH_THRESHOLD", "0.92"))
+DESCONOCIDO = "Desconocido"
+
+
+def normalizar(vectores):
+    """Devuelve los vectores como matriz float32 contigua con filas de norma 1."""
+    matriz = np.ascontiguousarray(np.atleast_2d(vectores), dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+class FaceIndex:
+    """Índice de embeddings enrolados guardados en una sola matriz NumPy.
+
+    Cada fila es el embedding normalizado de una imagen enrolada, de modo que
+    todos los rostros de un frame se puntúan con un único producto matricial.
+    """
+
+    def __init__(self, names=(), embeddings=None, dim=None):
+        self.names = list(names)
+        if embeddings is None or len(self.names) == 0:
+            self.dim = dim or 0
+            self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+        else:
+            self.matrix = normalizar(embeddings)
+            self.dim = self.matrix.shape[1]
+        if self.matrix.shape[0] != len(self.names):
+            raise ValueError("La cantidad de nombres no coincide con la de embeddings.")
+
+    @classmethod
+    def from_normalized(cls, names, matrix):
+        """Envuelve una matriz ya normalizada sin copiarla (p. ej. una vista de memoria compartida)."""
+        index = cls.__new__(cls)
+        index.names = list(names)
+        index.matrix = matrix
+        index.dim = matrix.shape[1]
+        if matrix.shape[0] != len(index.names):
+            raise ValueError("La cantidad de nombres no coincide con la de embeddings.")
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, embedding):
+        """Agrega un embedding al índice (crea una nueva matriz contigua)."""
+        fila = normalizar(embedding)
+        if self.dim and fila.shape[1] != self.dim:
+            raise ValueError(f"Dimensión {fila.shape[1]} distinta a la del índice ({self.dim}).")
+        self.matrix = np.ascontiguousarray(np.vstack([self.matrix.reshape(-1, fila.shape[1]), fila]))
+        self.dim = fila.shape[1]
+        self.names.append(name)
+
+    def scores(self, queries):
+        """Matriz (enrolados × rostros) de similitud coseno en una sola llamada."""
+        # matrix @ q.T recorre la matriz enrolada en orden de memoria (filas contiguas)
+        return self.matrix @ normalizar(queries).T
+
+    def match(self, queries, threshold=None):
+        """Devuelve [(nombre, confianza)] por cada embedding consultado (umbral: UMBRAL_SIMILITUD)."""
+        if threshold is None:
+            threshold = UMBRAL_SIMILITUD
+        queries = np.atleast_2d(queries)
+        if len(queries) == 0 or queries.shape[1] == 0:
+            return []
+        if len(self.names) == 0:
+            return [(DESCONOCIDO, 0.0)] * len(queries)
+
+        sims = self.scores(queries)
+        mejores = sims.argmax(axis=0)
+        confianzas = sims[mejores, np.arange(len(mejores))]
+
+        resultados = []
+        for idx, conf in zip(mejores.tolist(), np.clip(confianzas, 0.0, 1.0).tolist()):
+            if conf >= threshold:
+                resultados.append((self.names[idx], float(conf)))
+            else:
+                resultados.append((DESCONOCIDO, float(conf)))
+        return resultados
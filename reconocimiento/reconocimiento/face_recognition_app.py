@@ -1,126 +1,86 @@
+import argparse
 import cv2
 import os
-import pickle
 import mediapipe as mp
-import sqlite3
-import requests
+import database
+import signal
 import time
 
+from enroll import Enroller
+from face_embedding import FaceEmbedder
+from known_faces import KnownFacesWatcher
+from notifier import AccessNotifier
+from frame_sources import open_source
+from pipeline import FramePipeline, StageCounter
+from tracker import FaceTracker, DETECT_EVERY, MIN_DETECTION_CONFIDENCE
+from adaptive_scale import AdaptiveScale, FixedScale, downscale
+from metrics import REGISTRY, MetricsPusher
+from tracing import TRACER
+
 # === Rutas ===
 rostros_dir = os.path.join(os.getcwd(), "rostros")
-pickle_path = "known_faces.pkl"
-db_path = "facelock.db"
-EDGE_API_URL = "http://localhost:5000/api/notify-access"
+store_dir = "known_faces"
+# Formato anterior: se importa al almacén la primera vez que se arranca
+legacy_pickle_path = "known_faces.pkl"
+EDGE_API_BASE = "http://localhost:5000/api"
+EDGE_API_URL = f"{EDGE_API_BASE}/notify-access"
+EDGE_API_BATCH_URL = f"{EDGE_API_URL}/batch"
 
 os.makedirs(rostros_dir, exist_ok=True)
 
-known_face_bboxes = []
-known_face_names = []
-known_face_data = {}
-last_mod_time = 0
+# Snapshot de rostros enrolados, refrescado en segundo plano
+known_faces_watcher = KnownFacesWatcher(store_dir, rostros_dir, legacy_pickle=legacy_pickle_path)
+
+# Notificaciones al Edge API en segundo plano: el frame loop nunca espera la red
+notifier = AccessNotifier(EDGE_API_BATCH_URL)
 
-# Para evitar notificaciones excesivas por usuario reconocido
+# Modelos para registrar rostros con la tecla "1" (enroll.py para altas masivas)
+enroller = None
+
+# Para evitar notificaciones excesivas: última notificación por nombre (también en modo
+# seguimiento: un track nuevo de la misma persona no vuelve a notificar)
 last_notification_time = {}
 COOLDOWN_SECONDS = 30
-
-def load_known_faces():
-    global known_face_bboxes, known_face_names, known_face_data, last_mod_time
-
-    if os.path.exists(pickle_path):
-        mod_time = os.path.getmtime(pickle_path)
-        if mod_time != last_mod_time:
-            try:
-                with open(pickle_path, "rb") as f:
-                    known_face_bboxes, known_face_names, known_face_data = pickle.load(f)
-                last_mod_time = mod_time
-                print(" Rostros recargados desde pickle.")
-            except:
-                print(" Error al cargar pickle. Se limpia.")
-                known_face_bboxes.clear()
-                known_face_names.clear()
-                known_face_data.clear()
-    else:
-        known_face_bboxes.clear()
-        known_face_names.clear()
-        known_face_data.clear()
-        last_mod_time = 0
-        print("Pickle no existe. No hay rostros.")
-
-    # Verificar si las imágenes asociadas aún existen
-    nombres_a_remover = []
-    for name in known_face_names:
-        image_path = os.path.join(rostros_dir, f"{name}.jpg")
-        if not os.path.exists(image_path):
-            print(f"Imagen de {name} fue eliminada. Se remueve del sistema.")
-            nombres_a_remover.append(name)
-
-    for name in nombres_a_remover:
-        index = known_face_names.index(name)
-        known_face_names.pop(index)
-        known_face_bboxes.pop(index)
-        known_face_data.pop(name, None)
-
-    if nombres_a_remover:
-        with open(pickle_path, "wb") as f:
-            pickle.dump((known_face_bboxes, known_face_names, known_face_data), f)
-        last_mod_time = os.path.getmtime(pickle_path)
+# Con más entradas se descartan las que ya cumplieron el cooldown
+MAX_COOLDOWN_ENTRIES = 256
+
+# Cada cuántos segundos se imprimen los contadores del modo pipeline
+REPORT_INTERVAL = 10
+
+# === Métricas (se envían al Edge API, ver /api/metrics) ===
+STAGE_SECONDS = REGISTRY.histogram(
+    "facelock_frame_stage_seconds", "Duración de cada etapa del frame loop", ("stage",))
+CAPTURE_SECONDS = STAGE_SECONDS.labels("capture")
+DETECT_SECONDS = STAGE_SECONDS.labels("detect")
+MATCH_SECONDS = STAGE_SECONDS.labels("match")
+RENDER_SECONDS = STAGE_SECONDS.labels("render")
+FRAMES = REGISTRY.counter("facelock_frames_total", "Frames procesados")
+FACES = REGISTRY.counter("facelock_faces_total", "Rostros identificados por resultado", ("result",))
 
 def register_face(image, name, age, pin):
-    global known_face_bboxes, known_face_names, known_face_data
-
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    with mp.solutions.face_detection.FaceDetection(min_detection_confidence=0.5) as face_detection:
-        results = face_detection.process(rgb_image)
-
-    if not results.detections:
-        print("No se detectó rostro en la imagen capturada.")
+    global enroller
+    if enroller is None:
+        # Los modelos se cargan en el primer registro y se reutilizan en los siguientes
+        enroller = Enroller()
+    embedding, error = enroller.embed(image)
+    if error:
+        print(error)
         return
 
-    detection = results.detections[0]
-    bbox = detection.location_data.relative_bounding_box
-    known_face_bboxes.append((bbox.xmin, bbox.ymin, bbox.width, bbox.height))
-    known_face_names.append(name)
-    known_face_data[name] = {"age": age, "pin": pin}
-
-    # Guardar en pickle
-    with open(pickle_path, "wb") as f:
-        pickle.dump((known_face_bboxes, known_face_names, known_face_data), f)
-
-    # Guardar en SQLite 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO users (name, age, pin, is_active)
-        VALUES (?, ?, ?, 1)
-    ''', (name, age, pin))
-    conn.commit()
-    conn.close()
+    # Agregar al almacén de rostros y publicar el nuevo snapshot
+    known_faces_watcher.add_face(name, embedding, {"age": age, "pin": pin})
+
+    # Guardar en SQLite
+    database.save_user(name, age, pin)
 
     print(f"{name} registrado y guardado.")
 
 def notify_access(user_name, method, success=True, confidence=1.0):
-    try:
-        data = {
-            "user_name": user_name,
-            "method": method,
-            "success": success,
-            "confidence": confidence
-        }
-        response = requests.post(EDGE_API_URL, json=data, timeout=2)
-        if response.status_code == 200:
-            print(f"📡 Notificación enviada: {user_name} - {method}")
-        else:
-            print(f"⚠ Error notificando acceso: {response.status_code}")
-    except Exception as e:
-        print(f"⚠ Excepción notificando acceso: {e}")
+    """Encola la notificación; el envío ocurre en el hilo del notifier."""
+    notifier.notify(user_name, method, success, confidence)
 
 def validate_pin(pin_input):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('SELECT name FROM users WHERE pin = ? AND is_active = 1', (pin_input,))
-    user = cursor.fetchone()
-    conn.close()
-    return user[0] if user else None
+    return database.get_user_by_pin(pin_input)
 
 def activate_pin_mode():
     print("\n" + "="*50)
@@ -149,94 +109,274 @@ def activate_pin_mode():
     notify_access("UNKNOWN", "pin_failed_attempts", False, 0.0)
     return False
 
-# === Iniciar cámara ===
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print(" Cámara no disponible.")
-    exit()
-
-mp_face_detection = mp.solutions.face_detection
-
-print("\nPresiona:\n 1 - Nuevo registro\n 2 - Ingresar PIN\n ESC - Salir\n")
-
-with mp_face_detection.FaceDetection(min_detection_confidence=0.5) as face_detection:
+def locate_faces(rgb_frame, face_detection, scale=1.0):
+    """Detecta rostros; devuelve sus cajas en píxeles, en coordenadas relativas y sus scores.
+
+    Con scale < 1 el detector recibe una copia reducida; las cajas relativas
+    se remapean al frame completo, del que luego se recorta para el matcher.
+    """
+    with DETECT_SECONDS.time(), TRACER.span("detect", scale=scale):
+        results = face_detection.process(downscale(rgb_frame, scale))
+    face_locations = []
+    face_bboxes = []
+    scores = []
+
+    if results.detections:
+        ih, iw, _ = rgb_frame.shape
+        for detection in results.detections:
+            bbox = detection.location_data.relative_bounding_box
+            x1 = int(bbox.xmin * iw)
+            y1 = int(bbox.ymin * ih)
+            x2 = int((bbox.xmin + bbox.width) * iw)
+            y2 = int((bbox.ymin + bbox.height) * ih)
+            face_locations.append((x1, y1, x2, y2))
+            face_bboxes.append((bbox.xmin, bbox.ymin, bbox.width, bbox.height))
+            scores.append(detection.score[0] if detection.score else 1.0)
+    return face_locations, face_bboxes, scores
+
+def identify_faces(rgb_frame, face_bboxes, embedder, known):
+    """Compara todos los rostros del frame contra el índice en una sola llamada."""
+    if not face_bboxes:
+        return []
+    with MATCH_SECONDS.time(), TRACER.span("match", faces=len(face_bboxes)):
+        matches = known.index.match(embedder.embed(rgb_frame, face_bboxes))
+    for name, _ in matches:
+        FACES.labels("unknown" if name == "Desconocido" else "known").inc()
+    return matches
+
+def detect_faces(rgb_frame, face_detection, embedder, scale=1.0, known=None):
+    """Detecta rostros y los identifica contra el snapshot actual de enrolados."""
+    if known is None:
+        known = known_faces_watcher.snapshot  # Solo se lee la referencia
+    face_locations, face_bboxes, _ = locate_faces(rgb_frame, face_detection, scale)
+    matches = identify_faces(rgb_frame, face_bboxes, embedder, known)
+    return face_locations, matches, known
+
+def track_step(rgb_frame, face_detection, tracker, scale=1.0):
+    """Detecta si toca y, si no, predice. Devuelve los tracks que necesitan identidad."""
+    if not tracker.needs_detection():
+        tracker.predict()
+        return []
+    face_locations, _, scores = locate_faces(rgb_frame, face_detection, scale)
+    tracker.update(face_locations, scores)
+    # Rostros recién detectados sin identidad o con una identidad vieja (ver REIDENTIFY_EVERY)
+    return [t for t in tracker.tracks if t.needs_identity()]
+
+def identify_tracks(rgb_frame, tracks, embedder, known):
+    ih, iw, _ = rgb_frame.shape
+    matches = identify_faces(rgb_frame, [t.relative_bbox(iw, ih) for t in tracks], embedder, known)
+    for track, (name, confidence) in zip(tracks, matches):
+        track.identify(name, confidence)
+
+def track_faces(rgb_frame, face_detection, embedder, tracker, scale=1.0, known=None):
+    """Modo seguimiento: detector cada N frames y matcher solo para tracks nuevos."""
+    if known is None:
+        known = known_faces_watcher.snapshot
+    if tracker.known is not known:
+        # Cambiaron los enrolados: las identidades asignadas pueden haber quedado viejas
+        tracker.forget_identities()
+        tracker.known = known
+    identify_tracks(rgb_frame, track_step(rgb_frame, face_detection, tracker, scale), embedder, known)
+    tracks = list(tracker.tracks)
+    return [t.location for t in tracks], [(t.name, t.confidence) for t in tracks], known
+
+def recognize(rgb_frame, face_detection, embedder, tracker=None, scale=1.0, known=None):
+    """(cajas, [(nombre, confianza)], snapshot de enrolados), con o sin seguimiento."""
+    if tracker is None:
+        return detect_faces(rgb_frame, face_detection, embedder, scale, known)
+    return track_faces(rgb_frame, face_detection, embedder, tracker, scale, known)
+
+def draw_results(frame, face_locations, matches, known):
+    """Dibuja cajas, nombres e instrucciones sobre el frame."""
+    for (x1, y1, x2, y2), (name, _) in zip(face_locations, matches):
+        color = (0, 255, 0) if name != "Desconocido" else (0, 0, 255)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.rectangle(frame, (x1, y2), (x2, y2 + 30), color, cv2.FILLED)
+        cv2.putText(frame, name, (x1 + 6, y2 + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+        if name in known.data:
+            age = known.data[name].get("age", "N/A")
+            cv2.putText(frame, f"Edad: {age}", (x1 + 6, y2 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+    # Si hay rostro pero no reconocido, mostrar "Desconocido"
+    if face_locations and all(name == "Desconocido" for name, _ in matches):
+        cv2.putText(frame, "Usuario desconocido", (40, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+
+    # Instrucciones siempre visibles
+    instru = "Presiona 1: Nuevo registro  |  2: Ingresar PIN  |  ESC: Salir"
+    cv2.putText(frame, instru, (20, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+
+def decide_access(matches):
+    """Notifica los rostros conocidos, con cooldown por usuario."""
+    current_time = time.time()
+    for name, confidence in matches:
+        if name == "Desconocido":
+            continue
+        if (
+            name not in last_notification_time or
+            (current_time - last_notification_time[name]) > COOLDOWN_SECONDS
+        ):
+            notify_access(name, "facial_recognition", True, confidence)
+            last_notification_time[name] = current_time
+
+    if len(last_notification_time) > MAX_COOLDOWN_ENTRIES:
+        for key, sent_at in list(last_notification_time.items()):
+            if current_time - sent_at > COOLDOWN_SECONDS:
+                del last_notification_time[key]
+
+def render_and_decide(frame, face_locations, matches, known):
+    """Dibuja los resultados y notifica los accesos reconocidos."""
+    with RENDER_SECONDS.time():
+        with TRACER.span("draw"):
+            draw_results(frame, face_locations, matches, known)
+        with TRACER.span("decide"):
+            decide_access(matches)
+        with TRACER.span("imshow"):
+            cv2.imshow("Reconocimiento Facial", frame)
+    FRAMES.inc()
+
+def handle_key(key, clean_frame):
+    """Procesa el teclado. Devuelve False cuando hay que salir."""
+    if key == 27:  # ESC
+        return False
+    elif key == ord('1'):
+        print("\n--- Nuevo registro ---")
+        name = input("Nombre: ")
+        age = input("Edad: ")
+        pin = input("PIN (4-6 dígitos): ")
+        filename = os.path.join(rostros_dir, f"{name}.jpg")
+        cv2.imwrite(filename, clean_frame)
+        print(f"📸 Imagen guardada sin marcadores en: {filename}")
+        register_face(clean_frame, name, age, pin)
+    elif key == ord('2'):
+        activate_pin_mode()
+    elif key == ord('t') and TRACER.enabled:
+        TRACER.dump()
+    return True
+
+def wait_key():
+    with TRACER.span("waitKey"):
+        return cv2.waitKey(1) & 0xFF
+
+def run_sequential(cap, face_detection, embedder, tracker=None, scaler=None):
+    """Captura, detección y render uno tras otro en el mismo hilo."""
+    stats = StageCounter("secuencial")
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame = cv2.flip(frame, 1)
-        clean_frame = frame.copy()
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        load_known_faces()  # Refrescar rostros
-
-        results = face_detection.process(rgb_frame)
-        face_locations = []
-        face_names = []
-
-        if results.detections:
-            for detection in results.detections:
-                bbox = detection.location_data.relative_bounding_box
-                ih, iw, _ = frame.shape
-                x1 = int(bbox.xmin * iw)
-                y1 = int(bbox.ymin * ih)
-                x2 = int((bbox.xmin + bbox.width) * iw)
-                y2 = int((bbox.ymin + bbox.height) * ih)
-                face_locations.append((x1, y1, x2, y2))
-
-                name = "Desconocido"
-                for (kx, ky, kw, kh), known_name in zip(known_face_bboxes, known_face_names):
-                    if abs(kx - bbox.xmin) < 0.05 and abs(ky - bbox.ymin) < 0.05:
-                        name = known_name
-                        break
-                face_names.append(name)
-
-        # Visualización y lógica de acceso
-        for (x1, y1, x2, y2), name in zip(face_locations, face_names):
-            color = (0, 255, 0) if name != "Desconocido" else (0, 0, 255)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.rectangle(frame, (x1, y2), (x2, y2 + 30), color, cv2.FILLED)
-            cv2.putText(frame, name, (x1 + 6, y2 + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-
-            if name in known_face_data:
-                age = known_face_data[name].get("age", "N/A")
-                cv2.putText(frame, f"Edad: {age}", (x1 + 6, y2 + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
-
-            # Notificación automática al reconocer rostro conocido, con cooldown
-            if name != "Desconocido":
-                current_time = time.time()
-                if (
-                    name not in last_notification_time or
-                    (current_time - last_notification_time[name]) > COOLDOWN_SECONDS
-                ):
-                    notify_access(name, "facial_recognition", True, 0.99)
-                    last_notification_time[name] = current_time
-
-        # Si hay rostro pero no reconocido, mostrar "Desconocido"
-        if face_locations and all(n == "Desconocido" for n in face_names):
-            cv2.putText(frame, "Usuario desconocido", (40, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-
-        # Instrucciones siempre visibles
-        instru = "Presiona 1: Nuevo registro  |  2: Ingresar PIN  |  ESC: Salir"
-        cv2.putText(frame, instru, (20, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-
-        cv2.imshow("Reconocimiento Facial", frame)
-        key = cv2.waitKey(1) & 0xFF
-
-        if key == 27:  # ESC
-            break
-        elif key == ord('1'):
-            print("\n--- Nuevo registro ---")
-            name = input("Nombre: ")
-            age = input("Edad: ")
-            pin = input("PIN (4-6 dígitos): ")
-            filename = os.path.join(rostros_dir, f"{name}.jpg")
-            cv2.imwrite(filename, clean_frame)
-            print(f"📸 Imagen guardada sin marcadores en: {filename}")
-            register_face(clean_frame, name, age, pin)
-        elif key == ord('2'):
-            activate_pin_mode()
-
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+        with TRACER.frame():
+            inicio = time.perf_counter()
+            with TRACER.span("capture"):
+                ret, frame = cap.read()
+            CAPTURE_SECONDS.observe(time.perf_counter() - inicio)
+            if not ret:
+                break
+
+            with TRACER.span("convert"):
+                frame = cv2.flip(frame, 1)
+                clean_frame = frame.copy()
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            scale = scaler.scale if scaler else 1.0
+            render_and_decide(frame, *recognize(rgb_frame, face_detection, embedder, tracker, scale))
+            elapsed = time.perf_counter() - inicio
+            stats.record(elapsed)
+            if scaler:
+                scaler.update(elapsed)
+
+            if not handle_key(wait_key(), clean_frame):
+                break
+    print(f"📊 {stats.summary()}")
+
+def run_pipeline(cap, face_detection, embedder, tracker=None, scaler=None):
+    """Captura y detección en hilos propios; render y decisión en el hilo principal."""
+    def read_frame():
+        with CAPTURE_SECONDS.time(), TRACER.span("capture"):
+            ret, frame = cap.read()
+        return ret, (cv2.flip(frame, 1) if ret else None)
+
+    def process(frame):
+        inicio = time.perf_counter()
+        scale = scaler.scale if scaler else 1.0
+        # En modo pipeline el "frame" de la traza (y el disparador de frame lento) es la detección
+        with TRACER.frame():
+            result = recognize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), face_detection, embedder, tracker, scale)
+        # En modo pipeline el presupuesto aplica a la etapa de detección
+        if scaler:
+            scaler.update(time.perf_counter() - inicio)
+        return result
+
+    pipeline = FramePipeline(read_frame, process).start()
+    last_report = time.time()
+    try:
+        while pipeline.running:
+            item = pipeline.next_result()
+            if item is None:
+                continue
+
+            clean_frame = item.image.copy()
+            render_and_decide(item.image, *item.result)
+            pipeline.complete(item)
+
+            if not handle_key(wait_key(), clean_frame):
+                break
+            if time.time() - last_report > REPORT_INTERVAL:
+                print(f"📊 {pipeline.report()}")
+                last_report = time.time()
+    finally:
+        pipeline.stop()
+        print(f"📊 {pipeline.report()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconocimiento facial FaceLock")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Captura, detección y render en hilos separados con colas acotadas")
+    parser.add_argument("--source", default="0",
+                        help="Índice de cámara, URL, video, directorio de imágenes o synthetic[:WxH[:N]]")
+    parser.add_argument("--track", action="store_true",
+                        help="Detector cada N frames y seguimiento de rostros entre detecciones")
+    parser.add_argument("--detect-every", type=int, default=DETECT_EVERY,
+                        help="Frames entre detecciones completas en modo --track")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Escala de la imagen que recibe el detector (1 = resolución completa)")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Presupuesto por frame: la escala de detección se ajusta sola para cumplirlo")
+    parser.add_argument("--trace", action="store_true",
+                        help="Registrar spans por etapa; 't' (o SIGUSR1) guarda los últimos segundos")
+    parser.add_argument("--slow-frame-ms", type=float, default=None,
+                        help="Con --trace, guardar la traza sola cuando un frame tarde más que esto")
+    args = parser.parse_args()
+
+    if args.trace:
+        TRACER.enable(args.slow_frame_ms)
+        if hasattr(signal, "SIGUSR1"):  # no existe en Windows
+            signal.signal(signal.SIGUSR1, lambda *_: TRACER.dump("signal"))
+
+    # === Iniciar fuente de frames ===
+    cap = open_source(args.source)
+    if not cap.isOpened():
+        print(f" Fuente de video no disponible: {args.source}")
+        exit()
+
+    mp_face_detection = mp.solutions.face_detection
+    embedder = FaceEmbedder()
+    tracker = FaceTracker(args.detect_every) if args.track else None
+    scaler = AdaptiveScale(args.budget_ms, scale=args.scale) if args.budget_ms else FixedScale(args.scale)
+    known_faces_watcher.start()
+    notifier.start()
+    metrics_pusher = MetricsPusher(f"{EDGE_API_BASE}/metrics/push", "recognition").start()
+
+    print("\nPresiona:\n 1 - Nuevo registro\n 2 - Ingresar PIN\n ESC - Salir\n")
+    if TRACER.enabled:
+        print(" t - Guardar traza de los últimos segundos\n")
+
+    with mp_face_detection.FaceDetection(min_detection_confidence=MIN_DETECTION_CONFIDENCE) as face_detection:
+        if args.pipeline:
+            run_pipeline(cap, face_detection, embedder, tracker, scaler)
+        else:
+            run_sequential(cap, face_detection, embedder, tracker, scaler)
+
+    known_faces_watcher.stop()
+    notifier.stop()
+    metrics_pusher.stop()
+    embedder.close()
+    cap.release()
+    cv2.destroyAllWindows()
@@ -0,0 +1,130 @@
+import math
+import os
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class CameraSource:
+    """Cámara local (índice) o stream (RTSP/HTTP) vía cv2.VideoCapture."""
+
+    def __init__(self, device):
+        self.name = str(device)
+        self.cap = cv2.VideoCapture(device)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(CameraSource):
+    """Video grabado; con loop=True vuelve al inicio al terminar."""
+
+    def __init__(self, path, loop=False):
+        super().__init__(path)
+        self.loop = loop
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+
+class ImageDirSource:
+    """Imágenes de un directorio, en orden alfabético, como si fueran frames."""
+
+    def __init__(self, directory, loop=False):
+        self.name = directory
+        self.paths = sorted(
+            os.path.join(directory, f) for f in os.listdir(directory)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.loop = loop
+        self._pos = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        if self._pos >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self._pos = 0
+        frame = cv2.imread(self.paths[self._pos])
+        self._pos += 1
+        return frame is not None, frame
+
+    def release(self):
+        pass
+
+
+class SyntheticSource:
+    """Frames generados: fondo con ruido y, opcionalmente, un rostro real que se desplaza.
+
+    Sirve para medir el pipeline sin cámara ni clips grabados.
+    """
+
+    def __init__(self, width=640, height=480, frames=300, face_image=None, seed=0):
+        self.name = f"synthetic:{width}x{height}"
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self._pos = 0
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(40, 200, width, dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+        self.background = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+        self.face = None
+        if face_image is not None:
+            face = cv2.imread(face_image)
+            if face is not None:
+                size = min(width, height) // 2
+                scale = size / max(face.shape[:2])
+                self.face = cv2.resize(face, None, fx=scale, fy=scale)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.frames is not None and self._pos >= self.frames:
+            return False, None
+        frame = self.background.copy()
+        if self.face is not None:
+            fh, fw = self.face.shape[:2]
+            # Trayectoria suave: el rostro se mueve pocos píxeles entre frames, como en una cámara real
+            t = self._pos / 30
+            x = int((self.width - fw) * (0.5 + 0.4 * math.sin(t)))
+            y = int((self.height - fh) * (0.5 + 0.3 * math.sin(t * 0.7)))
+            frame[y:y + fh, x:x + fw] = self.face
+        self._pos += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def open_source(spec, loop=False):
+    """Crea la fuente según el texto: índice de cámara, URL, video, directorio o 'synthetic[:WxH[:N[:rostro.jpg]]]'."""
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec.startswith("synthetic"):
+        parts = spec.split(":")
+        width, height = (int(v) for v in parts[1].split("x")) if len(parts) > 1 else (640, 480)
+        frames = int(parts[2]) if len(parts) > 2 else 300
+        face_image = parts[3] if len(parts) > 3 else None
+        return SyntheticSource(width, height, frames, face_image)
+    if "://" in spec:
+        return CameraSource(spec)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, loop)
+    return VideoFileSource(spec, loop)
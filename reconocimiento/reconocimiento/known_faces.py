@@ -0,0 +1,150 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from face_index import FaceIndex, EMBEDDING_DIM
+from face_store import FaceStore
+from tracing import TRACER
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # inotify solo existe en Linux; en otro caso se hace polling
+    INotify = None
+
+# Intervalo del polling cuando no hay inotify (segundos)
+POLL_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class KnownFaces:
+    """Snapshot inmutable de los rostros enrolados. El frame loop solo lee la referencia."""
+    names: tuple = ()
+    embeddings: tuple = ()
+    data: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    index: FaceIndex = field(default_factory=lambda: FaceIndex(dim=EMBEDDING_DIM))
+
+    @classmethod
+    def build(cls, embeddings, names, data):
+        valid_names = []
+        valid_embeddings = []
+        for embedding, name in zip(embeddings, names):
+            # Los pickles antiguos guardaban bboxes (4 valores); esos rostros deben re-registrarse
+            if len(embedding) != EMBEDDING_DIM:
+                continue
+            valid_names.append(name)
+            valid_embeddings.append(embedding)
+        index = FaceIndex(valid_names, valid_embeddings or None, dim=EMBEDDING_DIM)
+        return cls(tuple(names), tuple(embeddings), MappingProxyType(dict(data)), index)
+
+    @classmethod
+    def from_view(cls, view):
+        """Snapshot sobre una vista del FaceStore: la matriz ya está normalizada y no se copia."""
+        index = FaceIndex.from_normalized(view.names, view.matrix)
+        return cls(view.names, (), MappingProxyType(view.data), index)
+
+
+def load_known_faces(store_dir):
+    """Snapshot de solo lectura del almacén (sin podar ni compactar); vacío si no existe."""
+    return KnownFaces.from_view(FaceStore(store_dir, read_only=True).load())
+
+
+class KnownFacesWatcher:
+    """Mantiene el snapshot de rostros al día desde un hilo en segundo plano.
+
+    Usa inotify sobre el almacén y la carpeta de rostros cuando está
+    disponible y, si no, revisa una vez por POLL_INTERVAL. Cada recarga solo
+    lee las operaciones nuevas del FaceStore y publica el snapshot nuevo con
+    una sola asignación de referencia. Si el almacén está vacío y existe el
+    antiguo known_faces.pkl, se importa una vez.
+    """
+
+    def __init__(self, store_dir, rostros_dir, poll_interval=POLL_INTERVAL, legacy_pickle=None):
+        self.store = FaceStore(store_dir)
+        self.rostros_dir = os.path.abspath(rostros_dir)
+        self.legacy_pickle = legacy_pickle
+        self.poll_interval = poll_interval
+        self.snapshot = KnownFaces()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._signature = None
+
+    def start(self):
+        # inotify vigila el directorio del almacén: tiene que existir aunque todavía no haya altas
+        os.makedirs(self.store.directory, exist_ok=True)
+        self._migrate()
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="known-faces-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval * 2)
+
+    def _migrate(self):
+        if self.legacy_pickle and self.store.signature() is None and os.path.exists(self.legacy_pickle):
+            with self._write_lock:
+                imported = self.store.import_pickle(self.legacy_pickle)
+            print(f" {imported} rostros importados desde {self.legacy_pickle}.")
+
+    def _run(self):
+        if INotify is not None:
+            try:
+                self._run_inotify()
+                return
+            except OSError as e:
+                print(f"inotify no disponible ({e}). Se usa polling.")
+        while not self._stop.wait(self.poll_interval):
+            self._refresh_if_changed()
+
+    def _run_inotify(self):
+        inotify = INotify()
+        mask = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO |
+                inotify_flags.MOVED_FROM | inotify_flags.DELETE | inotify_flags.CREATE)
+        inotify.add_watch(self.store.directory, mask)
+        inotify.add_watch(self.rostros_dir, mask)
+        try:
+            while not self._stop.is_set():
+                # read() agrupa los eventos que llegan dentro de read_delay ms en una sola recarga
+                if inotify.read(timeout=int(self.poll_interval * 1000), read_delay=50):
+                    self._refresh_if_changed()
+        finally:
+            inotify.close()
+
+    def _current_signature(self):
+        with os.scandir(self.rostros_dir) as entries:
+            images = frozenset(e.name for e in entries if e.name.endswith(".jpg"))
+        return self.store.signature(), images
+
+    def _refresh_if_changed(self):
+        if self._current_signature() != self._signature:
+            self.refresh()
+
+    def refresh(self):
+        """Aplica los cambios del almacén, da de baja rostros sin imagen y publica un snapshot nuevo."""
+        with self._write_lock, TRACER.span("known_faces.refresh"):
+            _, images = self._current_signature()
+            view = self.store.load()
+
+            # Verificar si las imágenes asociadas aún existen (una sola lectura del directorio)
+            removed = sorted({n for n in view.names if f"{n}.jpg" not in images})
+            for name in removed:
+                print(f"Imagen de {name} fue eliminada. Se remueve del sistema.")
+            if removed:
+                self.store.delete(removed)
+                if self.store.needs_compaction():
+                    self.store.compact()
+                view = self.store.load()
+
+            self.snapshot = KnownFaces.from_view(view)
+            self._signature = self._current_signature()
+
+    def add_face(self, name, embedding, info):
+        """Agrega un rostro enrolado al almacén y publica el snapshot."""
+        with self._write_lock:
+            self.store.append(name, embedding, info)
+            self.snapshot = KnownFaces.from_view(self.store.load())
+            self._signature = self._current_signature()
@@ -0,0 +1,408 @@
+"""Métricas en proceso (contadores, gauges e histogramas) en formato de texto Prometheus.
+
+Registrar cuesta un lock sin contención y una búsqueda binaria sobre los
+buckets (~1 µs), así que puede quedar activo en producción. El Edge API
+expone el registro en /api/metrics; el proceso de reconocimiento envía el
+suyo con MetricsPusher y el Edge API lo publica junto al propio. Con varios
+workers (serve.py), share() hace que cada uno vuelque su snapshot a un
+directorio común y cualquiera de ellos publica el de todos.
+"""
+import atexit
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+# Buckets de latencia en segundos: de 0.5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Cada cuánto el reconocimiento envía sus métricas al Edge API (segundos)
+PUSH_INTERVAL = 10
+# Métricas enviadas por otro proceso que no se actualizan en este tiempo dejan de publicarse
+PUSH_STALE_SECONDS = 300
+# Cada cuánto un worker vuelca su snapshot al directorio compartido (segundos)
+SHARE_INTERVAL = 1.0
+# Un archivo de worker sin actualizar en este tiempo es de un worker muerto (p. ej. SIGKILL) y se borra
+WORKER_STALE_SECONDS = 30 * SHARE_INTERVAL
+
+KINDS = ("counter", "gauge", "histogram")
+METRIC_NAME = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*\Z")
+LABEL_NAME = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*\Z")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def labels(self, *values):
+        """Serie hija para esos valores de etiquetas (se crea la primera vez)."""
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._series.items())
+        return {
+            "kind": self.kind, "help": self.help, "labels": list(self.label_names),
+            "series": [[list(values), series.value()] for values, series in items],
+        }
+
+
+class _CounterSeries:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        return self._value
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_series = _CounterSeries
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _GaugeSeries:
+    __slots__ = ("_value", "_fn")
+
+    def __init__(self, fn=None):
+        self._value = 0
+        self._fn = fn
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        # Con función se evalúa al exportar (p. ej. profundidad de una cola)
+        return self._fn() if self._fn else self._value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_series = _GaugeSeries
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, fn, *label_values):
+        with self._lock:
+            self._series[label_values] = _GaugeSeries(fn)
+
+
+class _HistogramSeries:
+    __slots__ = ("_buckets", "_counts", "_sum", "_lock")
+
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio)
+
+    def value(self):
+        with self._lock:
+            return {"counts": list(self._counts), "sum": self._sum}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self):
+        return _HistogramSeries(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_snapshot(snapshot):
+    """Lanza ValueError si `snapshot` no tiene la forma de Registry.snapshot()."""
+    if not isinstance(snapshot, dict):
+        raise ValueError("el snapshot debe ser un objeto")
+    for name, data in snapshot.items():
+        if not METRIC_NAME.match(name):
+            raise ValueError(f"nombre de métrica inválido: {name!r}")
+        if not isinstance(data, dict) or data.get("kind") not in KINDS or not isinstance(data.get("help"), str):
+            raise ValueError(f"{name}: faltan kind o help")
+        labels = data.get("labels")
+        if not isinstance(labels, list) or not all(isinstance(l, str) and LABEL_NAME.match(l) for l in labels):
+            raise ValueError(f"{name}: labels inválidas")
+        buckets = data.get("buckets")
+        if data["kind"] == "histogram" and (not isinstance(buckets, list) or not all(map(_is_number, buckets))):
+            raise ValueError(f"{name}: buckets inválidos")
+        series = data.get("series")
+        if not isinstance(series, list):
+            raise ValueError(f"{name}: series debe ser una lista")
+        for entry in series:
+            if not (isinstance(entry, list) and len(entry) == 2
+                    and isinstance(entry[0], list) and len(entry[0]) == len(labels)):
+                raise ValueError(f"{name}: serie inválida")
+            value = entry[1]
+            if data["kind"] != "histogram":
+                valid = _is_number(value)
+            else:
+                counts = value.get("counts") if isinstance(value, dict) else None
+                valid = (isinstance(counts, list) and len(counts) == len(buckets) + 1
+                         and all(isinstance(c, int) and not isinstance(c, bool) for c in counts)
+                         and _is_number(value.get("sum")))
+            if not valid:
+                raise ValueError(f"{name}: valor inválido")
+
+
+def render_snapshot(name, data, extra_labels=(), header=True):
+    """Líneas Prometheus de una métrica a partir de su snapshot."""
+    lines = [f"# HELP {name} {data['help']}", f"# TYPE {name} {data['kind']}"] if header else []
+    label_names = data["labels"]
+    for values, value in data["series"]:
+        if data["kind"] != "histogram":
+            lines.append(f"{name}{_format_labels(label_names, values, extra_labels)} {_format_value(value)}")
+            continue
+        acumulado = 0
+        for bound, count in zip(list(data["buckets"]) + [float("inf")], value["counts"]):
+            acumulado += count
+            le = extra_labels + (("le", _format_value(float(bound))),)
+            lines.append(f"{name}_bucket{_format_labels(label_names, values, le)} {acumulado}")
+        labels = _format_labels(label_names, values, extra_labels)
+        lines.append(f"{name}_sum{labels} {_format_value(value['sum'])}")
+        lines.append(f"{name}_count{labels} {acumulado}")
+    return lines
+
+
+class Registry:
+    """Conjunto de métricas de un proceso más las recibidas de otros procesos."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._pushed = {}
+        self._lock = threading.Lock()
+        self._share_dir = None
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets)
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in metrics}
+
+    def accept_push(self, job, snapshot):
+        """Guarda el último snapshot enviado por otro proceso (se publica con job=...).
+
+        Lanza ValueError si el snapshot no tiene la forma de snapshot(): uno
+        malformado rompería cada render() hasta volverse viejo.
+        """
+        if not isinstance(job, str) or not job:
+            raise ValueError("job debe ser un texto no vacío")
+        validate_snapshot(snapshot)
+        if self._share_dir:
+            # Lo tiene que ver el worker que atienda el próximo scrape, no solo este
+            self._write_shared(f"push-{re.sub(r'[^A-Za-z0-9_.-]', '_', job)}.json", {"job": job, "metrics": snapshot})
+            return
+        now = time.time()
+        with self._lock:
+            self._pushed[job] = (now, snapshot)
+            self._prune_pushed(now)
+
+    def _prune_pushed(self, now):
+        """Olvida los jobs que dejaron de enviar (llamar con el lock tomado)."""
+        for job in [job for job, (at, _) in self._pushed.items() if now - at > PUSH_STALE_SECONDS]:
+            del self._pushed[job]
+
+    # === Varios procesos ===
+
+    def share(self, directory, interval=SHARE_INTERVAL):
+        """Vuelca el snapshot de este proceso a `directory` cada `interval` s; render() junta todos."""
+        os.makedirs(directory, exist_ok=True)
+        self._share_dir = directory
+        own = f"worker-{os.getpid()}.json"
+
+        def run():
+            while True:
+                self._write_shared(own, {"worker": str(os.getpid()), "metrics": self.snapshot()})
+                time.sleep(interval)
+
+        threading.Thread(target=run, name="metrics-share", daemon=True).start()
+        atexit.register(self._remove_shared, own)
+
+    def _remove_shared(self, filename):
+        try:
+            os.remove(os.path.join(self._share_dir, filename))
+        except FileNotFoundError:
+            pass
+
+    def _write_shared(self, filename, payload):
+        path = os.path.join(self._share_dir, filename)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)  # quien lee nunca ve un archivo a medio escribir
+
+    def _shared_snapshots(self):
+        """(etiquetas, snapshot) de los otros workers y de los push recibidos por cualquiera.
+
+        De paso borra los archivos viejos: push de jobs que dejaron de enviar,
+        workers que murieron sin pasar por atexit y temporales a medio escribir.
+        """
+        own = f"worker-{os.getpid()}.json"
+        now = time.time()
+        result = []
+        for entry in os.scandir(self._share_dir):
+            if entry.name == own:
+                continue
+            stale_after = WORKER_STALE_SECONDS if entry.name.startswith("worker-") else PUSH_STALE_SECONDS
+            try:
+                if now - entry.stat().st_mtime > stale_after:
+                    os.remove(entry.path)
+                    continue
+                if not entry.name.endswith(".json"):
+                    continue
+                with open(entry.path) as f:
+                    payload = json.load(f)
+                label = ("job", payload["job"]) if "job" in payload else ("worker", payload["worker"])
+                validate_snapshot(payload["metrics"])
+            except OSError:
+                continue  # el worker terminó y borró su archivo mientras se leía
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠ Métricas compartidas inválidas en {entry.name}: {e}")
+                continue
+            result.append(((label,), payload["metrics"]))
+        return result
+
+    def render(self):
+        own_labels = (("worker", str(os.getpid())),) if self._share_dir else ()
+        # Prometheus exige HELP/TYPE una sola vez por nombre y sus series juntas
+        families = {name: [(data, own_labels)] for name, data in self.snapshot().items()}
+        if self._share_dir:
+            sources = self._shared_snapshots()
+        else:
+            with self._lock:
+                self._prune_pushed(time.time())
+                sources = [((("job", job),), snap) for job, (at, snap) in self._pushed.items()]
+        for labels, snap in sources:
+            for name, data in snap.items():
+                entries = families.setdefault(name, [])
+                # Un mismo nombre con otro tipo dejaría un TYPE que no corresponde a sus series
+                if not entries or entries[0][0]["kind"] == data["kind"]:
+                    entries.append((data, labels))
+        lines = []
+        for name, entries in families.items():
+            for i, (data, extra) in enumerate(entries):
+                lines.extend(render_snapshot(name, data, extra, header=i == 0))
+        return "\n".join(lines) + "\n"
+
+
+# Registro del proceso
+REGISTRY = Registry()
+
+
+class MetricsPusher:
+    """Envía el registro del proceso al Edge API cada PUSH_INTERVAL segundos."""
+
+    def __init__(self, url, job, registry=REGISTRY, interval=PUSH_INTERVAL):
+        self.url = url
+        self.job = job
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._session = requests.Session()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-pusher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.push()  # último envío con los totales finales
+        self._session.close()
+
+    def push(self):
+        try:
+            self._session.post(self.url, json={"job": self.job, "metrics": self.registry.snapshot()},
+                               timeout=2).raise_for_status()
+        except requests.RequestException:
+            pass  # sin Edge API no hay métricas remotas; el loop sigue igual
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.push()
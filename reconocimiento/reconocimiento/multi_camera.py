@@ -0,0 +1,238 @@
+"""Servicio de reconocimiento multi-cámara.
+
+Corre un proceso worker por cámara (índice, URL RTSP/HTTP o archivo), así
+la detección de cada cámara usa su propio núcleo. Todos los workers leen el
+mismo índice de rostros enrolados desde memoria compartida (shared_index);
+solo el coordinador vigila el almacén de rostros. Los accesos reconocidos
+vuelven al coordinador, que deduplica entre cámaras y notifica al Edge API
+con un único AccessNotifier.
+
+Uso:
+  python multi_camera.py 0 1 rtsp://10.0.0.5/stream
+  python multi_camera.py --track 5 --budget-ms 60 0 1 2 3
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import time
+
+import cv2
+
+import face_recognition_app as app
+from adaptive_scale import AdaptiveScale, FixedScale
+from face_embedding import FaceEmbedder
+from frame_sources import open_source
+from metrics import MetricsPusher
+from pipeline import StageCounter
+from shared_index import SharedIndexPublisher, SharedIndexReader
+from tracker import FaceTracker, MIN_DETECTION_CONFIDENCE
+
+# Espera antes de relanzar un worker que terminó con error (cámara desconectada)
+RESTART_DELAY = 5
+# Ventana en la que la misma persona vista por otra cámara no vuelve a notificar
+DEDUP_SECONDS = app.COOLDOWN_SECONDS
+
+
+def camera_worker(camera_id, spec, version, prefix, events, stop, options):
+    """Loop de una cámara; corre en su propio proceso."""
+    import mediapipe as mp
+
+    # Un hilo por proceso: el paralelismo viene de los procesos, no de OpenCV
+    cv2.setNumThreads(1)
+    source = open_source(spec, options["loop"])
+    if not source.isOpened():
+        events.put(("error", camera_id, f"Fuente de video no disponible: {spec}"))
+        raise SystemExit(1)
+
+    reader = SharedIndexReader(version, prefix)
+    tracker = FaceTracker(options["detect_every"]) if options["detect_every"] else None
+    if options["budget_ms"]:
+        scaler = AdaptiveScale(options["budget_ms"], scale=options["scale"])
+    else:
+        scaler = FixedScale(options["scale"])
+    notified = {}
+    stats = StageCounter(camera_id)
+    last_report = time.time()
+    # Cada worker publica sus métricas por separado (job=recognition-camN)
+    metrics_pusher = MetricsPusher(f"{app.EDGE_API_BASE}/metrics/push", f"recognition-{camera_id}").start()
+
+    try:
+        with mp.solutions.face_detection.FaceDetection(min_detection_confidence=MIN_DETECTION_CONFIDENCE) as face_detection, \
+                FaceEmbedder() as embedder:
+            while not stop.is_set():
+                inicio = time.perf_counter()
+                ret, frame = source.read()
+                app.CAPTURE_SECONDS.observe(time.perf_counter() - inicio)
+                if not ret:
+                    break
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                _, matches, _ = app.recognize(rgb_frame, face_detection, embedder, tracker,
+                                              scaler.scale, reader.current())
+
+                # Cooldown local por nombre: al coordinador solo llegan accesos nuevos
+                now = time.time()
+                for name, confidence in matches:
+                    if name != "Desconocido" and now - notified.get(name, 0) > app.COOLDOWN_SECONDS:
+                        events.put(("access", camera_id, name, confidence, now))
+                        notified[name] = now
+                if len(notified) > app.MAX_COOLDOWN_ENTRIES:
+                    notified = {k: t for k, t in notified.items() if now - t <= app.COOLDOWN_SECONDS}
+
+                elapsed = time.perf_counter() - inicio
+                stats.record(elapsed)
+                scaler.update(elapsed)
+                if now - last_report > app.REPORT_INTERVAL:
+                    events.put(("stats", camera_id, stats.summary()))
+                    last_report = now
+    finally:
+        metrics_pusher.stop()
+        reader.close()
+        source.release()
+        events.put(("exit", camera_id, stats.summary()))
+
+
+class NotificationCoordinator:
+    """Deduplica los accesos que llegan de todas las cámaras antes de notificar."""
+
+    def __init__(self, notifier, window=DEDUP_SECONDS):
+        self.notifier = notifier
+        self.window = window
+        self.last_seen = {}
+        self.duplicates = 0
+
+    def handle(self, camera_id, name, confidence, seen_at):
+        """Notifica salvo que la misma persona ya se haya notificado dentro de la ventana."""
+        last = self.last_seen.get(name)
+        if last is not None and seen_at - last <= self.window:
+            self.duplicates += 1
+            return False
+        self.last_seen[name] = seen_at
+        self.notifier.notify(name, "facial_recognition", True, confidence)
+        print(f"✅ {name} reconocido en {camera_id} ({confidence:.2f})")
+        if len(self.last_seen) > app.MAX_COOLDOWN_ENTRIES:
+            self.last_seen = {n: t for n, t in self.last_seen.items() if seen_at - t <= self.window}
+        return True
+
+
+class CameraService:
+    """Coordinador: publica el índice, lanza y vigila los workers y atiende sus eventos."""
+
+    def __init__(self, sources, options, watcher=None, notifier=None):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.sources = {f"cam{i}": spec for i, spec in enumerate(sources)}
+        self.options = options
+        self.watcher = watcher or app.known_faces_watcher
+        self.notifier = notifier or app.notifier
+        self.coordinator = NotificationCoordinator(self.notifier)
+        self.version = self.ctx.Value("i", 0)
+        self.prefix = f"facelock-{os.getpid()}"
+        self.publisher = SharedIndexPublisher(self.version, self.prefix)
+        self.events = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.workers = {}
+        self.finished = set()
+        self._restart_at = {}
+        self._published = None
+
+    def _spawn(self, camera_id):
+        process = self.ctx.Process(
+            target=camera_worker, name=f"camera-{camera_id}", daemon=True,
+            args=(camera_id, self.sources[camera_id], self.version, self.prefix,
+                  self.events, self.stop_event, self.options),
+        )
+        process.start()
+        self.workers[camera_id] = process
+
+    def _publish_if_changed(self):
+        snapshot = self.watcher.snapshot
+        if snapshot is not self._published:
+            self.publisher.publish(snapshot)
+            self._published = snapshot
+
+    def _handle(self, event):
+        kind, camera_id = event[0], event[1]
+        if kind == "access":
+            self.coordinator.handle(camera_id, *event[2:])
+        elif kind == "stats":
+            print(f"📊 {event[2]}")
+        elif kind == "error":
+            print(f"⚠ {camera_id}: {event[2]}")
+        elif kind == "exit":
+            print(f"📊 {camera_id} terminó: {event[2]}")
+
+    def _check_workers(self):
+        now = time.time()
+        for camera_id, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            if process.exitcode == 0:
+                # Fin de un archivo: no se relanza
+                self.finished.add(camera_id)
+                del self.workers[camera_id]
+            elif camera_id not in self._restart_at:
+                print(f"⚠ {camera_id} terminó con código {process.exitcode}; se relanza en {RESTART_DELAY}s")
+                self._restart_at[camera_id] = now + RESTART_DELAY
+            elif now >= self._restart_at[camera_id]:
+                del self._restart_at[camera_id]
+                self._spawn(camera_id)
+
+    def run(self):
+        self.watcher.start()
+        self.notifier.start()
+        self._publish_if_changed()
+        # Evita que cada worker abra un pool de hilos por núcleo (sobresuscripción)
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+        for camera_id in self.sources:
+            self._spawn(camera_id)
+        print(f"{len(self.sources)} cámaras: " + ", ".join(f"{c}={s}" for c, s in self.sources.items()))
+
+        try:
+            while self.workers:
+                try:
+                    self._handle(self.events.get(timeout=0.5))
+                except queue.Empty:
+                    pass
+                self._publish_if_changed()
+                self._check_workers()
+        except KeyboardInterrupt:
+            print("\nDeteniendo cámaras...")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.stop_event.set()
+        for process in self.workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        # Eventos que quedaron en la cola al detenerse
+        while True:
+            try:
+                self._handle(self.events.get_nowait())
+            except (queue.Empty, OSError, ValueError):
+                break
+        self.publisher.close()
+        self.notifier.stop()
+        self.watcher.stop()
+        print(f"Notificaciones duplicadas entre cámaras descartadas: {self.coordinator.duplicates}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconocimiento facial FaceLock para varias cámaras")
+    parser.add_argument("sources", nargs="+",
+                        help="Índices de cámara, URLs RTSP/HTTP, videos o directorios de imágenes")
+    parser.add_argument("--track", type=int, metavar="N", default=None,
+                        help="Modo seguimiento: detector cada N frames")
+    parser.add_argument("--scale", type=float, default=1.0, help="Escala de la imagen del detector")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Presupuesto por frame para la escala adaptativa")
+    parser.add_argument("--loop", action="store_true", help="Repetir videos y directorios")
+    args = parser.parse_args()
+
+    CameraService(args.sources, {
+        "detect_every": args.track,
+        "scale": args.scale,
+        "budget_ms": args.budget_ms,
+        "loop": args.loop,
+    }).run()
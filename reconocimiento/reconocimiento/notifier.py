@@ -0,0 +1,172 @@
+import threading
+import time
+import uuid
+from collections import deque
+
+import requests
+
+from metrics import REGISTRY
+from tracing import TRACER
+
+# Máximo de eventos pendientes en memoria; si se llena se descartan los más antiguos
+OUTBOX_SIZE = 500
+# Eventos por request al endpoint batch
+BATCH_SIZE = 20
+# Espera para juntar eventos antes de enviar (segundos)
+BATCH_WAIT = 0.05
+REQUEST_TIMEOUT = 2
+BACKOFF_INICIAL = 0.5
+BACKOFF_MAXIMO = 30
+# Veces que un evento puede volver con status 'error' antes de descartarlo
+MAX_ATTEMPTS = 5
+
+NOTIFY_SECONDS = REGISTRY.histogram(
+    "facelock_notify_seconds", "Ida y vuelta de un lote de notificaciones al Edge API")
+NOTIFICATIONS = REGISTRY.counter(
+    "facelock_notifications_total", "Notificaciones de acceso por resultado", ("result",))
+
+
+class AccessNotifier:
+    """Envía notificaciones de acceso al Edge API desde un hilo en segundo plano.
+
+    notify() solo encola y retorna; el hilo agrupa hasta BATCH_SIZE eventos por
+    request sobre una sesión keep-alive y reintenta con backoff exponencial;
+    un evento que el servidor devuelve MAX_ATTEMPTS veces con 'error' se descarta.
+    Cada evento lleva un event_id (el servidor descarta los reenvíos) y la hora
+    en que ocurrió: al enviar se manda su antigüedad y el servidor no abre la
+    puerta por un acceso que esperó demasiado en el outbox.
+    """
+
+    def __init__(self, batch_url, outbox_size=OUTBOX_SIZE, batch_size=BATCH_SIZE):
+        self.batch_url = batch_url
+        self.batch_size = batch_size
+        self.outbox = deque(maxlen=outbox_size)
+        self.dropped = 0
+        self.sent = 0
+        self.rejected = 0
+        self.failed = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._session = requests.Session()
+        REGISTRY.gauge("facelock_notify_outbox", "Notificaciones pendientes de envío").set_function(self.pending)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="access-notifier", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=REQUEST_TIMEOUT):
+        """Intenta vaciar el outbox antes de cerrar la sesión."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        self._session.close()
+
+    def notify(self, user_name, method, success=True, confidence=1.0):
+        """Encola un evento sin bloquear al llamador."""
+        event = {
+            "event_id": uuid.uuid4().hex,
+            "timestamp": time.time(),
+            "user_name": user_name,
+            "method": method,
+            "success": success,
+            "confidence": confidence,
+        }
+        with self._cond:
+            if len(self.outbox) == self.outbox.maxlen:
+                self.dropped += 1
+                NOTIFICATIONS.labels("dropped").inc()
+            self.outbox.append(event)
+            self._cond.notify()
+
+    def pending(self):
+        return len(self.outbox)
+
+    def _next_batch(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self.outbox or not self._running)
+            if self._running and len(self.outbox) < self.batch_size:
+                # Pequeña espera para agrupar los eventos que llegan juntos
+                self._cond.wait(BATCH_WAIT)
+            return [self.outbox.popleft() for _ in range(min(self.batch_size, len(self.outbox)))]
+
+    def _requeue(self, batch):
+        with self._cond:
+            for i, event in enumerate(reversed(batch)):
+                if len(self.outbox) == self.outbox.maxlen:
+                    # Se pierden este evento y los más viejos que quedaban por reencolar
+                    self.dropped += len(batch) - i
+                    NOTIFICATIONS.labels("dropped").inc(len(batch) - i)
+                    break
+                self.outbox.appendleft(event)
+
+    def _send(self, batch):
+        """Envía el lote; devuelve los eventos a reintentar (los que el servidor no pudo procesar)."""
+        now = time.time()
+        events = [dict(event, age=round(now - event["timestamp"], 3)) for event in batch]
+        with NOTIFY_SECONDS.time(), TRACER.span("notify", events=len(batch)):
+            response = self._session.post(self.batch_url, json={"events": events}, timeout=REQUEST_TIMEOUT)
+        if 400 <= response.status_code < 500:
+            # El servidor rechazó el lote: reintentarlo no lo va a arreglar
+            print(f"⚠ Lote de notificaciones rechazado: {response.status_code}")
+            self._count("rejected", len(batch))
+            return []
+        response.raise_for_status()
+
+        retry = []
+        results = response.json().get("results", [])
+        for event, result in zip(batch, results):
+            status = result.get("status")
+            if status == "error":
+                # Un error de red no cuenta: el servidor respondió y este evento falló
+                event["attempts"] = event.get("attempts", 0) + 1
+                if event["attempts"] < MAX_ATTEMPTS:
+                    retry.append(event)
+                else:
+                    print(f"⚠ Notificación descartada tras {MAX_ATTEMPTS} errores: "
+                          f"{event['user_name']} - {result.get('error')}")
+                    self._count("failed", 1)
+            elif status == "rejected":
+                print(f"⚠ Notificación rechazada: {event['user_name']} - {result.get('error')}")
+                self._count("rejected", 1)
+            else:
+                # "duplicate": un reenvío de algo que el servidor ya había procesado
+                print(f"📡 Notificación enviada: {event['user_name']} - {event['method']}")
+                self._count("sent", 1)
+        return retry
+
+    def _count(self, result, amount):
+        if result == "sent":
+            self.sent += amount
+        elif result == "failed":
+            self.failed += amount
+        else:
+            self.rejected += amount
+        NOTIFICATIONS.labels(result).inc(amount)
+
+    def _run(self):
+        backoff = BACKOFF_INICIAL
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            try:
+                retry = self._send(batch)
+                error = f"{len(retry)} eventos fallaron en el servidor" if retry else None
+            except requests.RequestException as e:
+                retry, error = batch, e
+            if not retry:
+                backoff = BACKOFF_INICIAL
+                continue
+            self._requeue(retry)
+            if not self._running:
+                print(f"⚠ No se pudieron enviar {len(self.outbox)} notificaciones pendientes: {error}")
+                return
+            print(f"⚠ Error notificando acceso ({error}). Reintento en {backoff:.1f}s")
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running, backoff)
+            backoff = min(backoff * 2, BACKOFF_MAXIMO)
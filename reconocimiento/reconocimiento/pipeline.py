@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+# Tamaño de las colas entre etapas: la detección siempre toma el frame más reciente
+QUEUE_SIZE = 1
+
+
+@dataclass
+class Frame:
+    """Frame capturado y su marca de tiempo de captura."""
+    seq: int
+    image: Any
+    captured_at: float = field(default_factory=time.perf_counter)
+    result: Any = None
+    render_started_at: float = 0.0
+
+
+class DropOldestQueue:
+    """Cola acotada que descarta el elemento más antiguo cuando está llena."""
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Devuelve el siguiente elemento, o None si se agotó el timeout o la cola se cerró."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class StageCounter:
+    """Contador de throughput de una etapa (lo actualiza un solo hilo)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0
+        self.started_at = time.perf_counter()
+
+    def record(self, seconds):
+        self.count += 1
+        self.busy += seconds
+
+    def fps(self):
+        elapsed = time.perf_counter() - self.started_at
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        avg_ms = self.busy / self.count * 1000 if self.count else 0.0
+        return f"{self.name}: {self.fps():.1f} fps, {avg_ms:.1f} ms/frame"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class FramePipeline:
+    """Pipeline captura → detección → render/decisión unido por colas que descartan frames viejos.
+
+    read_frame() devuelve (ok, imagen) y corre en el hilo de captura.
+    process(imagen) corre en el hilo de detección y su resultado queda en Frame.result.
+    La etapa de render (hilo principal, por imshow/waitKey) consume con next_result()
+    y marca cada frame con complete() al terminar la decisión de acceso.
+    """
+
+    def __init__(self, read_frame, process, queue_size=QUEUE_SIZE):
+        self.read_frame = read_frame
+        self.process = process
+        self.captured = DropOldestQueue(queue_size)
+        self.processed = DropOldestQueue(queue_size)
+        self.capture_stats = StageCounter("captura")
+        self.detect_stats = StageCounter("detección")
+        self.render_stats = StageCounter("render")
+        self.latencies = deque(maxlen=1000)
+        self.running = False
+        self._threads = []
+
+    def start(self):
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="pipeline-captura", daemon=True),
+            threading.Thread(target=self._detect_loop, name="pipeline-deteccion", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.captured.close()
+        self.processed.close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def _capture_loop(self):
+        seq = 0
+        while self.running:
+            inicio = time.perf_counter()
+            ok, image = self.read_frame()
+            if not ok:
+                print(" Fin de la captura.")
+                self.running = False
+                self.processed.close()
+                break
+            self.captured.put(Frame(seq, image, inicio))
+            self.capture_stats.record(time.perf_counter() - inicio)
+            seq += 1
+
+    def _detect_loop(self):
+        while self.running:
+            frame = self.captured.get(timeout=0.5)
+            if frame is None:
+                continue
+            inicio = time.perf_counter()
+            try:
+                frame.result = self.process(frame.image)
+            except Exception as e:
+                print(f"⚠ Error procesando frame {frame.seq}: {e}")
+                continue
+            self.processed.put(frame)
+            self.detect_stats.record(time.perf_counter() - inicio)
+
+    def next_result(self, timeout=0.5):
+        """Siguiente frame procesado (None si no hay uno listo)."""
+        frame = self.processed.get(timeout)
+        if frame is not None:
+            frame.render_started_at = time.perf_counter()
+        return frame
+
+    def complete(self, frame):
+        """Registra el fin de la etapa de render/decisión y la latencia captura→decisión."""
+        ahora = time.perf_counter()
+        self.render_stats.record(ahora - frame.render_started_at)
+        self.latencies.append(ahora - frame.captured_at)
+
+    def report(self):
+        latencies = list(self.latencies)
+        return " | ".join([
+            self.capture_stats.summary(),
+            self.detect_stats.summary(),
+            self.render_stats.summary(),
+            f"descartados: {self.captured.dropped + self.processed.dropped}",
+            f"latencia captura→decisión p50 {percentile(latencies, 50) * 1000:.0f} ms"
+            f" / p95 {percentile(latencies, 95) * 1000:.0f} ms",
+        ])
@@ -0,0 +1,255 @@
+"""Ejecución sin pantalla del loop de reconocimiento sobre cualquier fuente de frames.
+
+Mide cada etapa (decode, flip/convert, detect, match, draw), los FPS
+sostenidos y la memoria del proceso. No abre ventanas ni notifica al
+Edge API salvo que se pida con --notify.
+
+Uso:
+  python replay.py --source clip.mp4
+  python replay.py --source synthetic:1280x720:300 --json resultado.json
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import mediapipe as mp
+
+import face_recognition_app as app
+from face_embedding import FaceEmbedder
+from frame_sources import open_source
+from known_faces import KnownFaces, load_known_faces
+from pipeline import percentile
+from tracker import MIN_DETECTION_CONFIDENCE, REDETECT_SCORE, FaceTracker, iou
+from adaptive_scale import AdaptiveScale, FixedScale
+from tracing import TRACER
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Etapas medidas, en el orden en que corren
+STAGES = ("decode", "flip/convert", "detect", "match", "draw")
+
+
+def rss_mb():
+    """Memoria residente actual y pico del proceso en MB (None si no se puede leer)."""
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB, macOS bytes
+        peak = peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    return current, peak
+
+
+class StageTimer:
+    """Duraciones por etapa y por frame."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def summary(self):
+        return {
+            stage: {
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+            }
+            for stage, values in self.samples.items() if values
+        }
+
+
+def run_headless(source, face_detection, embedder, known, max_frames=None, warmup=5, notify=False,
+                 tracker=None, scaler=None, collect_boxes=False):
+    """Procesa la fuente completa sin pantalla y devuelve el reporte como dict.
+
+    Con tracker, "detect" incluye la predicción de los frames sin detector
+    y "match" solo identifica los tracks nuevos. Con scaler el detector
+    recibe la imagen reducida. collect_boxes guarda las cajas de cada
+    frame medido (para calcular recall contra otra pasada).
+    """
+    timer = StageTimer()
+    frames = faces = recognized = detector_calls = 0
+    scales = []
+    boxes = []
+    inicio_total = None
+    ahora = time.perf_counter
+
+    while max_frames is None or frames < max_frames + warmup:
+        with TRACER.frame():
+            t0 = ahora()
+            with TRACER.span("capture"):
+                ret, frame = source.read()
+            if not ret:
+                break
+            t1 = ahora()
+            with TRACER.span("convert"):
+                frame = cv2.flip(frame, 1)
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            t2 = ahora()
+            scale = scaler.scale if scaler else 1.0
+            if tracker is None:
+                face_locations, face_bboxes, _ = app.locate_faces(rgb_frame, face_detection, scale)
+                t3 = ahora()
+                matches = app.identify_faces(rgb_frame, face_bboxes, embedder, known)
+            else:
+                detections_before = tracker.detections
+                pending = app.track_step(rgb_frame, face_detection, tracker, scale)
+                t3 = ahora()
+                app.identify_tracks(rgb_frame, pending, embedder, known)
+                face_locations = [t.location for t in tracker.tracks]
+                matches = [(t.name, t.confidence) for t in tracker.tracks]
+            t4 = ahora()
+            with TRACER.span("draw"):
+                app.draw_results(frame, face_locations, matches, known)
+            t5 = ahora()
+            if notify:
+                app.decide_access(matches)
+            if scaler and frames >= warmup:
+                scaler.update(t5 - t0)
+
+            frames += 1
+            # Los primeros frames incluyen la carga de los modelos: no se miden
+            if frames <= warmup:
+                continue
+            if inicio_total is None:
+                inicio_total = t0
+            for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+                timer.record(stage, seconds)
+            faces += len(matches)
+            recognized += sum(1 for name, _ in matches if name != "Desconocido")
+            detector_calls += 1 if tracker is None else tracker.detections - detections_before
+            scales.append(scale)
+            if collect_boxes:
+                boxes.append(face_locations)
+
+    medidos = max(frames - warmup, 0)
+    elapsed = ahora() - inicio_total if inicio_total is not None else 0.0
+    rss, peak = rss_mb()
+    report = {
+        "source": getattr(source, "name", ""),
+        "frames": medidos,
+        "fps": medidos / elapsed if elapsed > 0 else 0.0,
+        "stages": timer.summary(),
+        "faces": faces,
+        "recognized": recognized,
+        "detector_calls": detector_calls,
+        "rss_mb": rss,
+        "peak_rss_mb": peak,
+        "mean_scale": sum(scales) / len(scales) if scales else 1.0,
+    }
+    if collect_boxes:
+        report["boxes"] = boxes
+    return report
+
+
+def recall(reference_boxes, boxes, min_iou=0.5):
+    """Fracción de rostros de la pasada de referencia que también se encontraron."""
+    total = found = 0
+    for expected, got in zip(reference_boxes, boxes):
+        total += len(expected)
+        remaining = list(got)
+        for box in expected:
+            best = max(remaining, key=lambda b: iou(box, b), default=None)
+            if best is not None and iou(box, best) >= min_iou:
+                found += 1
+                remaining.remove(best)
+    return found / total if total else 1.0
+
+
+def format_report(report):
+    lines = [f"{report['source']}: {report['frames']} frames, {report['fps']:.1f} fps sostenidos, "
+             f"{report['faces']} rostros ({report['recognized']} reconocidos), "
+             f"{report['detector_calls']} llamadas al detector, escala media {report['mean_scale']:.2f}"]
+    for stage in STAGES:
+        if stage in report["stages"]:
+            s = report["stages"][stage]
+            lines.append(f"  {stage:<13} media {s['mean_ms']:7.2f} ms   p95 {s['p95_ms']:7.2f} ms")
+    if report["rss_mb"] is not None or report["peak_rss_mb"] is not None:
+        rss = f"{report['rss_mb']:.0f}" if report["rss_mb"] is not None else "N/A"
+        peak = f"{report['peak_rss_mb']:.0f}" if report["peak_rss_mb"] is not None else "N/A"
+        lines.append(f"  memoria      RSS {rss} MB (pico {peak} MB)")
+    return "\n".join(lines)
+
+
+def replay(spec, known, max_frames=None, warmup=5, notify=False, loop=False, detect_every=None,
+           scaler=None, collect_boxes=False, redetect_score=REDETECT_SCORE):
+    """Abre la fuente y los modelos, ejecuta el runner y libera todo."""
+    source = open_source(spec, loop)
+    if not source.isOpened():
+        raise RuntimeError(f"Fuente de video no disponible: {spec}")
+    try:
+        with mp.solutions.face_detection.FaceDetection(min_detection_confidence=MIN_DETECTION_CONFIDENCE) as face_detection, \
+                FaceEmbedder() as embedder:
+            tracker = FaceTracker(detect_every, redetect_score=redetect_score) if detect_every else None
+            return run_headless(source, face_detection, embedder, known, max_frames, warmup, notify,
+                                tracker, scaler, collect_boxes)
+    finally:
+        source.release()
+
+
+def load_known(path):
+    """Snapshot de solo lectura del almacén (o de un pickle antiguo): no poda ni compacta."""
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            embeddings, names, data = pickle.load(f)
+        return KnownFaces.build(embeddings, names, data)
+    if not os.path.isdir(path):
+        return KnownFaces()
+    return load_known_faces(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loop de reconocimiento sin pantalla")
+    parser.add_argument("--source", default="synthetic",
+                        help="Índice de cámara, URL, video, directorio de imágenes o synthetic[:WxH[:N]]")
+    parser.add_argument("--frames", type=int, default=None, help="Máximo de frames medidos")
+    parser.add_argument("--warmup", type=int, default=5, help="Frames iniciales sin medir")
+    parser.add_argument("--loop", action="store_true", help="Repetir videos/directorios hasta --frames")
+    parser.add_argument("--known", default=app.store_dir,
+                        help="Almacén de rostros enrolados (o un known_faces.pkl antiguo)")
+    parser.add_argument("--notify", action="store_true", help="Enviar notificaciones al Edge API")
+    parser.add_argument("--track", type=int, metavar="N", default=None,
+                        help="Modo seguimiento: detector cada N frames")
+    parser.add_argument("--scale", type=float, default=1.0, help="Escala de la imagen del detector")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Presupuesto por frame para la escala adaptativa")
+    parser.add_argument("--json", help="Guardar el reporte en este archivo")
+    parser.add_argument("--trace", action="store_true",
+                        help="Guardar una traza Chrome de los últimos segundos al terminar")
+    parser.add_argument("--slow-frame-ms", type=float, default=None,
+                        help="Con --trace, guardar también la traza de cada frame más lento que esto")
+    args = parser.parse_args()
+
+    if args.trace:
+        TRACER.enable(args.slow_frame_ms)
+
+    scaler = AdaptiveScale(args.budget_ms, scale=args.scale) if args.budget_ms else FixedScale(args.scale)
+    if args.notify:
+        app.notifier.start()
+    try:
+        report = replay(args.source, load_known(args.known),
+                        args.frames, args.warmup, args.notify, args.loop, args.track, scaler)
+    finally:
+        if args.notify:
+            app.notifier.stop()
+
+    if args.trace:
+        TRACER.dump("replay")
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,219 @@
+"""Retención de tablas de eventos: poda por antigüedad y por cantidad de filas.
+
+Sirve para cualquier tabla SQLite de solo-agregar (access_logs de
+facelock.db, access_events del iot_edge). Borra de lo más viejo a lo más
+nuevo en lotes de CHUNK_ROWS filas, cada uno en su propia transacción
+corta con una pausa entre lotes, así los escritores nunca esperan más que
+un lote. Antes de borrar puede archivar las filas en un .jsonl.gz y, al
+final, devuelve las páginas libres al sistema con incremental_vacuum.
+
+Uso:
+  python retention.py --max-age-days 90
+  python retention.py --db ../../iot_edge/access_events.db --table access_events --local-time \\
+                      --max-rows 500000 --archive-dir archive
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso (waitress), no hace falta el lock entre procesos
+    fcntl = None
+
+# Filas por lote de borrado: con lotes chicos la transacción dura pocos ms
+CHUNK_ROWS = 500
+# Pausa entre lotes para que los escritores tomen el lock (segundos)
+CHUNK_PAUSE = 0.02
+# Páginas devueltas por cada PRAGMA incremental_vacuum
+VACUUM_PAGES = 256
+# Cada cuánto corre el job en segundo plano (segundos)
+RETENTION_INTERVAL = 3600
+
+
+def _cutoff(max_age_days, utc):
+    """Timestamp límite en el mismo formato que guarda la tabla ('YYYY-MM-DD HH:MM:SS')."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None) if utc else datetime.now()
+    return (now - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class RetentionJob:
+    """Poda una tabla por antigüedad (max_age_days) y/o tamaño (max_rows), en lotes.
+
+    Supone una tabla de solo-agregar: el rowid crece con el timestamp, así
+    que se recorre por rowid sin necesitar un índice sobre time_column.
+    """
+
+    def __init__(self, db_path, table, time_column="timestamp", max_age_days=None, max_rows=None,
+                 archive_dir=None, utc=True, chunk_rows=CHUNK_ROWS, pause=CHUNK_PAUSE,
+                 interval=RETENTION_INTERVAL):
+        self.db_path = db_path
+        self.table = table
+        self.time_column = time_column
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+        self.archive_dir = archive_dir
+        self.utc = utc
+        self.chunk_rows = chunk_rows
+        self.pause = pause
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"retention-{self.table}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = self.run_once()
+                if result and result["deleted"]:
+                    print(f"🧹 {self.table}: {result['deleted']} filas podadas, "
+                          f"{result['freed_pages']} páginas liberadas en {result['seconds']:.1f}s")
+            except Exception as e:
+                # También OSError (archivo lleno, permisos del archivo o del lock): el hilo sigue y reintenta
+                print(f"⚠ Retención de {self.table} falló: {e}")
+            self._stop.wait(self.interval)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def run_once(self):
+        """Una pasada completa. Devuelve un resumen, o None si otro proceso ya está podando."""
+        lock = self._try_lock()
+        if lock is False:
+            return None
+        inicio = time.perf_counter()
+        conn = self._connect()
+        archive = None
+        try:
+            cutoff = _cutoff(self.max_age_days, self.utc) if self.max_age_days is not None else None
+            excess = 0
+            if self.max_rows is not None:
+                excess = max(conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_rows, 0)
+
+            deleted = 0
+            last_rowid = 0
+            while not self._stop.is_set():
+                cursor = conn.execute(
+                    f"SELECT rowid, * FROM {self.table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, self.chunk_rows))
+                columns = [d[0] for d in cursor.description]
+                rows = cursor.fetchall()
+                time_index = columns.index(self.time_column)
+                # Prefijo del lote que sobra: más viejo que el límite o por encima de max_rows
+                expired = []
+                for row in rows:
+                    too_old = cutoff is not None and row[time_index] is not None and str(row[time_index]) < cutoff
+                    if not too_old and deleted + len(expired) >= excess:
+                        break
+                    expired.append(row)
+                if not expired:
+                    break
+
+                if self.archive_dir:
+                    if archive is None:
+                        archive = self._open_archive()
+                    for row in expired:
+                        archive.write(json.dumps(dict(zip(columns[1:], row[1:])), default=str) + "\n")
+                    # Lo archivado queda en disco antes de borrarlo de la base
+                    archive.flush()
+                    os.fsync(archive.fileno())
+
+                last_rowid = expired[-1][0]
+                with conn:
+                    conn.execute(f"DELETE FROM {self.table} WHERE rowid <= ?", (last_rowid,))
+                deleted += len(expired)
+                if len(expired) < len(rows):
+                    break
+                time.sleep(self.pause)
+
+            freed = self._incremental_vacuum(conn) if deleted else 0
+            return {"deleted": deleted, "freed_pages": freed, "seconds": time.perf_counter() - inicio,
+                    "archive": archive.name if archive else None}
+        finally:
+            if archive is not None:
+                archive.close()
+            conn.close()
+            if lock:
+                lock.close()
+
+    def _try_lock(self):
+        """Con varios workers (serve.py) solo uno poda a la vez; los demás saltean la pasada."""
+        if fcntl is None:
+            return None
+        lock = open(f"{self.db_path}.retention.lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        return lock
+
+    def _open_archive(self):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{self.table}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+        return gzip.open(path, "at", encoding="utf-8")
+
+    def _incremental_vacuum(self, conn):
+        """Devuelve las páginas libres de a VACUUM_PAGES (solo con auto_vacuum=INCREMENTAL)."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        initial = free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free and not self._stop.is_set():
+            # executescript corre el PRAGMA hasta el final; execute() liberaría una sola página
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(self.pause)
+        return initial - free
+
+
+def enable_incremental_vacuum(db_path):
+    """Pasa una base existente a auto_vacuum=INCREMENTAL. Hace un VACUUM completo: correr en mantenimiento."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poda de tablas de eventos")
+    parser.add_argument("--db", default="facelock.db")
+    parser.add_argument("--table", default="access_logs")
+    parser.add_argument("--time-column", default="timestamp")
+    parser.add_argument("--local-time", action="store_true",
+                        help="La columna guarda hora local (access_events) y no UTC (access_logs)")
+    parser.add_argument("--max-age-days", type=float, default=None)
+    parser.add_argument("--max-rows", type=int, default=None)
+    parser.add_argument("--archive-dir", default=None, help="Guardar las filas podadas en .jsonl.gz")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Convertir la base (VACUUM completo, una sola vez) para poder liberar espacio")
+    args = parser.parse_args()
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(args.db)
+        print(f"{args.db}: auto_vacuum=INCREMENTAL")
+    job = RetentionJob(args.db, args.table, args.time_column, args.max_age_days, args.max_rows,
+                       args.archive_dir, utc=not args.local_time)
+    result = job.run_once()
+    if result is None:
+        print("Otro proceso está podando esta base.")
+    else:
+        print(f"{args.table}: {result['deleted']} filas podadas, {result['freed_pages']} páginas liberadas "
+              f"en {result['seconds']:.1f}s" + (f", archivo {result['archive']}" if result["archive"] else ""))
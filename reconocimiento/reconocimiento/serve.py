@@ -0,0 +1,146 @@
+"""Servidor de producción del Edge API (sin reloader ni debugger).
+
+Linux: gunicorn con varios workers gthread (procesos × hilos). Windows:
+waitress, un proceso con muchos hilos. Si ninguno está instalado se usa el
+servidor de Werkzeug con HTTP/1.1 keep-alive y el debugger apagado.
+
+Cada long-poll de un ESP32 ocupa un hilo mientras espera (hasta 30 s).
+Por defecto los hilos de cada worker salen de los ESP32 esperados
+(--pollers) más RESERVED_THREADS que nunca toman un long-poll, así
+/api/notify-access no queda en cola detrás de polls inactivos. Si llegan
+más pollers que hilos para esperar, los que sobran reciben la respuesta en
+el acto (el comando si hay, si no NONE con Retry-After). El estado
+compartido entre workers vive en SQLite (cola de comandos, logs, ventanas
+de coalescencia) y en un directorio de métricas (ver metrics.Registry.share).
+
+Uso:
+  python serve.py
+  python serve.py --workers 4 --pollers 200 --keep-alive 75 --bind 0.0.0.0:5000
+  python serve.py --workers 2 --threads 64       # 64 - RESERVED_THREADS long-polls por worker
+  FACELOCK_WORKERS=4 FACELOCK_POLLERS=200 python serve.py --server gunicorn
+"""
+import argparse
+import math
+import os
+import tempfile
+
+import database
+from command_queue import MAX_LONG_POLL
+
+DEFAULT_BIND = os.environ.get("FACELOCK_BIND", "0.0.0.0:5000")
+DEFAULT_WORKERS = int(os.environ.get("FACELOCK_WORKERS", min(os.cpu_count() or 1, 4)))
+DEFAULT_THREADS = int(os.environ["FACELOCK_THREADS"]) if os.environ.get("FACELOCK_THREADS") else None
+# ESP32 en long-poll esperados en total, para calcular los hilos si no se indican
+DEFAULT_POLLERS = int(os.environ.get("FACELOCK_POLLERS", 64))
+# Hilos de cada worker que no toman long-polls: quedan para notify-access, status y confirm
+RESERVED_THREADS = 8
+# Más que el intervalo entre polls del ESP32: la conexión se reutiliza en vez de reabrirse
+DEFAULT_KEEP_ALIVE = int(os.environ.get("FACELOCK_KEEP_ALIVE", 75))
+# Un worker sin latido por más de esto se reinicia; debe superar el long-poll más largo
+WORKER_TIMEOUT = MAX_LONG_POLL + 30
+
+
+def threads_for(pollers, workers):
+    """Hilos por worker para que cada uno espere su parte de los pollers y conserve los reservados."""
+    return math.ceil(pollers / workers) + RESERVED_THREADS
+
+
+def _prepare_environment(workers, threads):
+    """Lo leen los workers al importar edge_api (después del fork)."""
+    os.environ["FACELOCK_WORKERS"] = str(workers)
+    # Long-polls que esperan a la vez en cada worker (ver edge_api.LONG_POLL_SLOTS)
+    os.environ["FACELOCK_LONG_POLL_SLOTS"] = str(max(threads - RESERVED_THREADS, 1))
+    if workers > 1:
+        os.environ.setdefault("FACELOCK_METRICS_DIR", tempfile.mkdtemp(prefix="facelock-metrics-"))
+
+
+def serve_gunicorn(bind, workers, threads, keep_alive):
+    from gunicorn.app.base import BaseApplication
+
+    class EdgeApplication(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": bind,
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread",
+                "keepalive": keep_alive,
+                "timeout": WORKER_TIMEOUT,
+                "graceful_timeout": MAX_LONG_POLL,
+                # Sin preload: cada worker abre sus conexiones e hilos después del fork
+                "preload_app": False,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from edge_api import app
+            return app
+
+    EdgeApplication().run()
+
+
+def serve_waitress(bind, threads, keep_alive, pollers):
+    import waitress
+    from edge_api import app
+
+    # channel_timeout: conexiones keep-alive inactivas se cierran pasado este tiempo.
+    # connection_limit: cada ESP32 tiene su conexión abierta; sin margen sobre los pollers
+    # waitress deja de aceptar y los clientes de reconocimiento no entran.
+    waitress.serve(app, listen=bind, threads=threads, channel_timeout=max(keep_alive, MAX_LONG_POLL + 5),
+                   connection_limit=max(threads * 4, pollers + 100), ident="FaceLock")
+
+
+def serve_werkzeug(bind, keep_alive):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from edge_api import app
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"  # permite reutilizar la conexión
+        timeout = keep_alive
+
+    host, _, port = bind.rpartition(":")
+    make_server(host, int(port), app, threaded=True, request_handler=KeepAliveHandler).serve_forever()
+
+
+def pick_server(name):
+    if name != "auto":
+        return name
+    for candidate in ("gunicorn", "waitress"):
+        try:
+            __import__(candidate)
+            return candidate
+        except ImportError:
+            # gunicorn no existe en Windows (necesita fcntl)
+            continue
+    return "werkzeug"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Edge API de FaceLock en modo producción")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress", "werkzeug"), default="auto")
+    parser.add_argument("--bind", default=DEFAULT_BIND, help="host:puerto")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Procesos (solo gunicorn)")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS,
+                        help="Hilos por proceso (por defecto, calculados desde --pollers)")
+    parser.add_argument("--pollers", type=int, default=DEFAULT_POLLERS,
+                        help="ESP32 en long-poll esperados en total")
+    parser.add_argument("--keep-alive", type=int, default=DEFAULT_KEEP_ALIVE,
+                        help="Segundos que una conexión inactiva queda abierta")
+    args = parser.parse_args()
+
+    server = pick_server(args.server)
+    workers = args.workers if server == "gunicorn" else 1
+    threads = args.threads or threads_for(args.pollers, workers)
+    _prepare_environment(workers, threads)
+    database.init_database()
+    # Ninguna conexión SQLite abierta en el padre debe heredarse en los workers
+    database.close_all()
+    print(f"FaceLock Edge API: {server} en {args.bind}, {workers} workers × {threads} hilos "
+          f"({os.environ['FACELOCK_LONG_POLL_SLOTS']} para long-poll), keep-alive {args.keep_alive}s")
+
+    if server == "gunicorn":
+        serve_gunicorn(args.bind, workers, threads, args.keep_alive)
+    elif server == "waitress":
+        serve_waitress(args.bind, threads, args.keep_alive, args.pollers)
+    else:
+        serve_werkzeug(args.bind, args.keep_alive)
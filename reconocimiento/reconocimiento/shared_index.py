@@ -0,0 +1,127 @@
+"""Índice de rostros enrolados compartido entre procesos por memoria compartida.
+
+El proceso coordinador publica cada snapshot en un bloque de memoria
+compartida nuevo (matriz float32 normalizada + nombres y datos en JSON) y
+actualiza un número de versión. Los workers comparan la versión en cada
+frame y, cuando cambia, se conectan al bloque nuevo: la matriz se usa
+directamente desde la memoria compartida, sin copiarla ni leer el almacén.
+"""
+import json
+import struct
+import weakref
+from multiprocessing import shared_memory
+from types import MappingProxyType
+
+import numpy as np
+
+from face_index import FaceIndex, EMBEDDING_DIM
+from known_faces import KnownFaces
+
+# Cabecera: filas, dimensión y largo del JSON de metadatos
+HEADER = struct.Struct("<III")
+# Bloques publicados que se conservan: un worker puede estar conectándose al anterior
+KEEP_BLOCKS = 2
+
+
+def block_name(prefix, version):
+    return f"{prefix}-{version}"
+
+
+class SharedIndexPublisher:
+    """Lado del coordinador: publica snapshots y libera los bloques viejos."""
+
+    def __init__(self, version, prefix):
+        self.version = version  # multiprocessing.Value('i') compartido con los workers
+        self.prefix = prefix
+        self._blocks = []
+
+    def publish(self, known):
+        matrix = np.ascontiguousarray(known.index.matrix, dtype=np.float32)
+        rows, dim = matrix.reshape(-1, known.index.dim or EMBEDDING_DIM).shape
+        # Los workers solo dibujan la edad: el PIN no sale del coordinador
+        data = {name: {k: v for k, v in info.items() if k != "pin"} for name, info in known.data.items()}
+        meta = json.dumps({"names": list(known.index.names), "data": data}, default=str).encode()
+        size = HEADER.size + matrix.nbytes + len(meta)
+
+        next_version = self.version.value + 1
+        block = shared_memory.SharedMemory(name=block_name(self.prefix, next_version), create=True, size=size)
+        HEADER.pack_into(block.buf, 0, rows, dim, len(meta))
+        view = np.ndarray((rows, dim), dtype=np.float32, buffer=block.buf, offset=HEADER.size)
+        view[:] = matrix
+        block.buf[HEADER.size + matrix.nbytes:size] = meta
+        del view
+
+        self._blocks.append(block)
+        with self.version.get_lock():
+            self.version.value = next_version
+        while len(self._blocks) > KEEP_BLOCKS:
+            self._release(self._blocks.pop(0))
+
+    @staticmethod
+    def _release(block):
+        block.close()
+        block.unlink()
+
+    def close(self):
+        for block in self._blocks:
+            self._release(block)
+        self._blocks = []
+
+
+class SharedIndexReader:
+    """Lado del worker: mantiene un KnownFaces respaldado por el bloque más reciente."""
+
+    def __init__(self, version, prefix):
+        self.version = version
+        self.prefix = prefix
+        self.snapshot = KnownFaces()
+        self._block = None
+        self._stale = []  # (snapshot, bloque) de versiones anteriores todavía en uso
+        self._attached = 0
+
+    def current(self):
+        """Snapshot vigente; se reconecta solo si el coordinador publicó una versión nueva."""
+        version = self.version.value
+        if version != self._attached:
+            try:
+                self._attach(version)
+            except FileNotFoundError:
+                pass  # ya hay una versión más nueva; se toma en el próximo frame
+        return self.snapshot
+
+    def _attach(self, version):
+        # Los workers se lanzan con spawn y comparten el resource tracker del coordinador,
+        # así que el bloque sigue siendo suyo y solo él lo borra (unlink)
+        block = shared_memory.SharedMemory(name=block_name(self.prefix, version))
+        rows, dim, meta_len = HEADER.unpack_from(block.buf, 0)
+        matrix = np.ndarray((rows, dim), dtype=np.float32, buffer=block.buf, offset=HEADER.size)
+        matrix.flags.writeable = False
+        start = HEADER.size + matrix.nbytes
+        meta = json.loads(bytes(block.buf[start:start + meta_len]))
+        index = FaceIndex.from_normalized(meta["names"], matrix)
+
+        if self._block is not None:
+            self._stale.append((weakref.ref(self.snapshot), self._block))
+        self.snapshot = KnownFaces(tuple(meta["names"]), (), MappingProxyType(meta["data"]), index)
+        self._block = block
+        self._attached = version
+        self._close_stale()
+
+    def _close_stale(self):
+        # Cerrar el bloque con la matriz todavía referenciada invalida la memoria bajo
+        # NumPy (segfault): solo se cierra cuando nadie conserva ese snapshot
+        still_open = []
+        for ref, block in self._stale:
+            if ref() is None:
+                block.close()
+            else:
+                still_open.append((ref, block))
+        self._stale = still_open
+
+    def close(self):
+        """Libera los bloques que ya nadie usa; el resto se desmapea al terminar el proceso."""
+        if self._block is not None:
+            self._stale.append((weakref.ref(self.snapshot), self._block))
+            self._block = None
+        self.snapshot = KnownFaces()
+        self._close_stale()
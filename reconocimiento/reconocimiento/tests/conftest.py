@@ -0,0 +1,14 @@
+import pytest
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Base nueva en un directorio temporal, con las tablas y migraciones aplicadas."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "facelock.db"))
+    database.close_all()
+    database.init_database()
+    yield database.DB_PATH
+    database.flush_access_logs(timeout=5)
+    database.close_all()
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import database
+from access_coalescer import AccessCoalescer, SharedAccessCoalescer
+
+
+@pytest.fixture(params=[AccessCoalescer, SharedAccessCoalescer], ids=["memoria", "sqlite"])
+def make_coalescer(request, db):
+    return request.param
+
+
+def stats_counts(conn):
+    return dict(conn.execute('SELECT granularity, SUM(count) FROM access_stats GROUP BY granularity'))
+
+
+def test_repeats_inside_the_window_share_it(make_coalescer):
+    coalescer = make_coalescer(window=30)
+    window, repeated = coalescer.claim("ana", "puerta", True)
+    again, repeated_again = coalescer.claim("ana", "puerta", True)
+
+    assert not repeated
+    assert repeated_again and again.key == window.key
+    # El resultado y la puerta son parte de la clave
+    assert not coalescer.claim("ana", "puerta", False)[1]
+    assert not coalescer.claim("ana", "otra", True)[1]
+
+
+def test_window_is_fixed_and_expires(make_coalescer):
+    coalescer = make_coalescer(window=0.2)
+    window, _ = coalescer.claim("ana", "puerta", True)
+    time.sleep(0.1)
+    assert coalescer.claim("ana", "puerta", True)[1]
+    time.sleep(0.15)
+
+    # Las repeticiones no la extendieron: pasados 0.2 s desde la primera abre una nueva
+    new_window, repeated = coalescer.claim("ana", "puerta", True)
+    assert not repeated and new_window.key != window.key
+
+
+def test_release_lets_the_retry_open_again(make_coalescer):
+    coalescer = make_coalescer(window=30)
+    window, _ = coalescer.claim("ana", "puerta", True)
+    coalescer.release(window)
+
+    assert not coalescer.claim("ana", "puerta", True)[1]
+
+
+def test_release_does_not_remove_a_newer_window(make_coalescer):
+    coalescer = make_coalescer(window=0.1)
+    old, _ = coalescer.claim("ana", "puerta", True)
+    time.sleep(0.15)
+    coalescer.claim("ana", "puerta", True)
+    coalescer.release(old)
+
+    assert coalescer.claim("ana", "puerta", True)[1]
+
+
+@pytest.mark.parametrize("repeats_before_log", [0, 2])
+def test_repeats_add_to_the_log_occurrences_and_stats(make_coalescer, repeats_before_log):
+    coalescer = make_coalescer(window=30)
+    window, _ = coalescer.claim("ana", "puerta", True)
+    # Las repeticiones pueden llegar antes de que el escritor guarde el log que abrió la ventana
+    for _ in range(repeats_before_log):
+        database.count_repeat(coalescer.claim("ana", "puerta", True)[0])
+    database.log_access("ana", "face", True, 0.9, window=window)
+    database.flush_access_logs(timeout=5)
+    for _ in range(3 - repeats_before_log):
+        database.count_repeat(coalescer.claim("ana", "puerta", True)[0])
+    database.flush_access_logs(timeout=5)
+
+    with database.connection() as conn:
+        assert conn.execute('SELECT occurrences FROM access_logs').fetchall() == [(4,)]
+        assert stats_counts(conn) == {"hour": 4, "day": 4}
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from command_queue import CommandQueue
+
+
+def test_pop_delivers_in_order_and_ack_confirms(db):
+    queue = CommandQueue()
+    first = queue.push("puerta", "OPEN:ana")
+    second = queue.push("puerta", "OPEN:bob")
+
+    assert queue.pop("puerta") == (first, "OPEN:ana")
+    assert queue.pop("puerta") == (second, "OPEN:bob")
+    assert queue.pop("otra") is None
+    assert queue.ack("puerta", command_id=first) == first
+    assert queue.ack("puerta", command="OPEN:bob") == second
+    assert queue.pending_count() == 0
+
+
+def test_two_pollers_never_deliver_the_same_command(db):
+    # Dos instancias, como dos workers de serve.py sobre la misma base
+    queues = [CommandQueue(redelivery_timeout=60), CommandQueue(redelivery_timeout=60)]
+    pushed = {queues[0].push("puerta", f"OPEN:{i}") for i in range(50)}
+    delivered = []
+    lock = threading.Lock()
+
+    def poll(queue):
+        while True:
+            row = queue.pop("puerta")
+            if row is None:
+                return
+            with lock:
+                delivered.append(row[0])
+
+    threads = [threading.Thread(target=poll, args=(queues[i % 2],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(delivered) == sorted(pushed)
+
+
+def test_unacked_command_is_redelivered_after_timeout(db):
+    queue = CommandQueue(redelivery_timeout=0.1)
+    command_id = queue.push("puerta", "OPEN:ana")
+
+    assert queue.pop("puerta") == (command_id, "OPEN:ana")
+    assert queue.pop("puerta") is None
+    time.sleep(0.15)
+    assert queue.pop("puerta") == (command_id, "OPEN:ana")
+
+    queue.ack("puerta", command_id=command_id)
+    time.sleep(0.15)
+    assert queue.pop("puerta") is None
+
+
+def test_expired_command_is_never_delivered(db):
+    queue = CommandQueue(ttl=0.1)
+    queue.push("puerta", "OPEN:ana")
+    time.sleep(0.15)
+
+    assert queue.pop("puerta") is None
+    assert queue.pending_count() == 0
+    assert queue.expire() == 1
+    assert queue.stats() == {}
+
+
+def test_long_poll_wakes_up_on_push(db):
+    queue = CommandQueue()
+    result = []
+    poller = threading.Thread(target=lambda: result.append(queue.pop("puerta", timeout=5)))
+    poller.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    command_id = queue.push("puerta", "OPEN:ana")
+    poller.join()
+
+    assert result == [(command_id, "OPEN:ana")]
+    assert time.monotonic() - started < 1
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from face_store import FaceStore
+
+DIM = 4
+
+
+def vector(seed):
+    return np.random.default_rng(seed).random(DIM, dtype=np.float32) + 0.1
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FaceStore(tmp_path / "known_faces", dim=DIM)
+
+
+def test_appends_are_visible_to_a_new_reader(store):
+    store.append_many([("ana", vector(1), {"age": 30}), ("bob", vector(2), {})])
+    store.append("ana", vector(3), {"age": 31})
+
+    view = FaceStore(store.directory, dim=DIM, read_only=True).load()
+    assert view.names == ("ana", "bob", "ana")
+    assert view.data == {"ana": {"age": 31}, "bob": {}}
+    assert np.allclose(np.linalg.norm(view.matrix, axis=1), 1.0)
+
+
+def test_trailing_partial_write_is_ignored_and_truncated(store):
+    store.append("ana", vector(1), {})
+    meta_path = store._path("meta", store.generation)
+    vectors_path = store._path("vectors", store.generation)
+    # Un alta interrumpida: el vector entero de una fila más y media línea de metadatos
+    with open(vectors_path, "ab") as f:
+        f.write(vector(2).tobytes())
+    with open(meta_path, "ab") as f:
+        f.write(b'{"add": "bob", "ro')
+
+    reader = FaceStore(store.directory, dim=DIM, read_only=True)
+    assert reader.load().names == ("ana",)
+
+    store.append("carla", vector(3), {})
+    assert FaceStore(store.directory, dim=DIM, read_only=True).load().names == ("ana", "carla")
+    assert os.path.getsize(vectors_path) == 2 * DIM * 4
+    with open(meta_path, "rb") as f:
+        assert f.read().endswith(b"\n")
+    assert reader.load().names == ("ana", "carla")
+
+
+def test_compaction_keeps_live_rows_and_removes_old_generation(store):
+    store.append_many([(f"user_{i}", vector(i), {"i": i}) for i in range(6)])
+    store.delete(["user_1", "user_4"])
+    before = store.load()
+    old_generation = store.generation
+
+    store.compact()
+
+    after = FaceStore(store.directory, dim=DIM, read_only=True).load()
+    assert store.generation == old_generation + 1
+    assert after.names == before.names == ("user_0", "user_2", "user_3", "user_5")
+    assert np.array_equal(after.matrix, before.matrix)
+    assert after.data == before.data
+    assert (after.rows, after.deleted) == (4, 0)
+    assert not os.path.exists(store._path("meta", old_generation))
+    assert not os.path.exists(store._path("vectors", old_generation))
+
+
+def test_read_only_store_never_creates_the_directory(tmp_path):
+    directory = tmp_path / "known_faces"
+    store = FaceStore(directory, dim=DIM, read_only=True)
+
+    assert len(store) == 0
+    assert store.load().names == ()
+    with pytest.raises(PermissionError):
+        store.append("ana", vector(1), {})
+    assert not directory.exists()
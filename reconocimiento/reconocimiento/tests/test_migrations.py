@@ -0,0 +1,87 @@
+import sqlite3
+
+import database
+
+LEGACY_SCHEMA = '''
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    age INTEGER,
+    pin TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1
+);
+CREATE TABLE access_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_name TEXT,
+    access_method TEXT,
+    success BOOLEAN,
+    confidence REAL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO users (name, age, pin) VALUES ('ana', 30, '1234');
+INSERT INTO access_logs (user_name, access_method, success, confidence, timestamp) VALUES
+    ('ana', 'face', 1, 0.9, '2024-05-01 10:15:00'),
+    ('ana', 'face', 1, 0.7, '2024-05-01 10:45:00'),
+    ('bob', 'pin', 0, 0.0, '2024-05-01 11:05:00');
+'''
+
+
+def legacy_database(path):
+    """Base como la creaba database.py antes de las migraciones (user_version 0)."""
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+
+
+def read(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_all_migrations_apply_to_an_existing_database(tmp_path, monkeypatch):
+    path = str(tmp_path / "facelock.db")
+    legacy_database(path)
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.close_all()
+
+    database.init_database()
+    database.init_database()  # otra vez: nada pendiente, nada duplicado
+    database.close_all()
+
+    assert read(path, 'PRAGMA user_version') == [(database.MIGRATIONS[-1][0],)]
+    assert read(path, '''SELECT granularity, bucket, access_method, success, count, round(confidence_sum, 6)
+                         FROM access_stats ORDER BY 1, 2, 3''') == [
+        ('day', '2024-05-01', 'face', 1, 2, 1.6),
+        ('day', '2024-05-01', 'pin', 0, 1, 0.0),
+        ('hour', '2024-05-01 10:00:00', 'face', 1, 2, 1.6),
+        ('hour', '2024-05-01 11:00:00', 'pin', 0, 1, 0.0),
+    ]
+    assert read(path, 'SELECT DISTINCT occurrences FROM access_logs') == [(1,)]
+    assert read(path, 'SELECT version FROM users_version') == [(0,)]
+    for table in ('processed_events', 'access_windows'):
+        assert read(path, f"SELECT COUNT(*) FROM sqlite_master WHERE name = '{table}'") == [(1,)]
+
+
+def test_migration_7_adds_earlier_repeats_to_the_stats(tmp_path, monkeypatch):
+    path = str(tmp_path / "facelock.db")
+    legacy_database(path)
+    monkeypatch.setattr(database, "DB_PATH", path)
+    database.close_all()
+    migrations = database.MIGRATIONS
+    # Hasta la 6: los logs ya tenían repeticiones que los rollups no contaban
+    monkeypatch.setattr(database, "MIGRATIONS", migrations[:6])
+    database.init_database()
+    with database.connection() as conn:
+        conn.execute("UPDATE access_logs SET occurrences = 3 WHERE confidence = 0.9")
+    monkeypatch.setattr(database, "MIGRATIONS", migrations)
+
+    database.init_database()
+    database.close_all()
+
+    assert read(path, 'PRAGMA user_version') == [(7,)]
+    assert read(path, '''SELECT granularity, count, round(confidence_sum, 6) FROM access_stats
+                         WHERE access_method = 'face' ORDER BY 1''') == [('day', 4, 3.4), ('hour', 4, 3.4)]
@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+
+from face_index import DESCONOCIDO
+
+# Cada cuántos frames se corre el detector completo en modo seguimiento
+DETECT_EVERY = 5
+# Solapamiento mínimo para asociar una detección a un track existente
+MIN_IOU = 0.3
+# Detecciones seguidas sin encontrar el rostro antes de descartar el track
+MAX_MISSES = 2
+# min_detection_confidence del detector de MediaPipe en los loops que usan el tracker
+MIN_DETECTION_CONFIDENCE = 0.5
+# Con un score de detección menor se vuelve a detectar en el frame siguiente. Se deriva del
+# detector: un rostro que este siempre puntúa entre MIN_DETECTION_CONFIDENCE y REDETECT_SCORE
+# fuerza una detección por frame, y el margen fija el ancho de esa franja.
+# bench_replay.py --track N --redetect-scores mide llamadas al detector y fps para cada valor.
+REDETECT_MARGIN = 0.1
+REDETECT_SCORE = MIN_DETECTION_CONFIDENCE + REDETECT_MARGIN
+# Frames tras los que un track ya identificado vuelve a pasar por el matcher (en su próxima
+# detección): si otra persona ocupó la caja, el track no conserva la identidad anterior
+REIDENTIFY_EVERY = 30
+
+
+def iou(a, b):
+    """Intersección sobre unión de dos cajas (x1, y1, x2, y2)."""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+
+@dataclass
+class Track:
+    """Rostro seguido entre frames con su identidad ya resuelta."""
+    track_id: int
+    box: tuple
+    score: float
+    name: str = DESCONOCIDO
+    confidence: float = 0.0
+    velocity: tuple = (0.0, 0.0)
+    misses: int = 0
+    frames_since_detection: int = 0
+    frames_since_identity: int = 0
+    detected_box: tuple = None
+
+    def __post_init__(self):
+        if self.detected_box is None:
+            self.detected_box = self.box
+
+    @property
+    def location(self):
+        return tuple(int(v) for v in self.box)
+
+    def relative_bbox(self, width, height):
+        x1, y1, x2, y2 = self.box
+        return x1 / width, y1 / height, (x2 - x1) / width, (y2 - y1) / height
+
+    def predict(self):
+        """Avanza la caja con la velocidad estimada (modelo de velocidad constante)."""
+        dx, dy = self.velocity
+        x1, y1, x2, y2 = self.box
+        self.box = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+        self.frames_since_detection += 1
+        self.frames_since_identity += 1
+
+    def identify(self, name, confidence):
+        self.name = name
+        self.confidence = confidence
+        self.frames_since_identity = 0
+
+    def needs_identity(self, reidentify_every=REIDENTIFY_EVERY):
+        """Recién detectado y sin identidad, o con una identidad de hace más de reidentify_every frames."""
+        return self.frames_since_detection == 0 and (
+            self.name == DESCONOCIDO or self.frames_since_identity >= reidentify_every)
+
+    def observe(self, box, score):
+        """Corrige la caja con una detección nueva y reestima la velocidad."""
+        frames = max(self.frames_since_detection, 1)
+        (ox, oy), (nx, ny) = centroid(self.detected_box), centroid(box)
+        self.velocity = ((nx - ox) / frames, (ny - oy) / frames)
+        self.box = self.detected_box = box
+        self.score = score
+        self.misses = 0
+        self.frames_since_detection = 0
+
+
+class FaceTracker:
+    """Seguimiento por IoU/centroide entre detecciones completas.
+
+    El detector corre cada detect_every frames, o antes si algún track
+    quedó con score bajo; entre detecciones las cajas se predicen. Cada
+    track conserva su id y su identidad, así que el matcher corre para
+    rostros nuevos o todavía desconocidos y, cada REIDENTIFY_EVERY frames,
+    para los ya identificados (la caja pudo pasar a otra persona).
+    """
+
+    def __init__(self, detect_every=DETECT_EVERY, min_iou=MIN_IOU,
+                 max_misses=MAX_MISSES, redetect_score=REDETECT_SCORE):
+        self.detect_every = detect_every
+        self.min_iou = min_iou
+        self.max_misses = max_misses
+        self.redetect_score = redetect_score
+        self.tracks = []
+        self.detections = 0
+        self.known = None  # snapshot de enrolados con el que se asignaron las identidades
+        self._next_id = 1
+        self._since_detection = detect_every  # el primer frame siempre detecta
+
+    def needs_detection(self):
+        return (self._since_detection >= self.detect_every or
+                any(t.score < self.redetect_score for t in self.tracks))
+
+    def predict(self):
+        for track in self.tracks:
+            track.predict()
+        self._since_detection += 1
+
+    def update(self, boxes, scores):
+        """Asocia las detecciones a los tracks y devuelve los ids de los tracks descartados."""
+        self.detections += 1
+        self._since_detection = 1
+        for track in self.tracks:
+            track.predict()
+
+        # Asociación greedy: primero los pares con más solapamiento
+        pairs = sorted(
+            ((iou(track.box, box), ti, di)
+             for ti, track in enumerate(self.tracks) for di, box in enumerate(boxes)),
+            reverse=True,
+        )
+        matched_tracks, matched_boxes = set(), set()
+        for overlap, ti, di in pairs:
+            if overlap < self.min_iou:
+                break
+            if ti in matched_tracks or di in matched_boxes:
+                continue
+            self.tracks[ti].observe(boxes[di], scores[di])
+            matched_tracks.add(ti)
+            matched_boxes.add(di)
+
+        # Sin solapamiento suficiente (movimiento brusco): centroide más cercano dentro de media caja
+        for ti, track in enumerate(self.tracks):
+            if ti in matched_tracks:
+                continue
+            cx, cy = centroid(track.box)
+            reach = (track.box[2] - track.box[0]) / 2
+            best = None
+            for di, box in enumerate(boxes):
+                if di in matched_boxes:
+                    continue
+                bx, by = centroid(box)
+                distance = ((bx - cx) ** 2 + (by - cy) ** 2) ** 0.5
+                if distance <= reach and (best is None or distance < best[0]):
+                    best = (distance, di)
+            if best is not None:
+                track.observe(boxes[best[1]], scores[best[1]])
+                matched_tracks.add(ti)
+                matched_boxes.add(best[1])
+
+        removed = []
+        kept = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    removed.append(track.track_id)
+                    continue
+            kept.append(track)
+        for di, box in enumerate(boxes):
+            if di not in matched_boxes:
+                kept.append(Track(self._next_id, box, scores[di]))
+                self._next_id += 1
+        self.tracks = kept
+        return removed
+
+    def forget_identities(self):
+        """Obliga a reidentificar todos los tracks (p. ej. al cambiar los rostros enrolados)."""
+        for track in self.tracks:
+            track.identify(DESCONOCIDO, 0.0)